@@ -0,0 +1,172 @@
+import os
+import time
+import zlib
+import sqlite3
+import logging
+import datetime
+import tempfile
+from app import app, db
+import metrics
+
+try:
+    import zstandard
+except ImportError:  # Optional, gzip is used without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+BACKUP_PREFIX = 'regulo_pollbot_backup_'
+
+# Pages copied per backup step; writers can get in between steps
+STEP_PAGES = 256
+STEP_SLEEP = 0.005
+
+# A write from another connection restarts a stepped backup; after this many
+# restarts the rest is copied in a single step instead
+MAX_RESTARTS = 3
+
+# Bytes read from the snapshot per compression chunk
+CHUNK_SIZE = 1024 * 1024
+
+EXTENSIONS = {'gzip': '.db.gz', 'zstd': '.db.zst'}
+
+def compression_method():
+    """The configured compression, falling back to gzip if zstandard isn't installed"""
+    method = app.config["BACKUP_COMPRESSION"]
+    if method == 'zstd' and zstandard is None:
+        logger.warning("BACKUP_COMPRESSION is zstd but zstandard isn't installed, using gzip")
+        method = 'gzip'
+    return method if method in EXTENSIONS else 'gzip'
+
+def backup_filename(method):
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{BACKUP_PREFIX}{timestamp}{EXTENSIONS[method]}"
+
+class _BackupBusy(Exception):
+    pass
+
+def supported():
+    """Whether online backups work for the configured database (needs an app context)"""
+    return db.engine.dialect.name == 'sqlite'
+
+def database_path():
+    """Path of the SQLite database file (needs an app context)"""
+    if not supported():
+        raise RuntimeError("Online backups are only supported for SQLite databases")
+    return db.engine.url.database
+
+def snapshot(dest_path):
+    """
+    Copy the live database to dest_path with SQLite's online backup API
+    
+    The copy runs STEP_PAGES pages at a time and releases the database
+    between steps, so the bot and dashboard keep writing while it runs.
+    The result is a consistent snapshot.
+    
+    Parameters:
+    - dest_path: Path of the snapshot file to create
+    """
+    started = time.monotonic()
+    source = sqlite3.connect(database_path())
+    target = sqlite3.connect(dest_path)
+    state = {'remaining': None, 'restarts': 0}
+    
+    def progress(status, remaining, total):
+        # Remaining pages going up means a write restarted the backup
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            metrics.incr('backup.restarts')
+            if state['restarts'] > MAX_RESTARTS:
+                raise _BackupBusy()
+        state['remaining'] = remaining
+    
+    try:
+        try:
+            source.backup(target, pages=STEP_PAGES, progress=progress, sleep=STEP_SLEEP)
+        except _BackupBusy:
+            logger.info("Database is busy, finishing the backup in a single step")
+            source.backup(target, pages=-1)
+    finally:
+        target.close()
+        source.close()
+    metrics.observe('backup.snapshot_seconds', time.monotonic() - started)
+
+def _compressor(method):
+    if method == 'zstd':
+        return zstandard.ZstdCompressor().compressobj()
+    return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes the gzip format
+
+def compress_chunks(path, method):
+    """Yield the file at path compressed with gzip or zstd, a chunk at a time"""
+    compressor = _compressor(method)
+    with open(path, 'rb') as snapshot_file:
+        while True:
+            data = snapshot_file.read(CHUNK_SIZE)
+            if not data:
+                break
+            chunk = compressor.compress(data)
+            if chunk:
+                yield chunk
+    yield compressor.flush()
+
+def stream_backup(method):
+    """
+    Generator of a compressed backup, for streaming as a download
+    
+    The snapshot is taken into a temporary file that is removed when the
+    stream ends or is abandoned. Needs an app context while iterating.
+    """
+    started = time.monotonic()
+    size = 0
+    
+    handle, temp_path = tempfile.mkstemp(suffix='.db')
+    os.close(handle)
+    try:
+        snapshot(temp_path)
+        for chunk in compress_chunks(temp_path, method):
+            size += len(chunk)
+            yield chunk
+    finally:
+        os.remove(temp_path)
+    
+    metrics.observe('backup.duration_seconds', time.monotonic() - started)
+    metrics.observe('backup.size_bytes', size)
+
+def create_backup(backup_dir, keep=5):
+    """
+    Write a compressed backup into backup_dir and prune old ones
+    
+    Parameters:
+    - backup_dir: Directory to write backups to
+    - keep: Number of most recent backups to keep
+    
+    Returns:
+    - Path of the new backup
+    """
+    method = compression_method()
+    os.makedirs(backup_dir, exist_ok=True)
+    backup_path = os.path.join(backup_dir, backup_filename(method))
+    
+    # Write to a partial file so a failed backup never counts towards retention
+    partial_path = backup_path + '.partial'
+    try:
+        with open(partial_path, 'wb') as backup_file:
+            for chunk in stream_backup(method):
+                backup_file.write(chunk)
+        os.replace(partial_path, backup_path)
+    except Exception:
+        metrics.incr('backup.failures')
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    
+    # Keep only the most recent backups (older uncompressed .db copies included)
+    backup_files = sorted([
+        os.path.join(backup_dir, f) for f in os.listdir(backup_dir)
+        if f.startswith(BACKUP_PREFIX) and f.endswith(('.db', '.db.gz', '.db.zst'))
+    ])
+    
+    while len(backup_files) > keep:
+        os.remove(backup_files.pop(0))
+    
+    return backup_path
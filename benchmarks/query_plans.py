@@ -0,0 +1,143 @@
+"""
+Show SQLite query plans and timings for the hot poll/vote queries, first
+without the model indexes and then with them.
+
+Usage: python benchmarks/query_plans.py [polls] [votes]
+"""
+import os
+import sys
+import time
+import random
+import datetime
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+import models
+
+# (name, SQL, parameters) for the queries issued by the bot and the dashboard
+QUERIES = [
+    ("reaction: user's votes in poll",
+     "SELECT * FROM vote WHERE poll_id = :poll_id AND user_id = :user_id",
+     {'poll_id': 7, 'user_id': 1234}),
+    ("reaction remove: user's vote for option",
+     "SELECT * FROM vote WHERE poll_id = :poll_id AND user_id = :user_id AND option_id = :option_id",
+     {'poll_id': 7, 'user_id': 1234, 'option_id': 19}),
+    ("reaction: poll by message",
+     "SELECT * FROM poll WHERE message_id = :message_id",
+     {'message_id': 900007}),
+    ("check_polls: due drafts",
+     "SELECT * FROM poll WHERE status = 'draft' AND (scheduled_for IS NULL OR scheduled_for <= :now)",
+     {'now': datetime.datetime.now()}),
+    ("check_polls: expired actives",
+     "SELECT * FROM poll WHERE status = 'active' AND expires_at <= :now",
+     {'now': datetime.datetime.now()}),
+    ("dashboard: active poll count",
+     "SELECT count(*) FROM poll WHERE status = 'active'",
+     {}),
+    ("dashboard: recent polls",
+     "SELECT * FROM poll ORDER BY created_at DESC LIMIT 5",
+     {}),
+    ("dashboard: votes in last 7 days",
+     "SELECT voted_at FROM vote WHERE voted_at >= :start",
+     {'start': datetime.datetime.now() - datetime.timedelta(days=7)}),
+    ("sync: channels of server",
+     "SELECT * FROM channel WHERE server_id = :server_id",
+     {'server_id': 3}),
+]
+
+def populate(engine, poll_count, vote_count):
+    """Fill the database with synthetic servers, polls and votes"""
+    now = datetime.datetime.now()
+    rng = random.Random(42)
+    statuses = ['draft', 'active', 'closed', 'closed', 'closed', 'cancelled']
+    
+    with engine.begin() as conn:
+        conn.execute(models.Server.__table__.insert(), [
+            {'id': server_id, 'name': f'Server {server_id}'} for server_id in range(1, 51)
+        ])
+        conn.execute(models.Channel.__table__.insert(), [
+            {'id': 1000 + i, 'server_id': 1 + i % 50, 'name': f'channel-{i}', 'type': 'text'}
+            for i in range(2000)
+        ])
+        conn.execute(models.Poll.__table__.insert(), [
+            {
+                'id': poll_id,
+                'server_id': 1 + poll_id % 50,
+                'channel_id': 1000 + poll_id % 2000,
+                'message_id': 900000 + poll_id,
+                'question': f'Question {poll_id}',
+                'created_at': now - datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+                'scheduled_for': now + datetime.timedelta(hours=rng.randint(-48, 48)),
+                'expires_at': now + datetime.timedelta(hours=rng.randint(-48, 48)),
+                'status': rng.choice(statuses),
+            }
+            for poll_id in range(1, poll_count + 1)
+        ])
+        # Three options per poll, so option IDs run (poll_id - 1) * 3 + 1..3
+        conn.execute(models.PollOption.__table__.insert(), [
+            {'id': (poll_id - 1) * 3 + position + 1, 'poll_id': poll_id, 'position': position,
+             'label': f'Option {position + 1}'}
+            for poll_id in range(1, poll_count + 1) for position in range(3)
+        ])
+        
+        batch = []
+        for vote_id in range(1, vote_count + 1):
+            poll_id = rng.randint(1, poll_count)
+            batch.append({
+                'id': vote_id,
+                'poll_id': poll_id,
+                'user_id': rng.randint(1, 50000),
+                'username': 'user',
+                'option_id': (poll_id - 1) * 3 + rng.randint(1, 3),
+                'weight': 1,
+                'voted_at': now - datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+            })
+            if len(batch) == 10000:
+                conn.execute(models.Vote.__table__.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(models.Vote.__table__.insert(), batch)
+
+def model_indexes():
+    return [index for table in db.metadata.sorted_tables for index in table.indexes]
+
+def report(engine, label):
+    print(f"\n=== {label} ===")
+    with engine.connect() as conn:
+        for name, sql, params in QUERIES:
+            plan = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+            
+            start = time.perf_counter()
+            for _ in range(20):
+                conn.execute(text(sql), params).fetchall()
+            elapsed = (time.perf_counter() - start) / 20 * 1000
+            
+            print(f"{name}: {elapsed:.3f} ms")
+            for row in plan:
+                print(f"    {row[-1]}")
+
+def main():
+    poll_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    vote_count = int(sys.argv[2]) if len(sys.argv) > 2 else 300000
+    
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    for index in model_indexes():
+        index.drop(bind=engine)
+    
+    print(f"Populating {poll_count} polls and {vote_count} votes...")
+    populate(engine, poll_count, vote_count)
+    
+    report(engine, "Without indexes")
+    
+    for index in model_indexes():
+        index.create(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    
+    report(engine, "With indexes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Time until a new poll takes votes, with the option emojis added by the old
+loop, by the reaction seeder before opening the poll (inline) and in the
+background after opening it. Discord is simulated: one reaction per message
+every interval, and some adds fail with a 429 that discord.py gave up on.
+
+Usage: python benchmarks/reaction_seeding.py [polls] [options] [interval ms] [429 rate]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from reaction_seeder import ReactionSeeder
+
+class FakeResponse:
+    def __init__(self, status, retry_after):
+        self.status = status
+        self.reason = 'Too Many Requests'
+        self.headers = {'Retry-After': str(retry_after)}
+
+class FakeMessage:
+    """A posted message whose reaction route allows one add per interval"""
+    
+    def __init__(self, id, interval, error_rate, rng):
+        self.id = id
+        self.interval = interval
+        self.error_rate = error_rate
+        self.rng = rng
+        self.reactions = []
+        self._bucket = asyncio.Lock()
+    
+    async def add_reaction(self, emoji):
+        async with self._bucket:
+            await asyncio.sleep(self.interval)
+            if self.rng.random() < self.error_rate:
+                raise discord.HTTPException(FakeResponse(429, self.interval), 'You are being rate limited.')
+            self.reactions.append(emoji)
+
+EMOJIS = [f"{number}\N{VARIATION SELECTOR-16}\N{COMBINING ENCLOSING KEYCAP}" for number in range(1, 10)] + ["\N{KEYCAP TEN}"]
+
+async def post(message, emojis, mode, seeder):
+    # Returns (seconds until votable, seconds until all emojis are on, posted)
+    started = time.perf_counter()
+    try:
+        if mode == 'loop':
+            for emoji in emojis:
+                await message.add_reaction(emoji)
+        elif mode == 'inline':
+            await seeder.seed(message, emojis)
+        votable = time.perf_counter() - started
+        if mode == 'background':
+            await seeder.seed_in_background(message, emojis)
+    except discord.HTTPException:
+        return None, None, False
+    return votable, time.perf_counter() - started, message.reactions == emojis
+
+async def run(mode, polls, options, interval, error_rate):
+    rng = random.Random(3)
+    seeder = ReactionSeeder(retries=5, backoff=interval)
+    messages = [FakeMessage(number, interval, error_rate, rng) for number in range(polls)]
+    return await asyncio.gather(*(post(message, EMOJIS[:options], mode, seeder) for message in messages))
+
+def main():
+    # The seeder logs every retry
+    logging.disable(logging.WARNING)
+    
+    polls = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    options = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    interval = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.25
+    error_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 0.05
+    print(f"{polls} polls with {options} options, {interval * 1000:g} ms per reaction, {error_rate:.0%} 429s")
+    
+    for label, mode in (("Sequential loop", 'loop'), ("Seeder, inline", 'inline'), ("Seeder, background", 'background')):
+        results = asyncio.run(run(mode, polls, options, interval, error_rate))
+        posted = [result for result in results if result[0] is not None]
+        print(f"\n=== {label} ===")
+        print(f"posted:            {len(posted)}/{polls} (emojis in order: {sum(result[2] for result in posted)})")
+        if posted:
+            print(f"time to votable:   {sum(result[0] for result in posted) / len(posted) * 1000:8.1f} ms avg")
+            print(f"all emojis on:     {sum(result[1] for result in posted) / len(posted) * 1000:8.1f} ms avg")
+
+if __name__ == "__main__":
+    main()
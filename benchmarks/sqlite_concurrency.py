@@ -0,0 +1,191 @@
+"""
+Reaction vote writes racing dashboard reads on a file SQLite database,
+with the old setup (rollback journal, one shared pool) and with WAL plus a
+single writer connection and a read-only pool.
+
+Usage: python benchmarks/sqlite_concurrency.py [seconds] [writers] [readers]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import datetime
+import threading
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db
+import models
+from db_routing import sqlite_engine_config, configure_sqlite_engines, READONLY
+
+POLLS = 200
+OPTIONS = ['Option 1', 'Option 2', 'Option 3']
+SEED_VOTES = 200000
+
+CONFIG = {
+    'SQLITE_WAL': True,
+    'SQLITE_READ_POOL_SIZE': 4,
+    'SQLITE_BUSY_TIMEOUT_MS': 5000,
+    'SQLITE_CACHE_SIZE_KB': 65536,
+    'SQLITE_MMAP_SIZE': 268435456,
+}
+
+# What a reaction vote does: insert the vote, then bump the tally and poll version
+WRITE = [
+    ("INSERT INTO vote (poll_id, user_id, username, option_id, weight, voted_at) "
+     "VALUES (:poll_id, :user_id, 'user', :option_id, 1, :now)"),
+    ("UPDATE poll_tally SET weight = weight + 1, votes = votes + 1 "
+     "WHERE poll_id = :poll_id AND option_id = :option_id"),
+    "UPDATE poll SET tally_version = tally_version + 1 WHERE id = :poll_id",
+]
+
+# What a dashboard page load reads
+READS = [
+    "SELECT count(*) FROM poll",
+    "SELECT count(*) FROM poll WHERE status = 'active'",
+    "SELECT coalesce(sum(votes), 0) FROM poll_tally",
+    "SELECT * FROM poll ORDER BY created_at DESC LIMIT 25",
+    "SELECT option_id, weight FROM poll_tally WHERE poll_id = :poll_id",
+    "SELECT user_id, option_id FROM vote WHERE poll_id = :poll_id",
+]
+
+def option_id(poll_id, position):
+    return (poll_id - 1) * len(OPTIONS) + position + 1
+
+def populate(path):
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    now = datetime.datetime.now()
+    rng = random.Random(42)
+    
+    with engine.begin() as conn:
+        conn.execute(models.Server.__table__.insert(), [{'id': 1, 'name': 'Server'}])
+        conn.execute(models.Channel.__table__.insert(), [{'id': 2, 'server_id': 1, 'name': 'polls', 'type': 'text'}])
+        conn.execute(models.Poll.__table__.insert(), [
+            {
+                'id': poll_id, 'server_id': 1, 'channel_id': 2, 'question': f'Question {poll_id}',
+                'status': 'active',
+                'created_at': now, 'tally_version': 0
+            }
+            for poll_id in range(1, POLLS + 1)
+        ])
+        conn.execute(models.PollOption.__table__.insert(), [
+            {'id': option_id(poll_id, position), 'poll_id': poll_id, 'position': position, 'label': label}
+            for poll_id in range(1, POLLS + 1) for position, label in enumerate(OPTIONS)
+        ])
+        conn.execute(models.PollTally.__table__.insert(), [
+            {'poll_id': poll_id, 'option_id': option_id(poll_id, position), 'weight': 0, 'votes': 0}
+            for poll_id in range(1, POLLS + 1) for position in range(len(OPTIONS))
+        ])
+        votes = []
+        for _ in range(SEED_VOTES):
+            poll_id = rng.randint(1, POLLS)
+            votes.append({
+                'poll_id': poll_id, 'user_id': rng.randint(1, 10 ** 6), 'username': 'user',
+                'option_id': option_id(poll_id, rng.randrange(len(OPTIONS))), 'weight': 1, 'voted_at': now
+            })
+        conn.execute(models.Vote.__table__.insert(), votes)
+    engine.dispose()
+
+def legacy_engines(path):
+    # The previous setup: default journal mode, one pool for everything
+    engine = create_engine(f"sqlite:///{path}", pool_recycle=300, pool_pre_ping=True)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=DELETE")
+    return engine, engine
+
+def routed_engines(path):
+    uri = f"sqlite:///{path}"
+    engine_options, binds = sqlite_engine_config(uri, CONFIG)
+    writer = create_engine(uri, **engine_options)
+    reader_options = dict(binds[READONLY])
+    reader = create_engine(reader_options.pop('url'), **reader_options)
+    configure_sqlite_engines({None: writer, READONLY: reader}, CONFIG)
+    return writer, reader
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(label, writer, reader, seconds, writers, readers):
+    stop = time.monotonic() + seconds
+    lock = threading.Lock()
+    stats = {'writes': 0, 'reads': 0, 'write_errors': 0, 'read_errors': 0, 'write_ms': [], 'read_ms': []}
+    
+    def write_loop(seed):
+        rng = random.Random(seed)
+        while time.monotonic() < stop:
+            poll_id = rng.randint(1, POLLS)
+            params = {
+                'poll_id': poll_id, 'user_id': rng.randint(1, 10 ** 6),
+                'option_id': option_id(poll_id, rng.randrange(len(OPTIONS))), 'now': datetime.datetime.now()
+            }
+            started = time.perf_counter()
+            try:
+                with writer.begin() as conn:
+                    for sql in WRITE:
+                        conn.execute(text(sql), params)
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    stats['writes'] += 1
+                    stats['write_ms'].append(elapsed)
+            except OperationalError:
+                with lock:
+                    stats['write_errors'] += 1
+    
+    def read_loop(seed):
+        rng = random.Random(seed)
+        while time.monotonic() < stop:
+            params = {'poll_id': rng.randint(1, POLLS)}
+            started = time.perf_counter()
+            try:
+                with reader.connect() as conn:
+                    for sql in READS:
+                        conn.execute(text(sql), params).fetchall()
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    stats['reads'] += 1
+                    stats['read_ms'].append(elapsed)
+            except OperationalError:
+                with lock:
+                    stats['read_errors'] += 1
+    
+    threads = [threading.Thread(target=write_loop, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=read_loop, args=(1000 + i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    print(f"\n=== {label} ===")
+    print(f"votes/s:       {stats['writes'] / seconds:8.1f}  (errors: {stats['write_errors']})")
+    print(f"vote p50/p99:  {percentile(stats['write_ms'], 0.5):8.2f} / {percentile(stats['write_ms'], 0.99):.2f} ms")
+    print(f"page loads/s:  {stats['reads'] / seconds:8.1f}  (errors: {stats['read_errors']})")
+    print(f"page p50/p99:  {percentile(stats['read_ms'], 0.5):8.2f} / {percentile(stats['read_ms'], 0.99):.2f} ms")
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    
+    with tempfile.TemporaryDirectory() as directory:
+        for label, make_engines in (
+            ("Rollback journal, shared pool", legacy_engines),
+            ("WAL, single writer + read-only pool", routed_engines),
+        ):
+            path = os.path.join(directory, f"{make_engines.__name__}.db")
+            print(f"Populating {label.lower()} database...")
+            populate(path)
+            
+            writer, reader = make_engines(path)
+            run(label, writer, reader, seconds, writers, readers)
+            writer.dispose()
+            reader.dispose()
+
+if __name__ == "__main__":
+    main()
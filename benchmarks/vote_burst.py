@@ -0,0 +1,136 @@
+"""
+A synthetic burst of reaction votes written one commit per reaction (the
+old reaction handlers) and through the group-commit vote pipeline.
+
+Usage: python benchmarks/vote_burst.py [reactions] [batch size] [batch ms]
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app picks its database up at import time
+_directory = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directory, 'vote_burst.db')}"
+
+from app import app, db
+import models
+from polls import create_poll, seed_tallies, rebuild_tallies
+from poll_index import PollEntry
+from vote_pipeline import VotePipeline, apply_batch, CAST, WITHDRAW
+from vote_state import vote_state
+from db_executor import run_db
+
+POLLS = 20
+USERS = 2000
+
+def setup():
+    with app.app_context():
+        db.create_all()
+        db.session.add(models.Server(id=1, name='Server'))
+        db.session.add(models.Channel(id=2, server_id=1, name='polls', type='text'))
+        db.session.commit()
+        
+        entries = []
+        for number in range(POLLS):
+            # Half single-choice polls (votes change), half multiple-choice
+            poll = create_poll(
+                1, 2, f'Question {number}', ['Option 1', 'Option 2', 'Option 3', 'Option 4'],
+                allow_multiple=bool(number % 2), max_votes=0, allow_vote_change=True
+            )
+            poll.status = 'active'
+            poll.message_id = 1000 + number
+            seed_tallies(poll.id, poll.get_option_ids())
+            db.session.commit()
+            entries.append(PollEntry.from_poll(poll))
+        return entries
+
+def reactions(entries, count):
+    # Mostly adds, some removals of the same emoji
+    rng = random.Random(7)
+    events = []
+    for _ in range(count):
+        entry = rng.choice(entries)
+        user_id = rng.randint(1, USERS)
+        option_id = rng.choice(entry.option_ids)
+        if rng.random() < 0.15:
+            events.append((WITHDRAW, (entry.id, user_id, option_id)))
+        else:
+            events.append((CAST, (entry, 1, [], user_id, f'user{user_id}', option_id)))
+    return events
+
+def reset(entries):
+    with app.app_context():
+        models.Vote.query.delete()
+        db.session.commit()
+        rebuild_tallies()
+    for entry in entries:
+        vote_state.evict(entry.id)
+
+def tallies():
+    with app.app_context():
+        return sorted(
+            (tally.poll_id, tally.option_id, tally.weight, tally.votes) for tally in models.PollTally.query
+        )
+
+async def per_reaction(events):
+    # One commit per reaction, with each user's reactions applied in order
+    locks = {}
+    
+    async def handle(kind, args):
+        user = (args[0].id if kind == CAST else args[0], args[3] if kind == CAST else args[1])
+        lock = locks.setdefault(user, asyncio.Lock())
+        started = time.perf_counter()
+        async with lock:
+            await run_db(apply_batch, [(kind, args)])
+        return time.perf_counter() - started
+    
+    return await asyncio.gather(*(handle(kind, args) for kind, args in events))
+
+async def pipelined(events, batch_size, max_delay):
+    pipeline = VotePipeline(batch_size, max_delay)
+    
+    async def handle(kind, args):
+        started = time.perf_counter()
+        await pipeline.submit(kind, *args)
+        return time.perf_counter() - started
+    
+    return await asyncio.gather(*(handle(kind, args) for kind, args in events))
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def report(label, seconds, latencies):
+    print(f"\n=== {label} ===")
+    print(f"total:        {seconds:8.2f} s")
+    print(f"reactions/s:  {len(latencies) / seconds:8.0f}")
+    print(f"ack p50/p99:  {percentile(latencies, 0.5) * 1000:8.1f} / {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else app.config["VOTE_BATCH_SIZE"]
+    batch_ms = float(sys.argv[3]) if len(sys.argv) > 3 else app.config["VOTE_BATCH_MS"]
+    
+    entries = setup()
+    events = reactions(entries, count)
+    print(f"{count} reactions on {POLLS} polls from {USERS} users")
+    
+    started = time.perf_counter()
+    latencies = asyncio.run(per_reaction(events))
+    report("Commit per reaction", time.perf_counter() - started, latencies)
+    expected = tallies()
+    
+    reset(entries)
+    started = time.perf_counter()
+    latencies = asyncio.run(pipelined(events, batch_size, batch_ms / 1000))
+    report(f"Group commits (batch {batch_size}, {batch_ms:g} ms)", time.perf_counter() - started, latencies)
+    
+    print(f"\nSame final tallies: {tallies() == expected}")
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,28 @@ import discord
 import asyncio
 import logging
 import datetime
+import time
 import json
 from discord.ext import commands, tasks
-import matplotlib.pyplot as plt
 import io
 from app import app, db
-from models import Server, Channel, Role, Poll, Vote, BotConfig
+from models import Server, Poll, BotConfig
+from polls import seed_tallies, chart_service, chart_theme, queue_status_change
+from charts import poll_chart_args
+from embed_updater import EmbedUpdater
+from poll_index import poll_index
+from role_weights import role_weights
+from db_executor import run_db
+from vote_pipeline import vote_pipeline
+from vote_state import vote_state
+from reaction_seeder import reaction_seeder, BACKGROUND
+from vote_feedback import vote_feedback
+from reconciler import ReactionReconciler
+from loop_monitor import measure_blocking, probe_loop_lag
+from poll_scheduler import PollScheduler, POST, CLOSE
+from poll_workers import PollWorkerPool
+import guild_sync
+import metrics
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -25,474 +41,678 @@ bot = commands.Bot(command_prefix='!', intents=intents)
 # Dictionary to store emojis for poll options
 OPTION_EMOJIS = ['1️⃣', '2️⃣', '3️⃣', '4️⃣', '5️⃣', '6️⃣', '7️⃣', '8️⃣', '9️⃣', '🔟']
 
+# Custom ID prefix of poll buttons (poll:<poll ID>:<option ID>) and select menus (poll:<poll ID>:select)
+VOTE_ID_PREFIX = 'poll'
+
+# Database work below runs on the DB executor (see run_db), never on the event loop
+
+def _index_active_polls():
+    poll_index.load(Poll.query.filter(
+        Poll.status == "active",
+        Poll.message_id != None
+    ).all())
+    return len(poll_index)
+
+def _schedulable_polls():
+    # Drafts waiting to be posted and active polls with a closing time
+    return [tuple(row) for row in Poll.query.with_entities(
+        Poll.id, Poll.channel_id, Poll.status, Poll.scheduled_for, Poll.expires_at
+    ).filter(
+        (Poll.status == "draft") | ((Poll.status == "active") & (Poll.expires_at != None))
+    )]
+
+def _due_polls(now):
+    # Scheduled polls and unscheduled draft polls (like resent polls)
+    drafts = [tuple(row) for row in Poll.query.with_entities(
+        Poll.id, Poll.channel_id, Poll.scheduled_for
+    ).filter(
+        Poll.status == "draft"
+    ).filter(
+        (Poll.scheduled_for == None) | (Poll.scheduled_for <= now)
+    )]
+    
+    expired = [tuple(row) for row in Poll.query.with_entities(
+        Poll.id, Poll.channel_id, Poll.expires_at
+    ).filter(
+        Poll.status == "active",
+        Poll.expires_at <= now
+    )]
+    
+    return drafts, expired
+
+def _load_poll(poll_id, with_results=False):
+    # Detach the poll so its loaded columns stay readable on the event loop
+    poll = Poll.query.get(poll_id)
+    if not poll:
+        return None, {}
+    
+    results = poll.get_results() if with_results else {}
+    db.session.expunge(poll)
+    return poll, results
+
+def _update_poll(poll_id, **fields):
+    Poll.query.filter_by(id=poll_id).update(fields)
+    db.session.commit()
+
+def _activate_poll(poll_id, message_id, option_ids):
+    old_status = Poll.query.with_entities(Poll.status).filter_by(id=poll_id).scalar()
+    queue_status_change(poll_id, old_status, "active")
+    Poll.query.filter_by(id=poll_id).update({'message_id': message_id, 'status': "active"})
+    seed_tallies(poll_id, option_ids)
+    db.session.commit()
+
+def _default_channel_id(server_id):
+    server = Server.query.get(server_id)
+    return server.default_channel_id if server else None
+
+def _close_poll_record(poll_id):
+    # Mark an active poll closed and return it with its final results and chart theme
+    poll = Poll.query.get(poll_id)
+    if not poll or poll.status != "active":
+        return None, {}, None
+    
+    results = poll.get_results()
+    theme = chart_theme()
+    db.session.expunge(poll)
+    
+    Poll.query.filter_by(id=poll_id).update({'status': "closed"})
+    queue_status_change(poll_id, "active", "closed")
+    db.session.commit()
+    
+    poll.status = "closed"
+    return poll, results, theme
+
+# Task measuring how long the event loop gets blocked (see loop_monitor)
+_lag_probe = None
+
 @bot.event
+@measure_blocking
 async def on_ready():
+    global _lag_probe
     logger.info(f'Bot logged in as {bot.user.name} ({bot.user.id})')
     
+    # Route reactions for already posted polls
+    indexed = await run_db(_index_active_polls)
+    logger.info(f'Indexed {indexed} active polls')
+    
+    # Post and close polls at their exact times
+    poll_scheduler.start(asyncio.get_running_loop())
+    poll_scheduler.seed(await run_db(_schedulable_polls))
+    logger.info(f'Scheduled {poll_scheduler.pending()} poll deadlines')
+    
     # Start background tasks
-    check_polls.start()
-    sync_servers.start()
+    if not check_polls.is_running():
+        check_polls.start()
+    if not sync_servers.is_running():
+        sync_servers.start()
+    if not flush_poll_embeds.is_running():
+        flush_poll_embeds.start()
+    if not flush_vote_feedback.is_running():
+        flush_vote_feedback.start()
+    if _lag_probe is None or _lag_probe.done():
+        _lag_probe = asyncio.create_task(probe_loop_lag())
+    
+    # Catch up on reactions added or removed while the bot was offline
+    reconciler.start(poll_index.entries(), 'ready')
     
     # Set custom status
     await bot.change_presence(activity=discord.Activity(
-        type=discord.ActivityType.watching, 
+        type=discord.ActivityType.watching,
         name="polls via dashboard"
     ))
 
 @bot.event
+async def on_resumed():
+    # Reaction events missed while the gateway was disconnected aren't replayed
+    reconciler.start(poll_index.entries(), 'resumed')
+
+@bot.event
+@measure_blocking
 async def on_guild_join(guild):
-    with app.app_context():
-        # Add server to database
-        server = Server.query.get(guild.id)
-        if not server:
-            server = Server(
-                id=guild.id,
-                name=guild.name,
-                icon=str(guild.icon.url) if guild.icon else None
-            )
-            db.session.add(server)
-        
-        # Add channels to database
-        for channel in guild.channels:
-            if isinstance(channel, discord.TextChannel):
-                db_channel = Channel.query.get(channel.id)
-                if not db_channel:
-                    db_channel = Channel(
-                        id=channel.id,
-                        server_id=guild.id,
-                        name=channel.name,
-                        type='text'
-                    )
-                    db.session.add(db_channel)
-        
-        # Add roles to database
-        for role in guild.roles:
-            db_role = Role.query.get(role.id)
-            if not db_role:
-                db_role = Role(
-                    id=role.id,
-                    server_id=guild.id,
-                    name=role.name,
-                    color=role.color.value if role.color else 0,
-                    position=role.position,
-                    vote_weight=1  # Default weight
-                )
-                db.session.add(db_role)
-        
-        db.session.commit()
-        logger.info(f'Added server {guild.name} to database')
+    # Add server, channels and roles to database
+    await run_db(guild_sync.sync_guilds, [guild_sync.guild_snapshot(guild)])
+    role_weights.invalidate(guild.id)
+    logger.info(f'Added server {guild.name} to database')
+
+# Guild, channel and role events keep the database current between full syncs
+
+@bot.event
+async def on_guild_update(before, after):
+    if before.name != after.name or before.icon != after.icon:
+        await run_db(guild_sync.update_server, after.id, after.name, str(after.icon.url) if after.icon else None)
+
+@bot.event
+async def on_guild_channel_create(channel):
+    if isinstance(channel, discord.TextChannel):
+        await run_db(guild_sync.upsert_channel, guild_sync.channel_row(channel))
 
 @bot.event
+async def on_guild_channel_update(before, after):
+    if isinstance(after, discord.TextChannel) and before.name != after.name:
+        await run_db(guild_sync.upsert_channel, guild_sync.channel_row(after))
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    if isinstance(channel, discord.TextChannel):
+        await run_db(guild_sync.delete_channel, channel.id)
+
+@bot.event
+async def on_guild_role_create(role):
+    await run_db(guild_sync.upsert_role, guild_sync.role_row(role))
+    role_weights.invalidate(role.guild.id)
+
+@bot.event
+async def on_guild_role_update(before, after):
+    await run_db(guild_sync.upsert_role, guild_sync.role_row(after))
+    role_weights.invalidate(after.guild.id)
+
+@bot.event
+async def on_guild_role_delete(role):
+    await run_db(guild_sync.delete_role, role.id)
+    role_weights.invalidate(role.guild.id)
+
+def _vote_reply(poll, outcome, option):
+    # Feedback for a reaction or button vote
+    if outcome == 'removed':
+        return f"✅ Your vote for **{option}** has been removed!"
+    if outcome == 'change_blocked':
+        return "❌ You have already voted and vote changing is not allowed for this poll."
+    if outcome == 'limit_reached':
+        return f"❌ You have reached the maximum number of votes ({poll.max_votes}) for this poll."
+    if outcome == 'changed':
+        return f"✅ Your vote has been changed to **{option}**!"
+    return f"✅ Your vote for **{option}** has been recorded!"
+
+@bot.event
+@measure_blocking
 async def on_raw_reaction_add(payload):
     if payload.user_id == bot.user.id:
         return
     
-    with app.app_context():
-        # Check if reaction is for a poll
-        poll = Poll.query.filter_by(message_id=payload.message_id).first()
-        if not poll or not poll.is_active():
-            return
-        
-        # Get the guild and member
-        guild = bot.get_guild(payload.guild_id)
-        if not guild:
-            return
-        
-        member = guild.get_member(payload.user_id)
-        if not member:
-            return
-        
-        # Get emoji and check if it's a valid poll option
-        emoji = str(payload.emoji)
-        
-        options = poll.get_options()
-        if emoji not in OPTION_EMOJIS[:len(options)]:
-            # Remove invalid reaction and notify user
-            channel = bot.get_channel(payload.channel_id)
-            message = await channel.fetch_message(payload.message_id)
-            await message.remove_reaction(payload.emoji, member)
-            try:
-                await channel.send(f"<@{payload.user_id}> ❌ Invalid reaction! Please use only the provided poll options.", delete_after=3)
-            except:
-                pass
-            return
-        
-        # Get option index from emoji
-        option_index = OPTION_EMOJIS.index(emoji)
-        if option_index >= len(options):
-            return
-        
-        selected_option = options[option_index]
-        
-        # Get user's highest role for vote weight
-        highest_role = None
-        highest_weight = 1
-        
-        for role in member.roles:
-            db_role = Role.query.get(role.id)
-            if db_role and db_role.vote_weight > highest_weight:
-                highest_weight = db_role.vote_weight
-                highest_role = db_role
-        
-        # Check if user already voted
-        # Get all user's votes for this poll
-        user_votes = Vote.query.filter_by(
-            poll_id=poll.id,
-            user_id=payload.user_id
-        ).all()
-        
-        # Check if user already voted for this specific option
-        existing_vote = next((vote for vote in user_votes if vote.option == selected_option), None)
-        
-        if existing_vote:
-            # User already voted for this option, remove the vote (toggle functionality)
-            db.session.delete(existing_vote)
-            db.session.commit()
-            
-            # Remove user reaction for anonymous polls to maintain privacy
-            if poll.is_anonymous:
-                channel = bot.get_channel(payload.channel_id)
-                message = await channel.fetch_message(payload.message_id)
-                await message.remove_reaction(payload.emoji, member)
-            
-            # Update poll embed with live results if enabled
-            if poll.show_live_results:
-                await update_poll_embed(poll.id)
-            return
-            
-        # Handle vote limits and changes
-        if not poll.allow_multiple:
-            # Single vote mode: replace existing vote if allowed
-            if user_votes:
-                if not poll.allow_vote_change:
-                    # Remove the reaction if vote changing is not allowed
-                    channel = bot.get_channel(payload.channel_id)
-                    message = await channel.fetch_message(payload.message_id)
-                    await message.remove_reaction(payload.emoji, member)
+    # Check if reaction is for a reaction poll without touching the database
+    poll = poll_index.get(payload.message_id)
+    if not poll or not poll.is_active() or poll.vote_mode != 'reactions':
+        return
+    
+    # Get the guild and member
+    guild = bot.get_guild(payload.guild_id)
+    if not guild:
+        return
+    
+    member = guild.get_member(payload.user_id)
+    if not member:
+        return
+    
+    # Get emoji and check if it's a valid poll option
+    emoji = str(payload.emoji)
+    channel = bot.get_channel(payload.channel_id)
+    
+    options = poll.get_options()
+    if emoji not in OPTION_EMOJIS[:len(options)]:
+        # Remove invalid reaction and notify user
+        message = await channel.fetch_message(payload.message_id)
+        await message.remove_reaction(payload.emoji, member)
+        vote_feedback.notify(channel, member, "❌ Invalid reaction! Please use only the provided poll options.")
+        return
+    
+    # Get option index from emoji
+    option_index = OPTION_EMOJIS.index(emoji)
+    if option_index >= len(options):
+        return
+    
+    selected_option = options[option_index]
+    option_ids = poll.get_option_ids()
+    
+    # Queued for the next group commit; everything below is acknowledged after it
+    outcome, old_option_id = await vote_pipeline.cast(
+        poll,
+        guild.id,
+        [role.id for role in member.roles],
+        payload.user_id,
+        member.display_name,
+        option_ids[option_index]
+    )
+    
+    if outcome == 'present':
+        # Already recorded for this reaction, e.g. by a reconciliation run
+        return
+    
+    if outcome == 'change_blocked':
+        # Remove the reaction if vote changing is not allowed
+        message = await channel.fetch_message(payload.message_id)
+        await message.remove_reaction(payload.emoji, member)
+        vote_feedback.notify(channel, member, _vote_reply(poll, outcome, selected_option), poll.is_anonymous)
+        return
+    
+    if outcome == 'limit_reached':
+        # Remove the reaction if vote limit reached
+        message = await channel.fetch_message(payload.message_id)
+        await message.remove_reaction(payload.emoji, member)
+        vote_feedback.notify(channel, member, _vote_reply(poll, outcome, selected_option), poll.is_anonymous)
+        return
+    
+    if outcome == 'changed':
+        # Get fresh message to remove the reaction for the replaced vote
+        message = await channel.fetch_message(payload.message_id)
+        
+        for reaction in message.reactions:
+            if str(reaction.emoji) in OPTION_EMOJIS:
+                option_idx = OPTION_EMOJIS.index(str(reaction.emoji))
+                if option_idx < len(option_ids) and option_ids[option_idx] == old_option_id:
                     try:
-                        await channel.send(f"<@{payload.user_id}> ❌ You have already voted and vote changing is not allowed for this poll.", delete_after=3)
+                        await reaction.remove(member)
                     except:
                         pass
-                    return
-                
-                # Store the old option before deleting
-                old_option = user_votes[0].option
-                
-                # Delete old vote and create new one to avoid stale data issues
-                for old_vote in user_votes:
-                    db.session.delete(old_vote)
-                    
-                # Commit the deletion first
-                db.session.commit()
-                
-                # Get fresh message to remove old reaction
-                channel = bot.get_channel(payload.channel_id)
-                message = await channel.fetch_message(payload.message_id)
-                
-                # Find and remove old reaction based on the stored old option
-                for reaction in message.reactions:
-                    if str(reaction.emoji) in OPTION_EMOJIS:
-                        option_idx = OPTION_EMOJIS.index(str(reaction.emoji))
-                        if option_idx < len(options) and options[option_idx] == old_option:
-                            try:
-                                await reaction.remove(member)
-                            except:
-                                pass
-                            break
-                
-                # Create new vote
-                new_vote = Vote(
-                    poll_id=poll.id,
-                    user_id=payload.user_id,
-                    username=member.display_name,
-                    option=selected_option,
-                    weight=highest_weight
-                )
-                db.session.add(new_vote)
-                db.session.commit()
-            else:
-                # Create new vote
-                new_vote = Vote(
-                    poll_id=poll.id,
-                    user_id=payload.user_id,
-                    username=member.display_name,
-                    option=selected_option,
-                    weight=highest_weight
-                )
-                db.session.add(new_vote)
-                db.session.commit()
-        else:
-            # Multiple votes mode
-            
-            # Check if max votes limit is reached
-            if poll.max_votes > 0 and len(user_votes) >= poll.max_votes:
-                # Remove the reaction if vote limit reached
-                channel = bot.get_channel(payload.channel_id)
-                message = await channel.fetch_message(payload.message_id)
-                await message.remove_reaction(payload.emoji, member)
-                try:
-                    await channel.send(f"<@{payload.user_id}> ❌ You have reached the maximum number of votes ({poll.max_votes}) for this poll.", delete_after=3)
-                except:
-                    pass
-                return
-            
-            # Add new vote for different option
-            new_vote = Vote(
-                poll_id=poll.id,
-                user_id=payload.user_id,
-                username=member.display_name,
-                option=selected_option,
-                weight=highest_weight
-            )
-            db.session.add(new_vote)
-            db.session.commit()
-        
-        # Send confirmation message in channel (temporary message that auto-deletes)
-        try:
-            channel = bot.get_channel(payload.channel_id)
-            if existing_vote:
-                if existing_vote.option == selected_option:
-                    await channel.send(f"<@{payload.user_id}> ✅ Your vote for **{selected_option}** has been removed!", delete_after=3)
-                else:
-                    await channel.send(f"<@{payload.user_id}> ✅ Your vote has been changed to **{selected_option}**!", delete_after=3)
-            else:
-                await channel.send(f"<@{payload.user_id}> ✅ Your vote for **{selected_option}** has been recorded!", delete_after=3)
-        except:
-            pass
-
-        # Remove user reaction for anonymous polls to maintain privacy
-        if poll.is_anonymous:
-            channel = bot.get_channel(payload.channel_id)
-            message = await channel.fetch_message(payload.message_id)
-            await message.remove_reaction(payload.emoji, member)
-        
-        # Update poll embed with live results if enabled
-        if poll.show_live_results:
-            await update_poll_embed(poll.id)
+                    break
+    
+    # Confirm the vote through the feedback strategy; toggled-off votes on
+    # reactions only update the results
+    if outcome != 'removed':
+        vote_feedback.notify(channel, member, _vote_reply(poll, outcome, selected_option), poll.is_anonymous)
+    
+    # Remove user reaction for anonymous polls to maintain privacy
+    if poll.is_anonymous:
+        message = await channel.fetch_message(payload.message_id)
+        await message.remove_reaction(payload.emoji, member)
+    
+    # Update poll embed with live results if enabled
+    if poll.show_live_results:
+        embed_updater.mark_dirty(poll.id)
 
 @bot.event
+@measure_blocking
 async def on_raw_reaction_remove(payload):
     if payload.user_id == bot.user.id:
         return
     
-    with app.app_context():
-        # Check if reaction is for a poll
-        poll = Poll.query.filter_by(message_id=payload.message_id).first()
-        if not poll or not poll.is_active():
-            return
-        
-        # Don't remove votes for anonymous polls when reactions are auto-removed
-        if poll.is_anonymous:
-            return
-        
-        # Get emoji and check if it's a valid poll option
-        emoji = str(payload.emoji)
-        
-        options = poll.get_options()
-        if emoji not in OPTION_EMOJIS[:len(options)]:
-            return
-        
-        # Get option index from emoji
-        option_index = OPTION_EMOJIS.index(emoji)
-        if option_index >= len(options):
-            return
-        
-        selected_option = options[option_index]
-        
-        # Remove vote
-        vote = Vote.query.filter_by(
-            poll_id=poll.id,
-            user_id=payload.user_id,
-            option=selected_option
-        ).first()
-        
-        if vote:
-            db.session.delete(vote)
-            db.session.commit()
-            
-            # Send confirmation message to user for vote removal
-            try:
-                channel = bot.get_channel(payload.channel_id)
-                await channel.send(f"<@{payload.user_id}> ✅ Your vote for **{selected_option}** has been removed!", delete_after=3)
-            except:
-                pass
-        
-        # Update poll embed with live results if enabled
-        if poll.show_live_results:
-            await update_poll_embed(poll.id)
+    # Check if reaction is for a reaction poll without touching the database
+    poll = poll_index.get(payload.message_id)
+    if not poll or not poll.is_active() or poll.vote_mode != 'reactions':
+        return
+    
+    # Don't remove votes for anonymous polls when reactions are auto-removed
+    if poll.is_anonymous:
+        return
+    
+    # Get emoji and check if it's a valid poll option
+    emoji = str(payload.emoji)
+    
+    options = poll.get_options()
+    if emoji not in OPTION_EMOJIS[:len(options)]:
+        return
+    
+    # Get option index from emoji
+    option_index = OPTION_EMOJIS.index(emoji)
+    if option_index >= len(options):
+        return
+    
+    selected_option = options[option_index]
+    
+    # Remove vote
+    removed = await vote_pipeline.withdraw(poll.id, payload.user_id, poll.get_option_ids()[option_index])
+    
+    if removed:
+        # Confirm the vote removal through the feedback strategy
+        guild = bot.get_guild(payload.guild_id)
+        member = guild.get_member(payload.user_id) if guild else None
+        channel = bot.get_channel(payload.channel_id)
+        if member and channel:
+            vote_feedback.notify(channel, member, _vote_reply(poll, 'removed', selected_option), poll.is_anonymous)
+    
+    # Update poll embed with live results if enabled
+    if poll.show_live_results:
+        embed_updater.mark_dirty(poll.id)
+
+def _parse_vote_id(custom_id):
+    # (poll ID, option ID or 'select') of a poll component, or None for other components
+    parts = custom_id.split(':')
+    if len(parts) != 3 or parts[0] != VOTE_ID_PREFIX or not parts[1].isdigit():
+        return None
+    return int(parts[1]), parts[2]
+
+def _select_reply(poll, outcome, chosen):
+    if outcome == 'change_blocked':
+        return "❌ You have already voted and vote changing is not allowed for this poll."
+    if outcome == 'limit_reached':
+        return f"❌ You can vote for at most {poll.max_votes or 1} options in this poll."
+    if not chosen:
+        return "✅ Your vote has been removed!" if outcome == 'recorded' else "You haven't voted in this poll."
+    if outcome == 'unchanged':
+        return f"Your vote is already **{'**, **'.join(chosen)}**."
+    return f"✅ Your vote for **{'**, **'.join(chosen)}** has been recorded!"
+
+async def _answer_in_time(interaction, vote):
+    # Wait for the vote's group commit, deferring the interaction if the commit is slow
+    task = asyncio.ensure_future(vote)
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), app.config["INTERACTION_ACK_SECONDS"])
+    except asyncio.TimeoutError:
+        # The reply then goes out as a followup once the vote is stored
+        try:
+            await interaction.response.defer(ephemeral=True)
+            metrics.incr('interactions.deferred')
+        except discord.HTTPException as e:
+            logger.warning(f"Failed to defer vote interaction: {str(e)}")
+        return await task
+
+@bot.event
+@measure_blocking
+async def on_interaction(interaction):
+    # Button and select menu votes; answered with a single reply (see vote_feedback)
+    if interaction.type != discord.InteractionType.component or not interaction.message:
+        return
+    
+    vote_id = _parse_vote_id(interaction.data.get('custom_id', ''))
+    if not vote_id:
+        return
+    poll_id, target = vote_id
+    
+    # Check if the poll is still open without touching the database
+    poll = poll_index.get(interaction.message.id)
+    if not poll or poll.id != poll_id or not poll.is_active() or not isinstance(interaction.user, discord.Member):
+        await vote_feedback.reply(interaction, "❌ This poll isn't open for votes.")
+        return
+    
+    # Components of an edited poll can still name options it no longer has
+    labels = dict(zip(poll.option_ids, poll.options))
+    values = interaction.data.get('values', []) if target == 'select' else [target]
+    option_ids = [int(value) for value in values if value.isdigit()]
+    if len(option_ids) != len(values) or any(option_id not in labels for option_id in option_ids):
+        await vote_feedback.reply(interaction, "❌ That option is no longer part of this poll.")
+        return
+    
+    member = interaction.user
+    role_ids = [role.id for role in member.roles]
+    
+    if target == 'select':
+        vote = vote_pipeline.choose(poll, interaction.guild_id, role_ids, member.id, member.display_name, option_ids)
+    else:
+        vote = vote_pipeline.cast(poll, interaction.guild_id, role_ids, member.id, member.display_name, option_ids[0])
+    
+    try:
+        result = await _answer_in_time(interaction, vote)
+        if target == 'select':
+            outcome = result
+            reply = _select_reply(poll, outcome, [labels[option_id] for option_id in option_ids])
+        else:
+            outcome, _ = result
+            reply = _vote_reply(poll, outcome, labels[option_ids[0]])
+    except Exception as e:
+        logger.error(f"Failed to record interaction vote on poll {poll.id}: {str(e)}")
+        await vote_feedback.reply(interaction, "❌ Your vote could not be recorded, please try again.")
+        return
+    
+    await vote_feedback.reply(interaction, reply)
+    
+    # Update poll embed with live results if enabled
+    if poll.show_live_results and outcome in ('removed', 'changed', 'recorded'):
+        embed_updater.mark_dirty(poll.id)
 
-@tasks.loop(minutes=1)
+@tasks.loop(minutes=app.config["POLL_SWEEP_MINUTES"])
+@measure_blocking
 async def check_polls():
-    with app.app_context():
-        now = datetime.datetime.now()
-        
-        # Post scheduled polls and unscheduled draft polls (like resent polls)
-        draft_polls = Poll.query.filter(
-            Poll.status == "draft"
-        ).filter(
-            (Poll.scheduled_for == None) | (Poll.scheduled_for <= now)
-        ).all()
-        
-        for poll in draft_polls:
-            await post_poll(poll.id)
-        
-        # Close expired polls
-        expired_polls = Poll.query.filter(
-            Poll.status == "active",
-            Poll.expires_at <= now
-        ).all()
-        
-        for poll in expired_polls:
-            await close_poll(poll.id)
+    # Safety net for the poll scheduler: catch anything whose deadline was missed
+    now = datetime.datetime.now()
+    drafts, expired = await run_db(_due_polls, now)
+    
+    if drafts or expired:
+        logger.info(f"Sweep found {len(drafts)} due drafts and {len(expired)} expired polls")
+    
+    # Post scheduled polls and unscheduled draft polls (like resent polls)
+    for poll_id, channel_id, scheduled_for in drafts:
+        poll_scheduler.run_now(poll_id, POST, channel_id, scheduled_for)
+    
+    # Close expired polls
+    for poll_id, channel_id, expires_at in expired:
+        poll_scheduler.run_now(poll_id, CLOSE, channel_id, expires_at)
 
-@tasks.loop(hours=1)
+@tasks.loop(seconds=app.config["EMBED_UPDATE_INTERVAL"])
+async def flush_poll_embeds():
+    try:
+        await embed_updater.flush()
+    except Exception as e:
+        # An exception would end the loop and with it every live result update
+        logger.error(f"Failed to flush poll embeds: {str(e)}")
+
+@tasks.loop(seconds=app.config["VOTE_FEEDBACK_SECONDS"])
+async def flush_vote_feedback():
+    await vote_feedback.flush()
+
+@tasks.loop(hours=app.config["GUILD_SYNC_HOURS"])
+@measure_blocking
 async def sync_servers():
-    with app.app_context():
-        # Update server info
-        for guild in bot.guilds:
-            server = Server.query.get(guild.id)
-            if not server:
-                server = Server(
-                    id=guild.id,
-                    name=guild.name,
-                    icon=str(guild.icon.url) if guild.icon else None
-                )
-                db.session.add(server)
-            else:
-                server.name = guild.name
-                server.icon = str(guild.icon.url) if guild.icon else None
+    # Full reconciliation of server, channel and role info; guild events keep
+    # things current in between, so this mainly catches changes missed offline
+    snapshots = [guild_sync.guild_snapshot(guild) for guild in bot.guilds]
+    stats = await run_db(guild_sync.sync_guilds, snapshots)
+    role_weights.invalidate()
+    logger.info(
+        f"Synced {len(snapshots)} servers: {stats['inserted']} rows added, "
+        f"{stats['updated']} updated, {stats['deleted']} removed"
+    )
+
+def option_marker(poll, index):
+    """The reaction emoji of an option, or its number on button and select menu polls"""
+    return OPTION_EMOJIS[index] if poll.vote_mode == 'reactions' else f"{index + 1}."
+
+def _component_label(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+def build_vote_view(poll):
+    """
+    Build the buttons or select menu members vote with
+    
+    Returns:
+    - A discord.ui.View, or None for reaction polls
+    """
+    if poll.vote_mode == 'reactions':
+        return None
+    
+    options = list(zip(poll.get_option_ids(), poll.get_options()))
+    view = discord.ui.View(timeout=None)
+    
+    if poll.vote_mode == 'buttons':
+        # Five buttons per row; pressing one again withdraws the vote
+        for i, (option_id, option) in enumerate(options):
+            view.add_item(discord.ui.Button(
+                label=_component_label(f"{i + 1}. {option}", 80),
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"{VOTE_ID_PREFIX}:{poll.id}:{option_id}"
+            ))
+        return view
+    
+    # The menu selection becomes the member's votes; clearing it withdraws them
+    max_values = len(options) if poll.allow_multiple else 1
+    if poll.allow_multiple and poll.max_votes > 0:
+        max_values = min(max_values, poll.max_votes)
+    
+    view.add_item(discord.ui.Select(
+        custom_id=f"{VOTE_ID_PREFIX}:{poll.id}:select",
+        placeholder="Choose your options" if max_values > 1 else "Choose an option",
+        min_values=0,
+        max_values=max_values,
+        options=[
+            discord.SelectOption(label=_component_label(f"{i + 1}. {option}", 100), value=str(option_id))
+            for i, (option_id, option) in enumerate(options)
+        ]
+    ))
+    return view
+
+def build_poll_embed(poll, results=None):
+    """Build the voting embed for a poll, with live results when given"""
+    embed = discord.Embed(
+        title=poll.question,
+        description=poll.description or "",
+        color=discord.Color.blurple()
+    )
+    
+    options = poll.get_options()
+    total_votes = sum(results.values()) if results is not None else 0
+    
+    for i, option in enumerate(options):
+        if results is None:
+            field_value = "\u200b"  # Zero-width space
+        else:
+            votes = results.get(option, 0)
+            percentage = (votes / total_votes * 100) if total_votes > 0 else 0
             
-            # Update channels
-            for channel in guild.channels:
-                if isinstance(channel, discord.TextChannel):
-                    db_channel = Channel.query.get(channel.id)
-                    if not db_channel:
-                        db_channel = Channel(
-                            id=channel.id,
-                            server_id=guild.id,
-                            name=channel.name,
-                            type='text'
-                        )
-                        db.session.add(db_channel)
-                    else:
-                        db_channel.name = channel.name
+            bar = ""
+            if total_votes > 0:
+                filled = int(percentage / 10)
+                bar = "█" * filled + "░" * (10 - filled)
             
-            # Update roles
-            for role in guild.roles:
-                db_role = Role.query.get(role.id)
-                if not db_role:
-                    db_role = Role(
-                        id=role.id,
-                        server_id=guild.id,
-                        name=role.name,
-                        color=role.color.value if role.color else 0,
-                        position=role.position,
-                        vote_weight=1  # Default weight
-                    )
-                    db.session.add(db_role)
-                else:
-                    db_role.name = role.name
-                    db_role.color = role.color.value if role.color else 0
-                    db_role.position = role.position
+            field_value = f"{bar} {votes} votes ({percentage:.1f}%)"
         
-        db.session.commit()
+        embed.add_field(
+            name=f"{option_marker(poll, i)} {option}",
+            value=field_value,
+            inline=False
+        )
+    
+    # Add footer with poll details
+    footer_text = []
+    if poll.allow_multiple:
+        footer_text.append("Multiple votes allowed")
+    else:
+        footer_text.append("One vote per person")
+    
+    if poll.is_anonymous:
+        footer_text.append("Votes are anonymous")
+    
+    if poll.expires_at:
+        expires_at = poll.expires_at.strftime("%Y-%m-%d %H:%M")
+        footer_text.append(f"Closes: {expires_at}")
+    
+    embed.set_footer(text=" • ".join(footer_text))
+    return embed
+
+def build_closed_embed(poll, results):
+    """Build the final results embed shown on the original poll message"""
+    options = poll.get_options()
+    total_votes = sum(results.values())
+    
+    closed_embed = discord.Embed(
+        title=f"🔒 POLL CLOSED: {poll.question}",
+        description="Final Results:",
+        color=discord.Color.red()
+    )
+    
+    # Find the winner (option with most votes)
+    if total_votes > 0:
+        winner = max(results, key=results.get)
+        winner_votes = results[winner]
+        winner_percentage = (winner_votes / total_votes * 100)
+        
+        closed_embed.add_field(
+            name="🏆 Winner",
+            value=f"**{winner}** with {winner_votes} votes ({winner_percentage:.1f}%)",
+            inline=False
+        )
+    
+    # Add all results with visual bars
+    for option in options:
+        votes = results.get(option, 0)
+        percentage = (votes / total_votes * 100) if total_votes > 0 else 0
+        
+        # Create visual progress bar
+        bar_length = 15
+        filled = int((percentage / 100) * bar_length)
+        bar = "█" * filled + "░" * (bar_length - filled)
+        
+        # Add trophy emoji for winner
+        trophy = "🏆 " if votes == max(results.values()) and total_votes > 0 else ""
+        
+        closed_embed.add_field(
+            name=f"{trophy}{option}",
+            value=f"{bar} {votes} votes ({percentage:.1f}%)",
+            inline=False
+        )
+    
+    closed_embed.set_footer(text=f"Total votes: {total_votes} • Poll ended")
+    return closed_embed
 
+@measure_blocking
 async def post_poll(poll_id):
-    with app.app_context():
-        poll = Poll.query.get(poll_id)
-        if not poll or poll.status != "draft":
-            return
+    poll, _ = await run_db(_load_poll, poll_id)
+    if not poll or poll.status != "draft":
+        return
+    
+    try:
+        # Try to get the channel by ID
+        channel = bot.get_channel(poll.channel_id)
         
-        try:
-            # Try to get the channel by ID
-            channel = bot.get_channel(poll.channel_id)
-            
-            # If channel not found, try to get it through the guild
-            if not channel:
-                # Get the server object
-                guild = bot.get_guild(poll.server_id)
-                if guild:
-                    # Try to get the channel again with the guild context
-                    channel = guild.get_channel(poll.channel_id)
-                    
-                    # If still not found, try to use server's default channel
-                    if not channel:
-                        server = Server.query.get(poll.server_id)
-                        if server and server.default_channel_id:
-                            channel = guild.get_channel(server.default_channel_id)
-                            # Update the poll to use this channel
-                            if channel:
-                                poll.channel_id = server.default_channel_id
-                                db.session.commit()
-                                logger.info(f"Updated poll {poll_id} to use server's default channel")
-            
-            # If still no channel, cancel the poll
-            if not channel:
-                poll.status = "cancelled"
-                db.session.commit()
-                logger.error(f"Failed to post poll {poll_id}: Channel not found. Check your server and channel configurations.")
-                return
+        # If channel not found, try to get it through the guild
+        if not channel:
+            # Get the server object
+            guild = bot.get_guild(poll.server_id)
+            if guild:
+                # Try to get the channel again with the guild context
+                channel = guild.get_channel(poll.channel_id)
                 
-        except Exception as e:
-            logger.error(f"Error finding channel: {str(e)}")
-            poll.status = "cancelled"
-            db.session.commit()
-            logger.error(f"Failed to post poll {poll_id}: {str(e)}")
+                # If still not found, try to use server's default channel
+                if not channel:
+                    default_channel_id = await run_db(_default_channel_id, poll.server_id)
+                    if default_channel_id:
+                        channel = guild.get_channel(default_channel_id)
+                        # Update the poll to use this channel
+                        if channel:
+                            poll.channel_id = default_channel_id
+                            await run_db(_update_poll, poll_id, channel_id=default_channel_id)
+                            logger.info(f"Updated poll {poll_id} to use server's default channel")
+        
+        # If still no channel, cancel the poll
+        if not channel:
+            await run_db(_update_poll, poll_id, status="cancelled")
+            logger.error(f"Failed to post poll {poll_id}: Channel not found. Check your server and channel configurations.")
             return
+    
+    except Exception as e:
+        logger.error(f"Error finding channel: {str(e)}")
+        await run_db(_update_poll, poll_id, status="cancelled")
+        logger.error(f"Failed to post poll {poll_id}: {str(e)}")
+        return
+    
+    # Create poll embed
+    embed = build_poll_embed(poll)
+    options = poll.get_options()
+    
+    # Button and select menu polls are votable as soon as they are posted
+    view = build_vote_view(poll)
+    emojis = OPTION_EMOJIS[:len(options)] if view is None else []
+    background = app.config["REACTION_SEEDING"] == BACKGROUND
+    
+    # Send poll message
+    try:
+        started = time.perf_counter()
+        message = await channel.send(embed=embed, view=view)
         
-        # Create poll embed
-        embed = discord.Embed(
-            title=poll.question,
-            description=poll.description or "",
-            color=discord.Color.blurple()
-        )
-        
-        options = poll.get_options()
-        for i, option in enumerate(options):
-            embed.add_field(
-                name=f"{OPTION_EMOJIS[i]} {option}",
-                value="\u200b",  # Zero-width space
-                inline=False
-            )
-        
-        # Add footer with poll details
-        footer_text = []
-        if poll.allow_multiple:
-            footer_text.append("Multiple votes allowed")
-        else:
-            footer_text.append("One vote per person")
+        # Add reaction options before opening the poll, unless they go on in the background
+        if emojis and not background:
+            await reaction_seeder.seed(message, emojis)
         
-        if poll.is_anonymous:
-            footer_text.append("Votes are anonymous")
+        # Update poll status
+        await run_db(_activate_poll, poll_id, message.id, poll.get_option_ids())
+        poll.message_id = message.id
+        poll.status = "active"
+        poll_index.add(poll)
+        poll_scheduler.sync_poll(poll)
+        embed_updater.remember(poll.id, message)
         
-        if poll.expires_at:
-            expires_at = poll.expires_at.strftime("%Y-%m-%d %H:%M")
-            footer_text.append(f"Closes: {expires_at}")
+        # Time from posting until the poll counts votes
+        time_to_votable = time.perf_counter() - started
+        metrics.observe('polls.time_to_votable', time_to_votable)
         
-        embed.set_footer(text=" • ".join(footer_text))
+        if background and emojis:
+            reaction_seeder.seed_in_background(message, emojis)
         
-        # Send poll message
-        try:
-            message = await channel.send(embed=embed)
-            
-            # Add reaction options
-            for i in range(len(options)):
-                await message.add_reaction(OPTION_EMOJIS[i])
-            
-            # Update poll status
-            poll.message_id = message.id
-            poll.status = "active"
-            db.session.commit()
-            
-            logger.info(f"Posted poll {poll_id} to channel {channel.name}")
-        except Exception as e:
-            poll.status = "cancelled"
-            db.session.commit()
-            logger.error(f"Failed to post poll {poll_id}: {str(e)}")
+        logger.info(f"Posted poll {poll_id} to channel {channel.name} (votable after {time_to_votable:.2f}s)")
+    except Exception as e:
+        await run_db(_update_poll, poll_id, status="cancelled")
+        logger.error(f"Failed to post poll {poll_id}: {str(e)}")
 
 async def update_poll_embed(poll_id):
-    with app.app_context():
-        poll = Poll.query.get(poll_id)
+    try:
+        poll, results = await run_db(_load_poll, poll_id, with_results=True)
         if not poll or poll.status != "active" or not poll.message_id:
             return
         
@@ -500,237 +720,146 @@ async def update_poll_embed(poll_id):
         if not channel:
             return
         
-        try:
+        message = embed_updater.cached_message(poll.id)
+        if not message or message.id != poll.message_id:
             message = await channel.fetch_message(poll.message_id)
-            
-            # Create updated embed
-            embed = discord.Embed(
-                title=poll.question,
-                description=poll.description or "",
-                color=discord.Color.blurple()
-            )
-            
-            options = poll.get_options()
-            results = poll.get_results()
-            total_votes = sum(results.values())
-            
-            for i, option in enumerate(options):
-                votes = results.get(option, 0)
-                percentage = (votes / total_votes * 100) if total_votes > 0 else 0
-                
-                bar = ""
-                if total_votes > 0:
-                    filled = int(percentage / 10)
-                    bar = "█" * filled + "░" * (10 - filled)
-                
-                field_value = f"{bar} {votes} votes ({percentage:.1f}%)"
-                embed.add_field(
-                    name=f"{OPTION_EMOJIS[i]} {option}",
-                    value=field_value,
-                    inline=False
-                )
-            
-            # Add footer with poll details
-            footer_text = []
-            if poll.allow_multiple:
-                footer_text.append("Multiple votes allowed")
-            else:
-                footer_text.append("One vote per person")
-            
-            if poll.is_anonymous:
-                footer_text.append("Votes are anonymous")
-            
-            if poll.expires_at:
-                expires_at = poll.expires_at.strftime("%Y-%m-%d %H:%M")
-                footer_text.append(f"Closes: {expires_at}")
-            
-            embed.set_footer(text=" • ".join(footer_text))
-            
-            # Update the message
-            await message.edit(embed=embed)
-        except Exception as e:
-            logger.error(f"Failed to update poll {poll_id} embed: {str(e)}")
+        
+        # Update the message and keep the edited copy for the next refresh
+        message = await message.edit(embed=build_poll_embed(poll, results))
+        embed_updater.remember(poll.id, message)
+    except Exception as e:
+        embed_updater.forget(poll_id)
+        logger.error(f"Failed to update poll {poll_id} embed: {str(e)}")
+
+# Live result refreshes are batched and flushed by the flush_poll_embeds task
+embed_updater = EmbedUpdater(update_poll_embed)
+
+async def _fetch_poll_message(entry):
+    # Fetched rather than cached, as the cached copy's reactions may be stale
+    channel = bot.get_channel(entry.channel_id) or await bot.fetch_channel(entry.channel_id)
+    return await channel.fetch_message(entry.message_id)
+
+def _reconciled(entry):
+    if entry.show_live_results:
+        embed_updater.mark_dirty(entry.id)
+
+# Started on ready, on resume and from the dashboard
+reconciler = ReactionReconciler(
+    _fetch_poll_message, _reconciled, OPTION_EMOJIS, app.config["RECONCILE_CONCURRENCY"]
+)
 
 async def handle_poll_closing(poll_id):
     """Handle the Discord message updates when a poll is closed"""
-    with app.app_context():
-        poll = Poll.query.get(poll_id)
-        if not poll or poll.status != "closed":
-            return
+    poll_index.remove(poll_id)
+    vote_state.evict(poll_id)
+    poll_scheduler.cancel(poll_id)
+    embed_updater.forget(poll_id)
+    
+    poll, results = await run_db(_load_poll, poll_id, with_results=True)
+    if not poll or poll.status != "closed":
+        return
+    
+    channel = bot.get_channel(poll.channel_id)
+    if not channel:
+        return
+    
+    # Update original poll message to show it's closed with final results
+    try:
+        message = await channel.fetch_message(poll.message_id)
         
-        channel = bot.get_channel(poll.channel_id)
-        if not channel:
-            return
+        if poll.vote_mode == 'reactions':
+            await message.edit(embed=build_closed_embed(poll, results))
+            await message.clear_reactions()
+        else:
+            # Drop the vote buttons or menu
+            await message.edit(embed=build_closed_embed(poll, results), view=None)
         
-        options = poll.get_options()
-        results = poll.get_results()
-        total_votes = sum(results.values())
+        logger.info(f"Updated original poll message {poll.message_id} with final results")
+    
+    except Exception as e:
+        logger.error(f"Failed to update original poll message: {str(e)}")
+
+@measure_blocking
+async def close_poll(poll_id):
+    poll_index.remove(poll_id)
+    vote_state.evict(poll_id)
+    poll_scheduler.cancel(poll_id)
+    embed_updater.forget(poll_id)
+    
+    # Update poll status
+    poll, results, theme = await run_db(_close_poll_record, poll_id)
+    if not poll:
+        return
+    
+    channel = bot.get_channel(poll.channel_id)
+    if not channel:
+        return
+    
+    # Create results embed
+    embed = discord.Embed(
+        title=f"Poll Closed: {poll.question}",
+        description="Here are the final results:",
+        color=discord.Color.gold()
+    )
+    
+    options = poll.get_options()
+    total_votes = sum(results.values())
+    
+    for option in options:
+        votes = results.get(option, 0)
+        percentage = (votes / total_votes * 100) if total_votes > 0 else 0
+        embed.add_field(
+            name=option,
+            value=f"{votes} votes ({percentage:.1f}%)",
+            inline=False
+        )
+    
+    embed.set_footer(text=f"Total votes: {total_votes}")
+    
+    # Render the results chart in the chart worker processes
+    title, labels, values = poll_chart_args(poll, results)
+    try:
+        png = await chart_service.render_async(poll.id, title, labels, values, 'bar', theme)
+    except Exception as e:
+        logger.error(f"Failed to render chart for poll {poll_id}: {str(e)}")
+        png = None
+    
+    # Create Discord file from the rendered image
+    chart_file = discord.File(io.BytesIO(png), filename="poll_results.png") if png else None
+    
+    # Send results message with chart
+    try:
+        if chart_file:
+            await channel.send(embed=embed, file=chart_file)
+        else:
+            await channel.send(embed=embed)
         
         # Update original poll message to show it's closed with final results
         try:
             message = await channel.fetch_message(poll.message_id)
             
-            # Create a new embed showing final results on the original message
-            closed_embed = discord.Embed(
-                title=f"🔒 POLL CLOSED: {poll.question}",
-                description="Final Results:",
-                color=discord.Color.red()
-            )
-            
-            # Find the winner (option with most votes)
-            if total_votes > 0:
-                winner = max(results, key=results.get)
-                winner_votes = results[winner]
-                winner_percentage = (winner_votes / total_votes * 100)
-                
-                closed_embed.add_field(
-                    name="🏆 Winner",
-                    value=f"**{winner}** with {winner_votes} votes ({winner_percentage:.1f}%)",
-                    inline=False
-                )
-            
-            # Add all results with visual bars
-            for option in options:
-                votes = results.get(option, 0)
-                percentage = (votes / total_votes * 100) if total_votes > 0 else 0
-                
-                # Create visual progress bar
-                bar_length = 15
-                filled = int((percentage / 100) * bar_length)
-                bar = "█" * filled + "░" * (bar_length - filled)
-                
-                # Add trophy emoji for winner
-                trophy = "🏆 " if votes == max(results.values()) and total_votes > 0 else ""
-                
-                closed_embed.add_field(
-                    name=f"{trophy}{option}",
-                    value=f"{bar} {votes} votes ({percentage:.1f}%)",
-                    inline=False
-                )
-            
-            closed_embed.set_footer(text=f"Total votes: {total_votes} • Poll ended")
-            
-            await message.edit(embed=closed_embed)
-            await message.clear_reactions()
+            if poll.vote_mode == 'reactions':
+                await message.edit(embed=build_closed_embed(poll, results))
+                await message.clear_reactions()
+            else:
+                # Drop the vote buttons or menu
+                await message.edit(embed=build_closed_embed(poll, results), view=None)
             
             logger.info(f"Updated original poll message {poll.message_id} with final results")
-            
         except Exception as e:
             logger.error(f"Failed to update original poll message: {str(e)}")
-
-async def close_poll(poll_id):
-    with app.app_context():
-        poll = Poll.query.get(poll_id)
-        if not poll or poll.status != "active":
-            return
-        
-        channel = bot.get_channel(poll.channel_id)
-        if not channel:
-            poll.status = "closed"
-            db.session.commit()
-            return
-        
-        # Update poll status
-        poll.status = "closed"
-        db.session.commit()
-        
-        # Create results embed
-        embed = discord.Embed(
-            title=f"Poll Closed: {poll.question}",
-            description="Here are the final results:",
-            color=discord.Color.gold()
-        )
-        
-        options = poll.get_options()
-        results = poll.get_results()
-        total_votes = sum(results.values())
-        
-        for option in options:
-            votes = results.get(option, 0)
-            percentage = (votes / total_votes * 100) if total_votes > 0 else 0
-            embed.add_field(
-                name=option,
-                value=f"{votes} votes ({percentage:.1f}%)",
-                inline=False
-            )
-        
-        embed.set_footer(text=f"Total votes: {total_votes}")
-        
-        # Generate results chart
-        plt.figure(figsize=(10, 6))
-        plt.bar(options, [results.get(option, 0) for option in options], color='cornflowerblue')
-        plt.xlabel('Options')
-        plt.ylabel('Votes')
-        plt.title('Poll Results')
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        
-        # Save chart to buffer
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png')
-        buf.seek(0)
         
-        # Create Discord file from buffer
-        chart_file = discord.File(buf, filename="poll_results.png")
-        
-        # Send results message with chart
-        try:
-            await channel.send(embed=embed, file=chart_file)
-            
-            # Update original poll message to show it's closed with final results
-            try:
-                message = await channel.fetch_message(poll.message_id)
-                
-                # Create a new embed showing final results on the original message
-                closed_embed = discord.Embed(
-                    title=f"🔒 POLL CLOSED: {poll.question}",
-                    description="Final Results:",
-                    color=discord.Color.red()
-                )
-                
-                # Find the winner (option with most votes)
-                if total_votes > 0:
-                    winner = max(results, key=results.get)
-                    winner_votes = results[winner]
-                    winner_percentage = (winner_votes / total_votes * 100)
-                    
-                    closed_embed.add_field(
-                        name="🏆 Winner",
-                        value=f"**{winner}** with {winner_votes} votes ({winner_percentage:.1f}%)",
-                        inline=False
-                    )
-                
-                # Add all results with visual bars
-                for option in options:
-                    votes = results.get(option, 0)
-                    percentage = (votes / total_votes * 100) if total_votes > 0 else 0
-                    
-                    # Create visual progress bar
-                    bar_length = 15
-                    filled = int((percentage / 100) * bar_length)
-                    bar = "█" * filled + "░" * (bar_length - filled)
-                    
-                    # Add trophy emoji for winner
-                    trophy = "🏆 " if votes == max(results.values()) and total_votes > 0 else ""
-                    
-                    closed_embed.add_field(
-                        name=f"{trophy}{option}",
-                        value=f"{bar} {votes} votes ({percentage:.1f}%)",
-                        inline=False
-                    )
-                
-                closed_embed.set_footer(text=f"Total votes: {total_votes} • Poll ended")
-                
-                await message.edit(embed=closed_embed)
-                await message.clear_reactions()
-                
-                logger.info(f"Updated original poll message {poll.message_id} with final results")
-            except Exception as e:
-                logger.error(f"Failed to update original poll message: {str(e)}")
-            
-            logger.info(f"Closed poll {poll_id} and posted results")
-        except Exception as e:
-            logger.error(f"Failed to post poll {poll_id} results: {str(e)}")
+        logger.info(f"Closed poll {poll_id} and posted results")
+    except Exception as e:
+        logger.error(f"Failed to post poll {poll_id} results: {str(e)}")
+
+# Exact-time posting and closing of polls, seeded in on_ready and run
+# concurrently (but in order per channel) on a bounded worker pool
+poll_scheduler = PollScheduler(
+    post_poll,
+    close_poll,
+    PollWorkerPool(app.config["POLL_WORKER_CONCURRENCY"])
+)
 
 def run_bot():
     with app.app_context():
@@ -1,104 +1,223 @@
 import io
-import matplotlib.pyplot as plt
-import matplotlib
-import numpy as np
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from matplotlib.figure import Figure
+import metrics
 
-# Use Agg backend to prevent issues with missing display
-matplotlib.use('Agg')
+logger = logging.getLogger(__name__)
 
-def generate_results_chart(title, labels, values, chart_type='bar'):
+# Use Discord-style colors
+COLORS = ['#5865F2', '#57F287', '#FEE75C', '#EB459E', '#ED4245',
+          '#9B59B6', '#3498DB', '#2ECC71', '#F1C40F', '#E74C3C']
+
+THEMES = {
+    'dark': {'background': '#36393F', 'text': 'white', 'edge': '#2C2F33'},
+    'light': {'background': '#FFFFFF', 'text': '#2C2F33', 'edge': '#FFFFFF'},
+}
+
+def render_chart(title, labels, values, chart_type='bar', theme='dark'):
     """
-    Generate a chart for poll results
+    Render a poll results chart to PNG bytes
+    
+    Uses the object-oriented Figure API rather than pyplot, so no global
+    state is shared between threads and nothing has to be closed afterwards.
     
     Parameters:
     - title: Chart title
     - labels: List of option labels
     - values: List of vote counts
     - chart_type: Type of chart ('bar' or 'pie')
+    - theme: Color theme ('dark' or 'light')
     
     Returns:
-    - BytesIO object containing the chart image
+    - PNG image bytes
     """
-    plt.figure(figsize=(10, 6))
+    style = THEMES.get(theme, THEMES['dark'])
+    colors = [COLORS[i % len(COLORS)] for i in range(len(labels))]
     
-    # Use Discord-style colors
-    colors = ['#5865F2', '#57F287', '#FEE75C', '#EB459E', '#ED4245', 
-              '#9B59B6', '#3498DB', '#2ECC71', '#F1C40F', '#E74C3C']
+    fig = Figure(figsize=(10, 6), facecolor=style['background'])
+    ax = fig.add_subplot()
+    ax.set_facecolor(style['background'])
     
     if chart_type == 'pie':
-        # Create pie chart
         total = sum(values)
         if total > 0:
-            plt.pie(
+            ax.pie(
                 values,
                 labels=[f"{label}" for label in labels],
                 autopct=lambda p: f'{int(p * total / 100)}' if p > 5 else '',
                 startangle=90,
-                colors=colors[:len(labels)],
-                wedgeprops={'linewidth': 1, 'edgecolor': '#2C2F33'}
+                colors=colors,
+                wedgeprops={'linewidth': 1, 'edgecolor': style['edge']},
+                textprops={'color': style['text']}
             )
             
             # Add vote counts and percentages in legend
-            plt.legend(
+            legend = ax.legend(
                 title="Poll Results",
-                labels=[f"{labels[i]}: {values[i]} votes ({values[i]/total*100:.1f}%)" 
+                labels=[f"{labels[i]}: {values[i]} votes ({values[i]/total*100:.1f}%)"
                         for i in range(len(labels))],
                 loc="center left",
                 bbox_to_anchor=(1, 0.5)
             )
+            legend.get_title().set_color(style['text'])
+            for text in legend.get_texts():
+                text.set_color(style['text'])
         else:
-            plt.text(0.5, 0.5, 'No votes yet', horizontalalignment='center', 
-                     verticalalignment='center', fontsize=18)
+            ax.text(0.5, 0.5, 'No votes yet', horizontalalignment='center',
+                    verticalalignment='center', fontsize=18, color=style['text'])
         
-        plt.axis('equal')
+        ax.axis('equal')
     else:
         # Create bar chart with Discord style
-        bars = plt.bar(
-            range(len(labels)), 
-            values, 
-            color=colors[:len(labels)],
-            edgecolor='#2C2F33',
+        bars = ax.bar(
+            range(len(labels)),
+            values,
+            color=colors,
+            edgecolor=style['edge'],
             linewidth=1
         )
         
         # Add value labels on top of bars
         for bar in bars:
             height = bar.get_height()
-            plt.text(
-                bar.get_x() + bar.get_width()/2., 
+            ax.text(
+                bar.get_x() + bar.get_width()/2.,
                 height + 0.1,
                 f'{int(height)}',
-                ha='center', 
-                va='bottom'
+                ha='center',
+                va='bottom',
+                color=style['text']
             )
         
         # Set x-axis labels with custom rotation
-        plt.xticks(range(len(labels)), labels, rotation=30, ha='right')
-        plt.ylabel('Votes')
-        
-        # Make sure labels are fully visible
-        plt.tight_layout()
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels, rotation=30, ha='right')
+        ax.set_ylabel('Votes')
     
     # Set title and style
-    plt.title(title, fontsize=16, pad=20)
+    ax.set_title(title, fontsize=16, pad=20, color=style['text'])
+    ax.tick_params(colors=style['text'])
+    ax.xaxis.label.set_color(style['text'])
+    ax.yaxis.label.set_color(style['text'])
+    fig.tight_layout()
+    
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', facecolor=style['background'], dpi=100)
+    return buf.getvalue()
+
+class ChartService:
+    """
+    Renders charts in a process pool and caches the PNG bytes
+    
+    Charts are cached by their content (poll, title, labels, values, chart
+    type and theme), so repeated exports and the close announcement reuse
+    one render until the poll's results change. Usable from Flask threads
+    (render) and from the bot loop (render_async).
+    """
     
-    # Use Discord dark theme
-    plt.gca().set_facecolor('#36393F')
-    plt.gcf().set_facecolor('#36393F')
-    plt.gca().tick_params(colors='white')
-    plt.gca().xaxis.label.set_color('white')
-    plt.gca().yaxis.label.set_color('white')
-    plt.title(title, color='white')
+    def __init__(self, workers, cache_size=256):
+        self.workers = workers
+        self.cache_size = cache_size
+        self._pool = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
     
-    if chart_type == 'pie':
-        plt.gca().legend().get_title().set_color('white')
-        for text in plt.gca().legend().get_texts():
-            text.set_color('white')
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
     
-    # Save chart to buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', facecolor='#36393F', dpi=100)
-    buf.seek(0)
-    plt.close()
+    def _key(self, poll_id, title, labels, values, chart_type, theme):
+        labels, values = tuple(labels), tuple(values)
+        key = (poll_id, title, labels, values, chart_type, theme)
+        return key, (title, list(labels), list(values), chart_type, theme)
     
-    return buf
+    def _cached(self, key):
+        with self._lock:
+            png = self._cache.get(key)
+            if png is not None:
+                self._cache.move_to_end(key)
+        metrics.incr('charts.cache_hits' if png is not None else 'charts.cache_misses')
+        return png
+    
+    def _store(self, key, png):
+        with self._lock:
+            self._cache[key] = png
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return png
+    
+    def _reset_pool(self, error):
+        # Recreate the pool next time; the caller renders this chart in-process
+        logger.error(f"Chart process pool unavailable: {str(error)}")
+        with self._lock:
+            self._pool = None
+    
+    def _submit(self, args):
+        try:
+            return self._get_pool().submit(render_chart, *args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._reset_pool(e)
+            return None
+    
+    def render(self, poll_id, title, labels, values, chart_type='bar', theme='dark'):
+        """
+        Get chart PNG bytes, rendering them in the pool if not cached
+        
+        Parameters:
+        - poll_id: ID of the poll the chart belongs to
+        - title, labels, values, chart_type, theme: See render_chart
+        
+        Returns:
+        - PNG image bytes
+        """
+        key, args = self._key(poll_id, title, labels, values, chart_type, theme)
+        png = self._cached(key)
+        if png is not None:
+            return png
+        
+        future = self._submit(args)
+        try:
+            png = future.result() if future else render_chart(*args)
+        except BrokenProcessPool as e:
+            # A worker died mid-render
+            self._reset_pool(e)
+            png = render_chart(*args)
+        return self._store(key, png)
+    
+    async def render_async(self, poll_id, title, labels, values, chart_type='bar', theme='dark'):
+        """Same as render, awaitable from the bot loop without blocking it"""
+        key, args = self._key(poll_id, title, labels, values, chart_type, theme)
+        png = self._cached(key)
+        if png is not None:
+            return png
+        
+        future = self._submit(args)
+        try:
+            if future:
+                png = await asyncio.wrap_future(future)
+            else:
+                png = await asyncio.to_thread(render_chart, *args)
+        except BrokenProcessPool as e:
+            # A worker died mid-render
+            self._reset_pool(e)
+            png = await asyncio.to_thread(render_chart, *args)
+        return self._store(key, png)
+    
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+def poll_chart_args(poll, results):
+    # Title, labels and values for a poll's results chart
+    options = poll.get_options()
+    return poll.question, options, [results.get(option, 0) for option in options]
@@ -0,0 +1,117 @@
+import time
+import datetime
+import threading
+from sqlalchemy import func
+from app import app, db
+from models import Poll, PollTally, Server, DailyActivity, LiveSequence, activity_day
+from polls import STATS_SEQUENCE
+
+# Longest activity window the dashboard can ask for
+MAX_ACTIVITY_DAYS = 366
+
+# Times the counts are read again when a commit lands while reading them
+SNAPSHOT_ATTEMPTS = 5
+
+def stats_version():
+    """Number of the last committed dashboard 'stats' event"""
+    return db.session.query(LiveSequence.value).filter_by(name=STATS_SEQUENCE).scalar() or 0
+
+def dashboard_counts():
+    """
+    Headline numbers shown on the dashboard stats cards
+    
+    Total votes come from the per-option tallies rather than counting every
+    Vote row. The counts are read between two looks at the stats version,
+    and again if it moved, so stats_version says which events they include.
+    """
+    for _ in range(SNAPSHOT_ATTEMPTS):
+        version = stats_version()
+        counts = {
+            'total_polls': Poll.query.count(),
+            'active_polls': Poll.query.filter_by(status='active').count(),
+            'total_votes': int(db.session.query(func.coalesce(func.sum(PollTally.votes), 0)).scalar()),
+            'total_servers': Server.query.count()
+        }
+        if stats_version() == version:
+            break
+    return dict(counts, stats_version=version)
+
+def activity(days, server_id=None):
+    """
+    Polls created and votes cast per day from the daily rollup
+    
+    Parameters:
+    - days: Number of days to include, ending today (UTC, like the rollup)
+    - server_id: Optional Discord server ID to limit the activity to
+    
+    Returns:
+    - List of (date string, polls created, votes cast), oldest first
+    """
+    today = activity_day()
+    start = today - datetime.timedelta(days=days - 1)
+    
+    query = db.session.query(
+        DailyActivity.day,
+        func.sum(DailyActivity.polls_created),
+        func.sum(DailyActivity.votes_cast)
+    ).filter(DailyActivity.day >= start).group_by(DailyActivity.day)
+    if server_id is not None:
+        query = query.filter(DailyActivity.server_id == server_id)
+    
+    totals = {day: (polls or 0, votes or 0) for day, polls, votes in query}
+    
+    series = []
+    for offset in range(days):
+        day = start + datetime.timedelta(days=offset)
+        polls, votes = totals.get(day, (0, 0))
+        series.append((day.strftime('%Y-%m-%d'), int(polls), int(votes)))
+    return series
+
+class DashboardStats:
+    """
+    Short-lived cache of dashboard statistics
+    
+    Every open dashboard asks for the same numbers, so they are computed at
+    most once per DASHBOARD_STATS_TTL seconds for each window/server pair.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = {}  # (days, server_id) -> (expires, stats)
+    
+    def get(self, days=7, server_id=None):
+        """
+        Get the dashboard statistics (needs an app context)
+        
+        Parameters:
+        - days: Activity window in days (clamped to 1..MAX_ACTIVITY_DAYS)
+        - server_id: Optional Discord server ID for the activity series
+        
+        Returns:
+        - Dictionary with the headline counts, the window and the activity series
+        """
+        days = max(1, min(int(days), MAX_ACTIVITY_DAYS))
+        key = (days, server_id)
+        now = time.monotonic()
+        
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+        
+        stats = dashboard_counts()
+        stats['days'] = days
+        stats['activity'] = activity(days, server_id)
+        
+        with self._lock:
+            # Drop expired entries so odd windows don't pile up
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            self._cache[key] = (now + app.config["DASHBOARD_STATS_TTL"], stats)
+        return stats
+    
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+# Shared by the dashboard page and its stats endpoint
+dashboard_stats = DashboardStats()
@@ -0,0 +1,54 @@
+import time
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app import app, db
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool of threads that run SQLAlchemy work for the bot
+_executor = ThreadPoolExecutor(
+    max_workers=app.config["DB_EXECUTOR_WORKERS"],
+    thread_name_prefix="pollbot-db"
+)
+
+def _call_in_app_context(fn, args, kwargs):
+    # Every call gets its own app context and therefore its own scoped session
+    with app.app_context():
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            db.session.remove()
+
+async def run_db(fn, *args, **kwargs):
+    """
+    Run a blocking database function on the DB thread pool
+    
+    The function runs inside an app context with a fresh session that is
+    removed afterwards, so it should return plain values or detached objects.
+    
+    Parameters:
+    - fn: Function to call
+    - args, kwargs: Arguments for the function
+    
+    Returns:
+    - Whatever the function returns
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(
+            _executor,
+            functools.partial(_call_in_app_context, fn, args, kwargs)
+        )
+    finally:
+        metrics.observe(f'db.{fn.__name__}', time.perf_counter() - start)
+
+def shutdown():
+    """Stop the DB thread pool, waiting for queued work to finish"""
+    _executor.shutdown(wait=True)
@@ -0,0 +1,133 @@
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+from flask_sqlalchemy.session import Session
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bind key of the pooled read-only SQLite connections
+READONLY = 'readonly'
+
+def is_file_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def sqlite_engine_config(uri, config):
+    """
+    Engine options and binds for a file-backed SQLite database
+    
+    With WAL mode and a read pool, all writes go through a single pooled
+    writer connection, so writers in this process queue for it instead of
+    failing with "database is locked", and reads go to the pool of read-only
+    connections (see RoutingSession), which WAL lets run alongside the writer.
+    Without a read pool the writer engine serves reads as well, including
+    those of nested app contexts while an outer one holds a connection, so
+    it keeps SQLAlchemy's regular pool size and relies on busy_timeout.
+    
+    Parameters:
+    - uri: SQLite database URI
+    - config: Flask app config with the SQLITE_* settings
+    
+    Returns:
+    - SQLALCHEMY_ENGINE_OPTIONS and SQLALCHEMY_BINDS values
+    """
+    engine_options = {
+        'pool_timeout': 30,
+    }
+    
+    binds = {}
+    if config["SQLITE_WAL"] and config["SQLITE_READ_POOL_SIZE"] > 0:
+        engine_options.update(pool_size=1, max_overflow=0)
+        binds[READONLY] = {
+            'url': uri,
+            'pool_size': config["SQLITE_READ_POOL_SIZE"],
+            'max_overflow': 0,
+            'pool_timeout': 30,
+        }
+    return engine_options, binds
+
+def _pragmas(config, readonly):
+    pragmas = [
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}",
+        f"PRAGMA cache_size=-{config['SQLITE_CACHE_SIZE_KB']}",
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE']}",
+    ]
+    if config["SQLITE_WAL"]:
+        if not readonly:
+            # Persistent in the database file; only the writer needs to set it
+            pragmas.insert(0, "PRAGMA journal_mode=WAL")
+        # Durable across application crashes; only a power loss can drop the last commits
+        pragmas.append("PRAGMA synchronous=NORMAL")
+    if readonly:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+def configure_sqlite_engines(engines, config):
+    """
+    Apply the SQLite pragmas to every new connection of the app's engines
+    
+    Parameters:
+    - engines: db.engines (bind key -> engine)
+    - config: Flask app config with the SQLITE_* settings
+    """
+    for bind_key, engine in engines.items():
+        if engine.dialect.name != 'sqlite':
+            continue
+        
+        pragmas = _pragmas(config, readonly=bind_key == READONLY)
+        
+        @event.listens_for(engine, 'connect')
+        def set_pragmas(dbapi_connection, connection_record, pragmas=pragmas):
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma in pragmas:
+                    cursor.execute(pragma)
+            finally:
+                cursor.close()
+        
+        logger.info(f"SQLite engine {bind_key or 'writer'}: {'; '.join(pragmas)}")
+
+class RoutingSession(Session):
+    """
+    Session that reads from the read-only pool until it writes
+    
+    The first flush or INSERT/UPDATE/DELETE of a transaction switches it to
+    the writer connection for the rest of the transaction, so it always
+    sees its own writes. Without a read-only bind it behaves like the
+    default Flask-SQLAlchemy session.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            reader = self._db.engines.get(READONLY)
+            if reader is not None:
+                if self._flushing or isinstance(clause, UpdateBase):
+                    self.info['wrote'] = True
+                elif not self.info.get('wrote'):
+                    metrics.incr('db.reads_routed')
+                    return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_routing(session, transaction):
+    # The next transaction starts on the read-only pool again
+    if transaction.parent is None:
+        session.info.pop('wrote', None)
+
+def checkpoint(engine):
+    """
+    Run a WAL checkpoint and truncate the WAL file
+    
+    Returns:
+    - (busy, log pages, checkpointed pages) as reported by SQLite
+    """
+    with engine.connect() as connection:
+        busy, log_pages, checkpointed = connection.exec_driver_sql(
+            "PRAGMA wal_checkpoint(TRUNCATE)"
+        ).fetchone()
+    metrics.observe('db.wal_checkpoint_pages', checkpointed)
+    if busy:
+        metrics.incr('db.wal_checkpoint_busy')
+    return busy, log_pages, checkpointed
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class EmbedUpdater:
+    """
+    Coalesces live-result embed refreshes for active polls
+    
+    Vote handlers only mark a poll as dirty; a periodic flush on the bot loop
+    then edits each dirty poll message once, no matter how many votes arrived
+    in the meantime. Poll messages are cached so an edit doesn't need a fetch.
+    """
+    
+    def __init__(self, refresh):
+        # Coroutine function taking (poll_id) that performs the actual edit
+        self._refresh = refresh
+        self._dirty = {}  # poll_id -> number of changes since the last edit
+        self._messages = {}  # poll_id -> discord.Message
+        self.requested = 0
+        self.edits = 0
+    
+    @property
+    def coalesced(self):
+        """Number of requested updates that didn't need their own edit"""
+        return self.requested - self.edits - sum(self._dirty.values())
+    
+    def mark_dirty(self, poll_id):
+        """Request an embed refresh for a poll at the next flush"""
+        self._dirty[poll_id] = self._dirty.get(poll_id, 0) + 1
+        self.requested += 1
+        metrics.incr('embeds.requested')
+    
+    def remember(self, poll_id, message):
+        """Cache the Discord message that shows a poll"""
+        self._messages[poll_id] = message
+    
+    def cached_message(self, poll_id):
+        return self._messages.get(poll_id)
+    
+    def forget(self, poll_id):
+        """Drop cached state for a poll that is no longer live"""
+        self._messages.pop(poll_id, None)
+        self._dirty.pop(poll_id, None)
+    
+    async def flush(self):
+        """Edit every dirty poll message once"""
+        if not self._dirty:
+            return
+        
+        dirty, self._dirty = self._dirty, {}
+        
+        # Each poll message has its own rate limit bucket, so edit them together
+        results = await asyncio.gather(*(self._refresh(poll_id) for poll_id in dirty), return_exceptions=True)
+        for poll_id, result in zip(dirty, results):
+            if isinstance(result, Exception):
+                # One failed refresh mustn't stop the flush task for every poll
+                logger.error(f"Failed to refresh poll {poll_id} embed: {str(result)}")
+                metrics.incr('embeds.failed')
+        
+        self.edits += len(dirty)
+        metrics.incr('embeds.edits', len(dirty))
+        metrics.incr('embeds.coalesced', sum(dirty.values()) - len(dirty))
+        
+        logger.debug(
+            f"Flushed {len(dirty)} poll embeds for {sum(dirty.values())} changes "
+            f"({self.coalesced} edits coalesced so far)"
+        )
@@ -0,0 +1,164 @@
+import logging
+import discord
+from sqlalchemy import insert, update, delete
+from app import db
+from models import Server, Channel, Role, Poll
+
+logger = logging.getLogger(__name__)
+
+# Guilds diffed and committed together during a full sync
+GUILD_BATCH_SIZE = 100
+
+def channel_row(channel):
+    return {'id': channel.id, 'server_id': channel.guild.id, 'name': channel.name, 'type': 'text'}
+
+def role_row(role):
+    return {
+        'id': role.id,
+        'server_id': role.guild.id,
+        'name': role.name,
+        'color': role.color.value if role.color else 0,
+        'position': role.position
+    }
+
+def guild_snapshot(guild):
+    """
+    Plain copy of the guild data we store, taken on the event loop so the
+    database work can run on another thread
+    """
+    return {
+        'id': guild.id,
+        'name': guild.name,
+        'icon': str(guild.icon.url) if guild.icon else None,
+        'channels': [
+            channel_row(channel) for channel in guild.channels
+            if isinstance(channel, discord.TextChannel)
+        ],
+        'roles': [role_row(role) for role in guild.roles]
+    }
+
+def _diff(wanted, existing, fields):
+    # Split wanted rows into inserts and changed rows, and find stale IDs
+    inserts, updates = [], []
+    for row in wanted:
+        current = existing.get(row['id'])
+        if current is None:
+            inserts.append(row)
+        elif any(getattr(current, field) != row[field] for field in fields):
+            updates.append({'id': row['id'], **{field: row[field] for field in fields}})
+    
+    wanted_ids = {row['id'] for row in wanted}
+    stale = [row_id for row_id in existing if row_id not in wanted_ids]
+    return inserts, updates, stale
+
+def _apply(model, inserts, updates, stale_ids):
+    if inserts:
+        db.session.execute(insert(model), inserts)
+    if updates:
+        db.session.execute(update(model), updates)
+    if stale_ids:
+        db.session.execute(delete(model).where(model.id.in_(stale_ids)))
+
+def _sync_batch(snapshots, stats):
+    guild_ids = [guild['id'] for guild in snapshots]
+    
+    # One query per table for the whole batch of guilds
+    servers = {
+        row.id: row for row in
+        Server.query.with_entities(Server.id, Server.name, Server.icon).filter(Server.id.in_(guild_ids))
+    }
+    channels = {}
+    for row in Channel.query.with_entities(Channel.id, Channel.server_id, Channel.name).filter(Channel.server_id.in_(guild_ids)):
+        channels.setdefault(row.server_id, {})[row.id] = row
+    roles = {}
+    for row in Role.query.with_entities(
+        Role.id, Role.server_id, Role.name, Role.color, Role.position
+    ).filter(Role.server_id.in_(guild_ids)):
+        roles.setdefault(row.server_id, {})[row.id] = row
+    
+    server_rows = [{'id': guild['id'], 'name': guild['name'], 'icon': guild['icon']} for guild in snapshots]
+    server_inserts, server_updates, _ = _diff(server_rows, servers, ('name', 'icon'))
+    
+    channel_inserts, channel_updates, channel_stale = [], [], []
+    role_inserts, role_updates, role_stale = [], [], []
+    for guild in snapshots:
+        inserts, updates, stale = _diff(guild['channels'], channels.get(guild['id'], {}), ('name',))
+        channel_inserts += inserts
+        channel_updates += updates
+        channel_stale += stale
+        
+        inserts, updates, stale = _diff(
+            guild['roles'], roles.get(guild['id'], {}), ('name', 'color', 'position')
+        )
+        role_inserts += [dict(row, vote_weight=1) for row in inserts]  # Default weight
+        role_updates += updates
+        role_stale += stale
+    
+    # Keep channels that polls still point at
+    if channel_stale:
+        in_use = {
+            channel_id for channel_id, in
+            Poll.query.with_entities(Poll.channel_id).filter(Poll.channel_id.in_(channel_stale)).distinct()
+        }
+        channel_stale = [channel_id for channel_id in channel_stale if channel_id not in in_use]
+    
+    _apply(Server, server_inserts, server_updates, [])
+    _apply(Channel, channel_inserts, channel_updates, channel_stale)
+    _apply(Role, role_inserts, role_updates, role_stale)
+    db.session.commit()
+    
+    stats['inserted'] += len(server_inserts) + len(channel_inserts) + len(role_inserts)
+    stats['updated'] += len(server_updates) + len(channel_updates) + len(role_updates)
+    stats['deleted'] += len(channel_stale) + len(role_stale)
+
+def sync_guilds(snapshots):
+    """
+    Bring the stored servers, channels and roles in line with Discord
+    
+    Existing rows are loaded per batch of guilds, the differences are worked
+    out in memory and applied with bulk inserts, updates and deletes.
+    
+    Parameters:
+    - snapshots: List of guild_snapshot() dictionaries
+    
+    Returns:
+    - Dictionary with the number of rows inserted, updated and deleted
+    """
+    stats = {'inserted': 0, 'updated': 0, 'deleted': 0}
+    for start in range(0, len(snapshots), GUILD_BATCH_SIZE):
+        _sync_batch(snapshots[start:start + GUILD_BATCH_SIZE], stats)
+    return stats
+
+# Incremental updates for single guild, channel and role events
+
+def update_server(guild_id, name, icon):
+    Server.query.filter_by(id=guild_id).update({'name': name, 'icon': icon})
+    db.session.commit()
+
+def upsert_channel(row):
+    channel = Channel.query.get(row['id'])
+    if channel:
+        channel.name = row['name']
+    else:
+        db.session.add(Channel(**row))
+    db.session.commit()
+
+def delete_channel(channel_id):
+    # Channels that polls still point at are kept so their names stay visible
+    if not Poll.query.filter_by(channel_id=channel_id).first():
+        Channel.query.filter_by(id=channel_id).delete()
+        db.session.commit()
+
+def upsert_role(row):
+    role = Role.query.get(row['id'])
+    if role:
+        role.name = row['name']
+        role.color = row['color']
+        role.position = row['position']
+    else:
+        db.session.add(Role(vote_weight=1, **row))
+    db.session.commit()
+
+def delete_role(role_id):
+    Role.query.filter_by(id=role_id).delete()
+    db.session.commit()
@@ -0,0 +1,131 @@
+import json
+import queue
+import logging
+import threading
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT_SECONDS = 15
+
+# Events buffered per subscriber before it is told to resync instead
+SUBSCRIBER_QUEUE_SIZE = 256
+
+DASHBOARD = 'dashboard'
+
+def poll_topic(poll_id):
+    return f"poll:{poll_id}"
+
+class Subscription:
+    """A subscriber's event queue; overflowed is set if it fell behind"""
+    
+    def __init__(self, topic):
+        self.topic = topic
+        self.events = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+class LiveUpdates:
+    """
+    In-process publish/subscribe for live dashboard updates
+    
+    Publishers (database commits from the bot and the dashboard) never block:
+    if a subscriber's queue is full its events are dropped and the
+    subscriber is flagged so its stream can send a fresh snapshot.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # topic -> set of Subscription
+    
+    def subscribe(self, topic):
+        subscription = Subscription(topic)
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        metrics.incr('live.subscribed')
+        return subscription
+    
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.topic)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.topic]
+        metrics.incr('live.unsubscribed')
+    
+    def publish(self, topic, event):
+        """
+        Send an event to every subscriber of a topic
+        
+        Parameters:
+        - topic: DASHBOARD or poll_topic(poll_id)
+        - event: Dictionary with a 'type' key; the rest is sent as JSON
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(topic, ()))
+        
+        for subscription in subscribers:
+            try:
+                subscription.events.put_nowait(event)
+            except queue.Full:
+                subscription.overflowed = True
+                metrics.incr('live.dropped')
+        metrics.incr('live.published')
+    
+    def subscriber_count(self, topic=None):
+        with self._lock:
+            if topic is not None:
+                return len(self._subscribers.get(topic, ()))
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+def format_event(event):
+    # Server-Sent Events wire format
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+def sse_stream(subscription, snapshot, version_key=None):
+    """
+    Generator for a text/event-stream response
+    
+    Parameters:
+    - subscription: Subscription returned by live_updates.subscribe()
+    - snapshot: Callable returning the full current state as an event; it is
+      sent first and again whenever the subscriber has fallen behind.
+      It must not need an app context held by the caller.
+    - version_key: Field numbering the snapshot and the delta events. The
+      subscription starts before the snapshot is read, so deltas committed
+      in between are queued too; those at or below the snapshot's number
+      are already part of it and are dropped.
+    """
+    try:
+        state = snapshot()
+        version = state.get(version_key)
+        yield format_event(state)
+        
+        while True:
+            try:
+                event = subscription.events.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            
+            if subscription.overflowed:
+                # Events were dropped, so replace the backlog with the current state
+                subscription.overflowed = False
+                while not subscription.events.empty():
+                    subscription.events.get_nowait()
+                state = snapshot()
+                version = state.get(version_key)
+                yield format_event(state)
+                continue
+            
+            if version is not None and event.get(version_key, version + 1) <= version:
+                metrics.incr('live.already_in_snapshot')
+                continue
+            
+            yield format_event(event)
+    finally:
+        live_updates.unsubscribe(subscription)
+
+# Shared broker for the bot and the dashboard
+live_updates = LiveUpdates()
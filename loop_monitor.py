@@ -0,0 +1,63 @@
+import time
+import types
+import asyncio
+import functools
+import logging
+import metrics
+
+logger = logging.getLogger(__name__)
+
+@types.coroutine
+def _timed_steps(coro, name):
+    # Drive the coroutine one step at a time; each send/throw is a stretch of
+    # time during which this handler alone occupies the event loop
+    blocked = 0.0
+    value, error = None, None
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is not None:
+                    yielded = coro.throw(error)
+                else:
+                    yielded = coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                blocked += time.perf_counter() - start
+            
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                coro.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+    finally:
+        metrics.observe(f'loop.blocked.{name}', blocked)
+
+def measure_blocking(fn):
+    """
+    Decorator for bot coroutines that records how long each call kept the
+    event loop busy (excluding time spent awaiting) as 'loop.blocked.<name>'
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        return await _timed_steps(fn(*args, **kwargs), fn.__name__)
+    return wrapper
+
+async def probe_loop_lag(interval=0.5):
+    """
+    Measure event loop lag forever
+    
+    Sleeps for a fixed interval and records how late the loop woke up as the
+    'loop.lag' timing; large values mean something blocked the loop.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        metrics.observe('loop.lag', lag)
+        if lag > 1:
+            logger.warning(f"Bot event loop was blocked for {lag:.2f}s")
@@ -0,0 +1,34 @@
+import threading
+
+# In-process counters and timings shared by the bot thread and the web server
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+def incr(name, amount=1):
+    """Increase a named counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def observe(name, value):
+    """Record one sample (e.g. a duration in seconds) for a named timing"""
+    with _lock:
+        timing = _timings.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+        timing['count'] += 1
+        timing['total'] += value
+        timing['last'] = value
+        if value > timing['max']:
+            timing['max'] = value
+
+def snapshot():
+    """
+    Get a copy of all metrics
+    
+    Returns:
+    - Dictionary with 'counters' and 'timings' (count, total, avg, max, last per timing)
+    """
+    with _lock:
+        timings = {}
+        for name, timing in _timings.items():
+            timings[name] = dict(timing, avg=timing['total'] / timing['count'] if timing['count'] else 0.0)
+        return {'counters': dict(_counters), 'timings': timings}
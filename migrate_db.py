@@ -0,0 +1,203 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from sqlalchemy import create_engine, inspect, select, func, or_, tuple_, text
+from sqlalchemy.engine import make_url
+from app import app, db
+import models
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+# Rows copied per target transaction
+BATCH_SIZE = 5000
+
+def resolve_url(url):
+    """Resolve a relative SQLite path the way Flask-SQLAlchemy does (under instance/)"""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+        if not os.path.isabs(url.database):
+            url = url.set(database=os.path.join(app.instance_path, url.database))
+    return url
+
+def _valid_rows(table, columns):
+    """
+    Filter for rows whose foreign keys point at an existing row
+    
+    SQLite doesn't enforce foreign keys, so old databases can hold votes of
+    deleted polls and the like, which PostgreSQL would reject.
+    """
+    conditions = []
+    for fk in table.foreign_keys:
+        if fk.parent.name in columns:
+            conditions.append(or_(fk.parent.is_(None), fk.parent.in_(select(fk.column))))
+    return conditions
+
+def _last_key(target, table, pk):
+    """Primary key of the last row already copied to the target, for resuming"""
+    with target.connect() as connection:
+        row = connection.execute(
+            select(*pk).order_by(*[column.desc() for column in pk]).limit(1)
+        ).first()
+    return tuple(row) if row else None
+
+def copy_table(source, target, table, batch_size=BATCH_SIZE):
+    """
+    Copy one table in primary key order, a batch per transaction
+    
+    Rows are read with keyset pagination on the primary key, so a run that
+    was interrupted continues after the last row the target already has.
+    
+    Parameters:
+    - source: Engine of the database to copy from
+    - target: Engine of the database to copy to
+    - table: Table to copy
+    - batch_size: Rows per batch
+    
+    Returns:
+    - (rows copied, rows skipped for pointing at missing rows)
+    """
+    source_columns = {column['name'] for column in inspect(source).get_columns(table.name)}
+    columns = [column for column in table.columns if column.name in source_columns]
+    missing = [column.name for column in table.columns if column.name not in source_columns]
+    if missing:
+        required = [
+            column.name for column in table.columns
+            if column.name in missing and not column.nullable and not column.primary_key
+            and column.default is None and column.server_default is None
+        ]
+        if required:
+            raise ValueError(
+                f"{table.name} has no {', '.join(required)} in the source; "
+                f"run update_schema.py against the source first"
+            )
+        logger.info(f"{table.name}: not in source, using defaults for {', '.join(missing)}")
+    
+    pk = list(table.primary_key.columns)
+    conditions = _valid_rows(table, source_columns)
+    
+    with source.connect() as connection:
+        total = connection.execute(select(func.count()).select_from(table)).scalar()
+        valid = connection.execute(select(func.count()).select_from(table).where(*conditions)).scalar()
+    
+    last_key = _last_key(target, table, pk)
+    done = 0
+    if last_key is not None:
+        with target.connect() as connection:
+            done = connection.execute(select(func.count()).select_from(table)).scalar()
+        logger.info(f"{table.name}: resuming after {last_key}")
+    
+    copied = 0
+    started = time.monotonic()
+    while True:
+        query = select(*columns).where(*conditions).order_by(*pk).limit(batch_size)
+        if last_key is not None:
+            query = query.where(tuple_(*pk) > tuple_(*last_key))
+        
+        with source.connect() as connection:
+            rows = [row._asdict() for row in connection.execute(query)]
+        if not rows:
+            break
+        
+        with target.begin() as connection:
+            connection.execute(table.insert(), rows)
+        
+        copied += len(rows)
+        last_key = tuple(rows[-1][column.name] for column in pk)
+        rate = copied / max(time.monotonic() - started, 1e-6)
+        logger.info(f"{table.name}: {done + copied}/{valid} rows ({rate:.0f} rows/s)")
+    
+    return copied, total - valid
+
+def reset_sequences(target):
+    """
+    Move PostgreSQL ID sequences past the copied IDs
+    
+    Only tables with a generated integer key have a sequence. Discord ID
+    keys (servers, channels, roles) are declared autoincrement=False, so no
+    sequence is created for them and they are skipped here.
+    
+    tests/test_postgres.py runs a migration against a PostgreSQL service in
+    CI. To check a real migration by hand, compare each logged value with
+    the table's max(id), and run SELECT pg_get_serial_sequence('server', 'id')
+    on the target; it should be NULL unless the table was created before
+    the keys were declared autoincrement=False.
+    """
+    if target.dialect.name != 'postgresql':
+        return
+    
+    quote = target.dialect.identifier_preparer.quote
+    with target.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            column = table.autoincrement_column
+            if column is None:
+                continue
+            
+            value = connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence(:table, :column), "
+                f"coalesce(max({quote(column.name)}), 1), max({quote(column.name)}) IS NOT NULL) "
+                f"FROM {quote(table.name)}"
+            ), {'table': quote(table.name), 'column': column.name}).scalar()
+            logger.info(f"{table.name}: {column.name} sequence set to {value}")
+
+def migrate(source_uri, target_uri, batch_size=BATCH_SIZE):
+    """
+    Copy every table of an existing database into another one
+    
+    Parameters:
+    - source_uri: Database to copy from, usually the old SQLite file
+    - target_uri: Database to copy to, e.g. a PostgreSQL URL
+    - batch_size: Rows per target transaction
+    
+    Returns:
+    - Dictionary of table name -> (rows copied, rows skipped)
+    """
+    source = create_engine(resolve_url(source_uri))
+    target = create_engine(resolve_url(target_uri))
+    if source.url == target.url:
+        raise ValueError("Source and target are the same database")
+    
+    logger.info(f"Migrating {source.url!r} to {target.url!r}")
+    db.metadata.create_all(target)
+    
+    results = {}
+    source_tables = set(inspect(source).get_table_names())
+    # sorted_tables lists parents before children (servers before channels, polls before votes)
+    for table in db.metadata.sorted_tables:
+        if table.name not in source_tables:
+            logger.warning(f"{table.name}: not in source, skipped")
+            continue
+        results[table.name] = copy_table(source, target, table, batch_size)
+    
+    reset_sequences(target)
+    
+    for name, (copied, skipped) in results.items():
+        note = f", skipped {skipped} rows pointing at missing rows" if skipped else ""
+        logger.info(f"{name}: copied {copied} rows{note}")
+    if models.PollTally.__tablename__ not in source_tables:
+        logger.warning("The source had no poll tallies; run reconcile_tallies.py against the target")
+    if models.DailyActivity.__tablename__ not in source_tables:
+        logger.warning("The source had no activity rollup; run update_schema.py against the target")
+    
+    source.dispose()
+    target.dispose()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Copy the pollbot database into another database")
+    parser.add_argument('source', help="Database URL to copy from, e.g. sqlite:///regulo_pollbot.db")
+    parser.add_argument('target', nargs='?', default=app.config["SQLALCHEMY_DATABASE_URI"],
+                        help="Database URL to copy to (defaults to DATABASE_URL)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Rows per transaction")
+    args = parser.parse_args()
+    
+    try:
+        migrate(args.source, args.target, args.batch_size)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    
+    logger.info("Migration complete!")
@@ -1,4 +1,3 @@
-import json
 import datetime
 from app import db
 from flask_login import UserMixin
@@ -13,7 +12,7 @@ class User(UserMixin, db.Model):
     created_at = db.Column(db.DateTime, default=func.now())
 
 class Server(db.Model):
-    id = db.Column(db.BigInteger, primary_key=True)  # Discord server ID
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # Discord server ID
     name = db.Column(db.String(100), nullable=False)
     icon = db.Column(db.String(256), nullable=True)
     default_channel_id = db.Column(db.BigInteger, nullable=True)
@@ -25,30 +24,35 @@ class Server(db.Model):
     polls = db.relationship('Poll', backref='server', lazy=True)
 
 class Channel(db.Model):
-    id = db.Column(db.BigInteger, primary_key=True)  # Discord channel ID
-    server_id = db.Column(db.BigInteger, db.ForeignKey('server.id'), nullable=False)
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # Discord channel ID
+    server_id = db.Column(db.BigInteger, db.ForeignKey('server.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     type = db.Column(db.String(20), nullable=False)  # text, voice, etc.
 
 class Role(db.Model):
-    id = db.Column(db.BigInteger, primary_key=True)  # Discord role ID
-    server_id = db.Column(db.BigInteger, db.ForeignKey('server.id'), nullable=False)
+    id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # Discord role ID
+    server_id = db.Column(db.BigInteger, db.ForeignKey('server.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     color = db.Column(db.Integer, nullable=True)
     position = db.Column(db.Integer, nullable=False)
     vote_weight = db.Column(db.Integer, default=1)  # Weight for votes from users with this role
 
 class Poll(db.Model):
+    __table_args__ = (
+        # check_polls looks up due drafts and expired active polls
+        db.Index('ix_poll_status_scheduled_for', 'status', 'scheduled_for'),
+        db.Index('ix_poll_status_expires_at', 'status', 'expires_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     server_id = db.Column(db.BigInteger, db.ForeignKey('server.id'), nullable=False)
     channel_id = db.Column(db.BigInteger, db.ForeignKey('channel.id'), nullable=False)
-    message_id = db.Column(db.BigInteger, nullable=True)  # Discord message ID once posted
+    message_id = db.Column(db.BigInteger, nullable=True, index=True)  # Discord message ID once posted
     
     question = db.Column(db.String(1000), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    options = db.Column(db.Text, nullable=False)  # JSON string of options
     
-    created_at = db.Column(db.DateTime, default=func.now())
+    created_at = db.Column(db.DateTime, default=func.now(), index=True)
     scheduled_for = db.Column(db.DateTime, nullable=True)  # If scheduled for future
     expires_at = db.Column(db.DateTime, nullable=True)  # When poll closes
     
@@ -57,23 +61,54 @@ class Poll(db.Model):
     max_votes = db.Column(db.Integer, default=0)  # 0 = unlimited, >0 = max votes per user
     allow_vote_change = db.Column(db.Boolean, default=True)  # Allow users to change their votes
     show_live_results = db.Column(db.Boolean, default=True)
+    vote_mode = db.Column(db.String(20), nullable=False, default="reactions", server_default='reactions')  # reactions, buttons, select
     
     status = db.Column(db.String(20), default="draft")  # draft, active, closed, cancelled
+    tally_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bumped on every results change
     
     # Relationships
     votes = db.relationship('Vote', backref='poll', lazy=True)
+    option_rows = db.relationship(
+        'PollOption', backref='poll', order_by='PollOption.position',
+        lazy='selectin', cascade='all, delete-orphan'
+    )
+    
+    # (option IDs, labels) in display order, built once per loaded poll
+    _option_cache = None
+    
+    def _parsed_options(self):
+        if self._option_cache is None:
+            rows = self.option_rows
+            parsed = ([row.id for row in rows], [row.label for row in rows])
+            if None in parsed[0]:
+                return parsed  # Not flushed yet, IDs are still to come
+            self._option_cache = parsed
+        return self._option_cache
     
     def get_options(self):
-        return json.loads(self.options)
+        return list(self._parsed_options()[1])
+    
+    def get_option_ids(self):
+        return list(self._parsed_options()[0])
     
     def set_options(self, options_list):
-        self.options = json.dumps(options_list)
+        # Options are matched by position, so a renamed option keeps its ID and votes
+        rows = list(self.option_rows)
+        for position, label in enumerate(options_list):
+            if position < len(rows):
+                rows[position].label = label
+            else:
+                self.option_rows.append(PollOption(position=position, label=label))
+        del self.option_rows[len(options_list):]
+        self._option_cache = None
     
     def get_results(self):
-        results = {option: 0 for option in self.get_options()}
-        for vote in self.votes:
-            if vote.option in results:
-                results[vote.option] += vote.weight
+        # Read the maintained per-option tallies instead of summing every vote
+        labels = dict(zip(self.get_option_ids(), self.get_options()))
+        results = {label: 0 for label in labels.values()}
+        for tally in PollTally.query.filter_by(poll_id=self.id):
+            if tally.option_id in labels:
+                results[labels[tally.option_id]] += tally.weight
         return results
     
     def is_active(self):
@@ -83,14 +118,70 @@ class Poll(db.Model):
             (self.expires_at is None or self.expires_at > now)
         )
 
+class PollOption(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('poll_id', 'position', name='uq_poll_option_position'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # 0-based; also the reaction emoji index
+    label = db.Column(db.String(1000), nullable=False)
+
 class Vote(db.Model):
+    __table_args__ = (
+        # Reaction handlers look up a user's votes (for an option) in a poll
+        db.Index('ix_vote_poll_user_option', 'poll_id', 'user_id', 'option_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), nullable=False)
-    user_id = db.Column(db.BigInteger, nullable=False)  # Discord user ID
+    user_id = db.Column(db.BigInteger, nullable=False, index=True)  # Discord user ID
     username = db.Column(db.String(100), nullable=True)  # Discord username
-    option = db.Column(db.String(1000), nullable=False)
+    option_id = db.Column(db.Integer, db.ForeignKey('poll_option.id'), nullable=False)
     weight = db.Column(db.Integer, default=1)  # Vote weight based on user's role
-    voted_at = db.Column(db.DateTime, default=func.now())
+    voted_at = db.Column(db.DateTime, default=func.now(), index=True)
+    
+    poll_option = db.relationship('PollOption', lazy=True)
+
+class PollTally(db.Model):
+    # Running weighted totals per poll option, kept in step with Vote inserts/deletes
+    poll_id = db.Column(db.Integer, db.ForeignKey('poll.id'), primary_key=True)
+    option_id = db.Column(db.Integer, db.ForeignKey('poll_option.id'), primary_key=True)
+    weight = db.Column(db.Integer, nullable=False, default=0)  # Sum of vote weights
+    votes = db.Column(db.Integer, nullable=False, default=0)  # Number of vote rows
+
+class DailyActivity(db.Model):
+    # Polls created and votes cast per server per day, kept in step with Poll/Vote writes
+    day = db.Column(db.Date, primary_key=True)
+    server_id = db.Column(db.BigInteger, db.ForeignKey('server.id'), primary_key=True)
+    polls_created = db.Column(db.Integer, nullable=False, default=0)
+    votes_cast = db.Column(db.Integer, nullable=False, default=0)
+
+def utc_now():
+    # Naive UTC, the same clock as func.now() on SQLite
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def activity_day(timestamp=None):
+    """
+    Day of the daily activity rollup a stored poll or vote timestamp falls on
+    
+    Timestamps are naive UTC, so rollup days are UTC days everywhere: when
+    the rollup is incremented, decremented, rebuilt (whose SQL date() takes
+    the same date part) and read for the dashboard.
+    
+    Parameters:
+    - timestamp: Stored created_at or voted_at, or None for the current day
+    
+    Returns:
+    - The UTC date
+    """
+    return (timestamp or utc_now()).date()
+
+class LiveSequence(db.Model):
+    # Counters bumped in the same transaction as the changes they number (e.g. dashboard stats events)
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
 
 class BotConfig(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,89 @@
+import datetime
+import threading
+from collections import namedtuple
+
+_FIELDS = [
+    'id', 'message_id', 'channel_id', 'options', 'option_ids', 'expires_at',
+    'is_anonymous', 'allow_multiple', 'max_votes', 'allow_vote_change', 'show_live_results',
+    'vote_mode'
+]
+
+class PollEntry(namedtuple('PollEntry', _FIELDS)):
+    """Snapshot of the poll settings needed to route and validate a vote"""
+    __slots__ = ()
+    
+    @classmethod
+    def from_poll(cls, poll):
+        return cls(
+            id=poll.id,
+            message_id=poll.message_id,
+            channel_id=poll.channel_id,
+            options=tuple(poll.get_options()),
+            option_ids=tuple(poll.get_option_ids()),
+            expires_at=poll.expires_at,
+            is_anonymous=bool(poll.is_anonymous),
+            allow_multiple=bool(poll.allow_multiple),
+            max_votes=poll.max_votes or 0,
+            allow_vote_change=bool(poll.allow_vote_change),
+            show_live_results=bool(poll.show_live_results),
+            vote_mode=poll.vote_mode or 'reactions'
+        )
+    
+    def get_options(self):
+        return list(self.options)
+    
+    def get_option_ids(self):
+        return list(self.option_ids)
+    
+    def is_active(self):
+        return self.expires_at is None or self.expires_at > datetime.datetime.now()
+
+class PollIndex:
+    """
+    In-memory map of posted, active poll messages
+    
+    Lets the vote handlers drop events for non-poll messages without
+    touching the database. Shared between the bot loop and Flask threads.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_message = {}  # message_id -> PollEntry
+        self._by_poll = {}  # poll_id -> message_id
+    
+    def load(self, polls):
+        """Replace the index with the given active polls"""
+        entries = [PollEntry.from_poll(poll) for poll in polls if poll.message_id]
+        with self._lock:
+            self._by_message = {entry.message_id: entry for entry in entries}
+            self._by_poll = {entry.id: entry.message_id for entry in entries}
+    
+    def add(self, poll):
+        """Index (or re-index) a poll that is active on a Discord message"""
+        entry = PollEntry.from_poll(poll)
+        with self._lock:
+            old_message_id = self._by_poll.pop(entry.id, None)
+            self._by_message.pop(old_message_id, None)
+            self._by_message[entry.message_id] = entry
+            self._by_poll[entry.id] = entry.message_id
+    
+    def remove(self, poll_id):
+        """Stop routing reactions to a poll"""
+        with self._lock:
+            message_id = self._by_poll.pop(poll_id, None)
+            self._by_message.pop(message_id, None)
+    
+    def entries(self):
+        """All indexed polls"""
+        with self._lock:
+            return list(self._by_message.values())
+    
+    def get(self, message_id):
+        """Get the PollEntry for a message, or None if it isn't an active poll"""
+        return self._by_message.get(message_id)
+    
+    def __len__(self):
+        return len(self._by_message)
+
+# Shared index used by the bot and the dashboard routes
+poll_index = PollIndex()
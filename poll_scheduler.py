@@ -0,0 +1,135 @@
+import heapq
+import asyncio
+import logging
+import datetime
+import itertools
+
+logger = logging.getLogger(__name__)
+
+POST = 'post'
+CLOSE = 'close'
+
+class PollScheduler:
+    """
+    Timer heap that posts and closes polls at their exact deadlines
+    
+    Runs as a single task on the bot loop that sleeps until the earliest
+    deadline and hands due actions to a PollWorkerPool. Deadlines can be added
+    or cancelled from any thread (e.g. Flask routes); replaced deadlines are
+    left in the heap and skipped when popped.
+    """
+    
+    def __init__(self, post, close, workers):
+        # Coroutine functions taking (poll_id)
+        self._actions = {POST: post, CLOSE: close}
+        self._workers = workers
+        self._heap = []  # (when, seq, poll_id, action, channel_id)
+        self._deadlines = {}  # (poll_id, action) -> when of the live heap entry
+        self._seq = itertools.count()
+        self._running = set()  # (poll_id, action) currently being handled
+        self._tasks = set()
+        self._loop = None
+        self._wakeup = None
+        self._timer = None
+    
+    def start(self, loop):
+        """Start the timer task on the bot loop (no-op if already running)"""
+        if self._timer and not self._timer.done():
+            return
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._timer = loop.create_task(self._run())
+    
+    def _call(self, fn, *args):
+        # Hop onto the bot loop; before the bot runs, startup seeding covers it
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            pass
+    
+    def sync_poll(self, poll):
+        """Schedule whatever a poll needs next given its status and times"""
+        self._call(self._sync, poll.id, poll.channel_id, poll.status, poll.scheduled_for, poll.expires_at)
+    
+    def cancel(self, poll_id):
+        """Drop all pending deadlines for a poll"""
+        self._call(self._cancel, poll_id)
+    
+    def _sync(self, poll_id, channel_id, status, scheduled_for, expires_at):
+        self._cancel(poll_id)
+        if status == "draft":
+            self._push(poll_id, POST, channel_id, scheduled_for or datetime.datetime.now())
+        elif status == "active" and expires_at:
+            self._push(poll_id, CLOSE, channel_id, expires_at)
+    
+    def _push(self, poll_id, action, channel_id, when):
+        self._deadlines[(poll_id, action)] = when
+        heapq.heappush(self._heap, (when, next(self._seq), poll_id, action, channel_id))
+        self._wakeup.set()
+    
+    def _cancel(self, poll_id):
+        self._deadlines.pop((poll_id, POST), None)
+        self._deadlines.pop((poll_id, CLOSE), None)
+    
+    def seed(self, rows):
+        """
+        Load deadlines on the bot loop
+        
+        Parameters:
+        - rows: Iterable of (poll_id, channel_id, status, scheduled_for, expires_at)
+        """
+        for row in rows:
+            self._sync(*row)
+    
+    def run_now(self, poll_id, action, channel_id=None, due=None):
+        """
+        Queue a poll action on the worker pool unless it is already in progress
+        
+        Parameters:
+        - poll_id: ID of the poll
+        - action: POST or CLOSE
+        - channel_id: Channel the poll lives in, so its jobs stay in order
+        - due: When the action was due (defaults to now)
+        """
+        key = (poll_id, action)
+        if key in self._running:
+            return
+        self._deadlines.pop(key, None)
+        self._running.add(key)
+        
+        task = asyncio.create_task(
+            self._workers.run(action, self._actions[action], poll_id, channel_id, due)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._finished(key, done))
+    
+    def _finished(self, key, task):
+        self._running.discard(key)
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Poll {key[1]} for poll {key[0]} failed: {task.exception()}")
+    
+    def pending(self):
+        """Number of live deadlines"""
+        return len(self._deadlines)
+    
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            now = datetime.datetime.now()
+            
+            while self._heap and self._heap[0][0] <= now:
+                when, _, poll_id, action, channel_id = heapq.heappop(self._heap)
+                if self._deadlines.get((poll_id, action)) == when:
+                    self.run_now(poll_id, action, channel_id, when)
+            
+            timeout = None
+            if self._heap:
+                timeout = max(0.0, (self._heap[0][0] - datetime.datetime.now()).total_seconds())
+            
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
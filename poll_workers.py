@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import datetime
+import metrics
+
+logger = logging.getLogger(__name__)
+
+class PollWorkerPool:
+    """
+    Runs poll post/close jobs concurrently with a global concurrency limit
+    
+    Jobs for the same channel run one at a time in submission order, so polls
+    and result messages still appear in a channel in the order they came due.
+    Independent channels proceed in parallel.
+    """
+    
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self._slots = None
+        self._channels = {}  # channel_id -> [asyncio.Lock, number of jobs using it]
+    
+    def _channel_lock(self, channel_id):
+        entry = self._channels.get(channel_id)
+        if entry is None:
+            entry = self._channels[channel_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        return entry[0]
+    
+    def _release_channel(self, channel_id):
+        entry = self._channels[channel_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._channels[channel_id]
+    
+    async def run(self, action, job, poll_id, channel_id=None, due=None):
+        """
+        Run one job once its channel and a worker slot are free
+        
+        Parameters:
+        - action: Name of the job ('post' or 'close'), used for metrics
+        - job: Coroutine function taking (poll_id)
+        - poll_id: ID of the poll
+        - channel_id: Discord channel the job writes to (None = no ordering)
+        - due: When the job was due, for latency accounting
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        
+        due = due or datetime.datetime.now()
+        lock = self._channel_lock(channel_id)
+        try:
+            async with lock:
+                async with self._slots:
+                    metrics.observe(f'polls.{action}_wait', (datetime.datetime.now() - due).total_seconds())
+                    await job(poll_id)
+        finally:
+            self._release_channel(channel_id)
+        
+        latency = max(0.0, (datetime.datetime.now() - due).total_seconds())
+        metrics.observe(f'polls.{action}_latency', latency)
+        logger.info(f"Poll {poll_id} {action} finished {latency:.2f}s after it was due")
@@ -1,9 +1,111 @@
 import datetime
-import json
 import io
-import matplotlib.pyplot as plt
-from app import db
-from models import Poll, Vote, Server, Channel
+from collections import Counter
+from sqlalchemy import func, update, event, and_, or_
+from sqlalchemy.orm import joinedload
+from app import app, db
+from models import Poll, Vote, Server, Channel, PollTally, DailyActivity, BotConfig, LiveSequence, activity_day, utc_now
+from charts import ChartService, poll_chart_args
+from live_updates import live_updates, poll_topic, DASHBOARD
+from vote_state import vote_state
+
+# Shared by the dashboard and the bot so a chart is rendered once per result set
+chart_service = ChartService(app.config["CHART_WORKERS"])
+
+# LiveSequence that numbers the dashboard 'stats' events
+STATS_SEQUENCE = 'dashboard_stats'
+
+# How members vote on a poll message, and the most options each way can show:
+# one keycap emoji per option, or buttons / a select menu whose options also
+# fit the closed results embed (25 fields, one of which names the winner)
+VOTE_MODES = {'reactions': 10, 'buttons': 24, 'select': 24}
+MAX_OPTIONS = max(VOTE_MODES.values())
+
+def _merge_fields(target, fields):
+    # Numbers (and per-key numbers in dicts) add up, anything else is replaced
+    for key, value in fields.items():
+        if isinstance(value, dict):
+            _merge_fields(target.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            target[key] = target.get(key, 0) + value
+        else:
+            target[key] = value
+
+def queue_live_event(topic, event_type, **fields):
+    """
+    Queue a live update that is published once the current transaction commits
+    
+    Events of the same type for the same topic are merged within a
+    transaction, so a batch of votes goes out as a single delta.
+    
+    Parameters:
+    - topic: DASHBOARD or poll_topic(poll_id)
+    - event_type: Event name sent to the browser ('tally', 'status', 'stats')
+    - fields: Event data; numeric values are deltas
+    """
+    events = db.session.info.setdefault('live_events', {})
+    _merge_fields(events.setdefault((topic, event_type), {'type': event_type}), fields)
+
+def queue_status_change(poll_id, old_status, new_status):
+    """Queue the live updates for a poll moving between statuses"""
+    if old_status == new_status:
+        return
+    
+    queue_live_event(poll_topic(poll_id), 'status', status=new_status)
+    
+    active_delta = (new_status == 'active') - (old_status == 'active')
+    if active_delta:
+        queue_live_event(DASHBOARD, 'stats', active_polls=active_delta)
+
+def bump_sequence(name):
+    """
+    Advance a LiveSequence in the current transaction
+    
+    The row stays locked until the transaction ends, so the value returned
+    is the one the commit makes visible.
+    
+    Returns:
+    - The new value
+    """
+    updated = db.session.execute(
+        update(LiveSequence).where(LiveSequence.name == name).values(value=LiveSequence.value + 1)
+    ).rowcount
+    if not updated:
+        db.session.add(LiveSequence(name=name, value=1))
+        db.session.flush()
+    return db.session.query(LiveSequence.value).filter(LiveSequence.name == name).scalar()
+
+@event.listens_for(db.session, 'before_commit')
+def _number_live_events(session):
+    # Streams drop events their snapshot already includes by comparing these numbers
+    events = session.info.get('live_events')
+    if not events:
+        return
+    
+    tally_polls = session.info.pop('tally_polls', set())
+    if tally_polls:
+        versions = session.query(Poll.id, Poll.tally_version).filter(Poll.id.in_(tally_polls))
+        for poll_id, version in versions:
+            tally_event = events.get((poll_topic(poll_id), 'tally'))
+            if tally_event is not None:
+                tally_event['tally_version'] = version
+    
+    stats_event = events.get((DASHBOARD, 'stats'))
+    if stats_event is not None:
+        stats_event['stats_version'] = bump_sequence(STATS_SEQUENCE)
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_live_events(session):
+    session.info.pop('tally_polls', None)
+    for (topic, _), live_event in session.info.pop('live_events', {}).items():
+        live_updates.publish(topic, live_event)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_live_events(session):
+    session.info.pop('live_events', None)
+    session.info.pop('tally_polls', None)
+    session.info.pop('pending_tallies', None)
+    session.info.pop('pending_activity', None)
 
 def create_poll(server_id, channel_id, question, options, **kwargs):
     """
@@ -23,16 +125,120 @@ def create_poll(server_id, channel_id, question, options, **kwargs):
         server_id=server_id,
         channel_id=channel_id,
         question=question,
-        options=json.dumps(options),
         status='draft',
         **kwargs
     )
+    poll.set_options(options)
+    if poll.created_at is None:
+        # Stamped here so the rollup day below is the one stored with the poll
+        poll.created_at = utc_now()
     
     db.session.add(poll)
+    adjust_activity(server_id, activity_day(poll.created_at), polls=1)
+    queue_live_event(DASHBOARD, 'stats', total_polls=1)
     db.session.commit()
     
     return poll
 
+# Columns the poll list can be sorted by
+SORT_COLUMNS = {
+    'created_at': Poll.created_at,
+    'scheduled_for': Poll.scheduled_for,
+    'expires_at': Poll.expires_at
+}
+
+def encode_cursor(value, poll_id):
+    # Position of the last row on a page: "<iso timestamp or empty>~<poll id>"
+    return f"{value.isoformat() if value else ''}~{poll_id}"
+
+def decode_cursor(cursor):
+    try:
+        value, poll_id = cursor.rsplit('~', 1)
+        return (datetime.datetime.fromisoformat(value) if value else None), int(poll_id)
+    except (AttributeError, ValueError):
+        return None
+
+def list_polls(status='all', sort_by='created_at', order='desc', cursor=None, limit=25):
+    """
+    Get one page of polls for the poll list using keyset pagination
+    
+    Rows are ordered by the sort column (polls without a value last) and
+    then by ID, so a page continues right after the cursor row without
+    counting or skipping earlier rows. The creation date sort pages on the
+    ID alone, which follows creation order.
+    
+    Parameters:
+    - status: Status to filter by, or 'all'
+    - sort_by: Key of SORT_COLUMNS (anything else sorts by creation date)
+    - order: 'asc' or 'desc'
+    - cursor: Cursor of the previous page's last row, from encode_cursor()
+    - limit: Page size
+    
+    Returns:
+    - List of polls with server_name, channel_name and vote_count set
+    - Cursor for the next page, or None on the last page
+    """
+    column = SORT_COLUMNS.get(sort_by, Poll.created_at)
+    descending = order != 'asc'
+    
+    # IDs follow creation order, and paging on them avoids comparing created_at,
+    # which func.now() stores on SQLite without the microseconds a bound datetime has
+    if column is Poll.created_at:
+        column = Poll.id
+    
+    query = db.session.query(Poll, Server.name, Channel.name).outerjoin(
+        Server, Server.id == Poll.server_id
+    ).outerjoin(
+        Channel, Channel.id == Poll.channel_id
+    )
+    
+    if status != 'all':
+        query = query.filter(Poll.status == status)
+    
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        value, last_id = position
+        id_after = Poll.id < last_id if descending else Poll.id > last_id
+        if column is Poll.id:
+            query = query.filter(id_after)
+        elif value is None:
+            # Already into the polls without a value
+            query = query.filter(column.is_(None), id_after)
+        else:
+            value_after = column < value if descending else column > value
+            query = query.filter(or_(
+                column.is_(None),
+                value_after,
+                and_(column == value, id_after)
+            ))
+    
+    if column is not Poll.id:
+        query = query.order_by(column.is_(None), column.desc() if descending else column.asc())
+    query = query.order_by(Poll.id.desc() if descending else Poll.id.asc())
+    rows = query.limit(limit + 1).all()
+    
+    polls = []
+    for poll, server_name, channel_name in rows[:limit]:
+        poll.server_name = server_name or 'Unknown Server'
+        poll.channel_name = channel_name or 'Unknown Channel'
+        polls.append(poll)
+    
+    # Vote counts for the whole page in one grouped query over the tallies
+    counts = dict(
+        db.session.query(PollTally.poll_id, func.sum(PollTally.votes))
+        .filter(PollTally.poll_id.in_([poll.id for poll in polls]))
+        .group_by(PollTally.poll_id)
+    ) if polls else {}
+    for poll in polls:
+        poll.vote_count = int(counts.get(poll.id) or 0)
+    
+    next_cursor = None
+    if len(rows) > limit:
+        last = polls[-1]
+        next_cursor = encode_cursor(None if column is Poll.id else getattr(last, column.key), last.id)
+    
+    return polls, next_cursor
+
 def get_poll_results(poll_id):
     """
     Get the results for a poll
@@ -49,19 +255,294 @@ def get_poll_results(poll_id):
     if not poll:
         return None, 0, []
     
-    options = poll.get_options()
-    results = {option: 0 for option in options}
+    results = poll.get_results()
+    total_votes = sum(results.values())
+    
+    votes = []
+    if not poll.is_anonymous:
+        votes = Vote.query.options(joinedload(Vote.poll_option)).filter_by(poll_id=poll_id).all()
     
-    votes = Vote.query.filter_by(poll_id=poll_id).all()
+    return results, total_votes, votes
+
+def adjust_tally(poll_id, option_id, weight, count):
+    """
+    Apply a vote delta to the running tally of a poll option
     
-    # Count votes for each option
-    for vote in votes:
-        if vote.option in results:
-            results[vote.option] += vote.weight
+    The caller is responsible for committing, so the tally change lands in
+    the same transaction as the vote insert/delete it mirrors. Inside
+    defer_counters() the delta is only collected.
     
-    total_votes = sum(results.values())
+    Parameters:
+    - poll_id: ID of the poll
+    - option_id: ID of the option the vote was cast for
+    - weight: Weight to add (negative when a vote is removed)
+    - count: Number of votes to add (negative when a vote is removed)
+    """
+    pending = db.session.info.get('pending_tallies')
+    if pending is not None:
+        old_weight, old_count = pending.get((poll_id, option_id), (0, 0))
+        pending[(poll_id, option_id)] = (old_weight + weight, old_count + count)
+    else:
+        _write_tally(poll_id, option_id, weight, count)
+        bump_tally_version([poll_id])
     
-    return results, total_votes, votes if not poll.is_anonymous else []
+    queue_live_event(poll_topic(poll_id), 'tally', weights={option_id: weight}, votes={option_id: count})
+    db.session.info.setdefault('tally_polls', set()).add(poll_id)
+    queue_live_event(DASHBOARD, 'stats', total_votes=count)
+
+def _write_tally(poll_id, option_id, weight, count):
+    updated = db.session.execute(
+        update(PollTally)
+        .where(PollTally.poll_id == poll_id, PollTally.option_id == option_id)
+        .values(weight=PollTally.weight + weight, votes=PollTally.votes + count)
+    ).rowcount
+    
+    if not updated:
+        db.session.add(PollTally(poll_id=poll_id, option_id=option_id, weight=weight, votes=count))
+
+def bump_tally_version(poll_ids=None):
+    """
+    Mark the results of polls as changed so cached snapshots are rebuilt
+    
+    Parameters:
+    - poll_ids: List of poll IDs (all polls if omitted)
+    """
+    statement = update(Poll).values(tally_version=Poll.tally_version + 1)
+    if poll_ids is not None:
+        statement = statement.where(Poll.id.in_(poll_ids))
+    db.session.execute(statement, execution_options={'synchronize_session': False})
+
+def seed_tallies(poll_id, option_ids):
+    """
+    Create zero tallies for poll options that don't have one yet
+    
+    Seeding when a poll goes live means vote writes only ever update
+    existing tally rows. The caller is responsible for committing.
+    """
+    existing = {
+        option_id for option_id, in PollTally.query.with_entities(PollTally.option_id).filter_by(poll_id=poll_id)
+    }
+    for option_id in option_ids:
+        if option_id not in existing:
+            db.session.add(PollTally(poll_id=poll_id, option_id=option_id, weight=0, votes=0))
+            existing.add(option_id)
+
+def replace_options(poll, options):
+    """
+    Give a poll new option labels
+    
+    Options are matched by position, so renamed options keep their votes.
+    Votes for options past the end of the new list are removed. The caller
+    is responsible for committing.
+    
+    Parameters:
+    - poll: Poll to update
+    - options: List of option labels
+    """
+    removed = [row.id for row in poll.option_rows[len(options):]]
+    if removed:
+        for vote in Vote.query.filter(Vote.option_id.in_(removed)):
+            remove_vote(vote)
+        PollTally.query.filter(PollTally.option_id.in_(removed)).delete(synchronize_session=False)
+    poll.set_options(options)
+
+_poll_servers = {}  # poll_id -> server_id; a poll never moves between servers
+
+def poll_server_id(poll_id):
+    server_id = _poll_servers.get(poll_id)
+    if server_id is None:
+        server_id = Poll.query.with_entities(Poll.server_id).filter_by(id=poll_id).scalar()
+        if len(_poll_servers) >= 100000:
+            _poll_servers.clear()
+        _poll_servers[poll_id] = server_id
+    return server_id
+
+def adjust_activity(server_id, day=None, polls=0, votes=0):
+    """
+    Apply a delta to the daily activity rollup of a server
+    
+    The caller is responsible for committing. Inside defer_counters() the
+    delta is only collected.
+    
+    Parameters:
+    - server_id: Discord server ID
+    - day: UTC date the activity belongs to, from activity_day() (defaults to today)
+    - polls: Number of polls created to add
+    - votes: Number of votes cast to add (negative when votes are removed)
+    """
+    day = day or activity_day()
+    
+    pending = db.session.info.get('pending_activity')
+    if pending is not None:
+        old_polls, old_votes = pending.get((server_id, day), (0, 0))
+        pending[(server_id, day)] = (old_polls + polls, old_votes + votes)
+        return
+    
+    _write_activity(server_id, day, polls, votes)
+
+def _write_activity(server_id, day, polls, votes):
+    updated = db.session.execute(
+        update(DailyActivity)
+        .where(DailyActivity.day == day, DailyActivity.server_id == server_id)
+        .values(
+            polls_created=DailyActivity.polls_created + polls,
+            votes_cast=DailyActivity.votes_cast + votes
+        )
+    ).rowcount
+    
+    if not updated:
+        db.session.add(DailyActivity(day=day, server_id=server_id, polls_created=polls, votes_cast=votes))
+
+def defer_counters():
+    """
+    Collect tally and activity deltas in the session instead of writing each
+    
+    Used for batches of vote writes: write_counters() then updates each
+    distinct poll option and server day once. Tallies read in between don't
+    include the collected deltas.
+    """
+    db.session.info['pending_tallies'] = {}
+    db.session.info['pending_activity'] = {}
+
+def write_counters():
+    """Write the deltas collected since defer_counters(); the caller commits"""
+    tallies = db.session.info.pop('pending_tallies', {})
+    activity = db.session.info.pop('pending_activity', {})
+    
+    for (poll_id, option_id), (weight, count) in tallies.items():
+        if weight or count:
+            _write_tally(poll_id, option_id, weight, count)
+    if tallies:
+        bump_tally_version(sorted({poll_id for poll_id, _ in tallies}))
+    
+    for (server_id, day), (polls, votes) in activity.items():
+        if polls or votes:
+            _write_activity(server_id, day, polls, votes)
+
+def rebuild_activity():
+    """
+    Rebuild the daily activity rollup from the Poll and Vote tables
+    
+    Returns:
+    - Number of rollup rows written
+    """
+    rows = {}
+    
+    # date() of the stored UTC timestamps, the same day activity_day() gives
+    poll_days = db.session.query(
+        func.date(Poll.created_at), Poll.server_id, func.count(Poll.id)
+    ).group_by(func.date(Poll.created_at), Poll.server_id)
+    for day, server_id, count in poll_days:
+        rows.setdefault((day, server_id), {'polls_created': 0, 'votes_cast': 0})['polls_created'] = count
+    
+    vote_days = db.session.query(
+        func.date(Vote.voted_at), Poll.server_id, func.count(Vote.id)
+    ).join(Poll, Poll.id == Vote.poll_id).group_by(func.date(Vote.voted_at), Poll.server_id)
+    for day, server_id, count in vote_days:
+        rows.setdefault((day, server_id), {'polls_created': 0, 'votes_cast': 0})['votes_cast'] = count
+    
+    DailyActivity.query.delete(synchronize_session=False)
+    
+    values = [
+        {'day': _as_date(day), 'server_id': server_id, **counts}
+        for (day, server_id), counts in rows.items() if day is not None
+    ]
+    if values:
+        db.session.execute(DailyActivity.__table__.insert(), values)
+    
+    db.session.commit()
+    return len(values)
+
+def _as_date(value):
+    # SQLite's date() returns text, other databases return a date
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+def record_vote(vote):
+    """Add a vote to the session and count it in the poll tally and daily activity"""
+    if vote.weight is None:
+        vote.weight = 1
+    if vote.voted_at is None:
+        # Stamped here so the rollup day below is the one stored with the vote
+        vote.voted_at = utc_now()
+    day = activity_day(vote.voted_at)
+    db.session.add(vote)
+    adjust_tally(vote.poll_id, vote.option_id, vote.weight, 1)
+    adjust_activity(poll_server_id(vote.poll_id), day, votes=1)
+    vote_state.record(vote.poll_id, vote.user_id, vote.option_id, vote.weight, day)
+
+def remove_vote(vote):
+    """Delete a vote from the session and take it out of the poll tally and daily activity"""
+    poll_id, option_id, weight, day = vote.poll_id, vote.option_id, vote.weight, activity_day(vote.voted_at)
+    db.session.delete(vote)
+    adjust_tally(poll_id, option_id, -weight, -1)
+    adjust_activity(poll_server_id(poll_id), day, votes=-1)
+    vote_state.discard(poll_id, vote.user_id, option_id)
+
+def delete_vote(poll_id, user_id, option_id, weight, day):
+    """
+    Delete a vote without loading it, like remove_vote
+    
+    Parameters:
+    - poll_id, user_id, option_id: Identify the vote
+    - weight, day: The vote's weight and the day it was cast, as held by vote_state
+    """
+    Vote.query.filter_by(poll_id=poll_id, user_id=user_id, option_id=option_id).delete()
+    adjust_tally(poll_id, option_id, -weight, -1)
+    adjust_activity(poll_server_id(poll_id), day, votes=-1)
+    vote_state.discard(poll_id, user_id, option_id)
+
+def remove_poll_activity(poll):
+    """Take a poll and its votes out of the daily activity rollup before it is deleted"""
+    vote_days = Counter(
+        activity_day(voted_at)
+        for voted_at, in db.session.query(Vote.voted_at).filter(Vote.poll_id == poll.id)
+    )
+    
+    for day, count in vote_days.items():
+        adjust_activity(poll.server_id, day, votes=-count)
+    adjust_activity(poll.server_id, activity_day(poll.created_at), polls=-1)
+
+def rebuild_tallies(poll_ids=None):
+    """
+    Rebuild poll tallies from the Vote table
+    
+    Parameters:
+    - poll_ids: Optional list of poll IDs to rebuild (all polls if omitted)
+    
+    Returns:
+    - Number of tally rows written
+    """
+    tally_query = PollTally.query
+    vote_query = db.session.query(
+        Vote.poll_id,
+        Vote.option_id,
+        func.sum(Vote.weight),
+        func.count(Vote.id)
+    ).group_by(Vote.poll_id, Vote.option_id)
+    
+    if poll_ids is not None:
+        tally_query = tally_query.filter(PollTally.poll_id.in_(poll_ids))
+        vote_query = vote_query.filter(Vote.poll_id.in_(poll_ids))
+    
+    tally_query.delete(synchronize_session=False)
+    
+    rows = [
+        {'poll_id': poll_id, 'option_id': option_id, 'weight': weight or 0, 'votes': votes}
+        for poll_id, option_id, weight, votes in vote_query
+    ]
+    if rows:
+        db.session.execute(PollTally.__table__.insert(), rows)
+    
+    bump_tally_version(poll_ids)
+    db.session.commit()
+    return len(rows)
+
+def chart_theme():
+    # Charts follow the dashboard theme from the bot configuration
+    config = BotConfig.query.first()
+    return config.theme if config and config.theme else 'dark'
 
 def generate_chart(poll_id, chart_type='bar'):
     """
@@ -78,33 +559,6 @@ def generate_chart(poll_id, chart_type='bar'):
     if not poll:
         return None
     
-    options = poll.get_options()
-    results, total_votes, _ = get_poll_results(poll_id)
-    
-    # Create figure
-    plt.figure(figsize=(10, 6))
-    
-    if chart_type == 'pie':
-        # Create pie chart
-        plt.pie(
-            [results.get(option, 0) for option in options],
-            labels=[f"{option} ({results.get(option, 0)})" for option in options],
-            autopct='%1.1f%%',
-            startangle=90
-        )
-        plt.axis('equal')
-    else:
-        # Create bar chart
-        plt.bar(options, [results.get(option, 0) for option in options], color='cornflowerblue')
-        plt.xticks(rotation=45, ha='right')
-        plt.ylabel('Votes')
-    
-    plt.title(f"Results: {poll.question}")
-    plt.tight_layout()
-    
-    # Save chart to buffer
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png')
-    buf.seek(0)
-    
-    return buf
+    title, labels, values = poll_chart_args(poll, poll.get_results())
+    png = chart_service.render(poll.id, title, labels, values, chart_type, chart_theme())
+    return io.BytesIO(png)
@@ -0,0 +1,94 @@
+import time
+import random
+import asyncio
+import logging
+import discord
+from app import app
+import metrics
+
+logger = logging.getLogger(__name__)
+
+INLINE = 'inline'
+BACKGROUND = 'background'
+
+class ReactionSeeder:
+    """
+    Adds the option emojis to newly posted poll messages
+    
+    The emojis of one message go on strictly in order, because Discord lists
+    reactions in the order they were first added; they all share one
+    rate-limit bucket anyway, which discord.py already paces. What discord.py
+    gives up on (a 429 after its own retries, a RateLimited over its timeout,
+    a 5xx) is retried here after the advertised delay or a jittered backoff.
+    Messages in different channels have their own buckets, so seeding them
+    in background tasks runs them side by side.
+    """
+    
+    def __init__(self, retries, backoff=0.5):
+        self.retries = retries
+        self.backoff = backoff
+        self._tasks = set()
+    
+    def _retry_delay(self, error, attempt):
+        """Seconds to wait before retrying after an error, or None if it can't be retried"""
+        if isinstance(error, discord.RateLimited):
+            return error.retry_after
+        if error.status == 429:
+            retry_after = error.response.headers.get('Retry-After') if error.response is not None else None
+            if retry_after:
+                return float(retry_after)
+        elif error.status < 500:
+            return None
+        return self.backoff * 2 ** attempt * random.uniform(1, 1.5)
+    
+    async def _add(self, message, emoji):
+        attempt = 0
+        while True:
+            try:
+                await message.add_reaction(emoji)
+                return
+            except (discord.RateLimited, discord.HTTPException) as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None or attempt >= self.retries:
+                    raise
+            
+            attempt += 1
+            metrics.incr('reactions.retries')
+            logger.warning(f"Adding {emoji} to message {message.id} was rate limited, retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+    
+    async def seed(self, message, emojis):
+        """
+        Add emojis to a message in order
+        
+        Parameters:
+        - message: The posted poll message
+        - emojis: Emojis to add, in option order
+        """
+        started = time.perf_counter()
+        for emoji in emojis:
+            await self._add(message, emoji)
+        metrics.observe('reactions.seed_seconds', time.perf_counter() - started)
+    
+    def seed_in_background(self, message, emojis):
+        """Seed a message's reactions in a task while the poll already takes votes"""
+        task = asyncio.create_task(self._seed_logged(message, emojis))
+        # Keep a reference so the task isn't garbage collected mid-way
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+    
+    async def _seed_logged(self, message, emojis):
+        try:
+            await self.seed(message, emojis)
+        except Exception as e:
+            metrics.incr('reactions.seed_failures')
+            logger.error(f"Failed to add reactions to message {message.id}: {str(e)}")
+    
+    @property
+    def pending(self):
+        """Messages still being seeded in the background"""
+        return len(self._tasks)
+
+# Shared by post_poll
+reaction_seeder = ReactionSeeder(app.config["REACTION_SEED_RETRIES"])
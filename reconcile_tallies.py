@@ -0,0 +1,25 @@
+import sys
+import logging
+from app import app, db
+import models
+from polls import rebuild_tallies
+
+# Configure logging
+logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+def reconcile_tallies(poll_ids=None):
+    """Rebuild the per-option poll tallies from the Vote table"""
+    logger.info("Reconciling poll tallies...")
+    
+    with app.app_context():
+        db.create_all()
+        rows = rebuild_tallies(poll_ids)
+        logger.info(f"Rebuilt {rows} tally rows.")
+    
+    logger.info("Tally reconciliation complete!")
+
+if __name__ == "__main__":
+    # Optionally pass poll IDs to only rebuild those polls
+    poll_ids = [int(arg) for arg in sys.argv[1:]] or None
+    reconcile_tallies(poll_ids)
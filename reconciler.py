@@ -0,0 +1,200 @@
+import time
+import asyncio
+import datetime
+import logging
+import discord
+from collections import Counter
+from models import Vote
+from db_executor import run_db
+from vote_pipeline import vote_pipeline
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Reactors handed to the vote pipeline at a time
+CHUNK_SIZE = 500
+
+# Counters reported for each run
+STATS = ('reactions', 'added', 'removed', 'conflicts', 'skipped', 'failed', 'errors')
+
+def _stored_voters(poll_id, option_id):
+    # IDs of the members with a stored vote for an option
+    return {user_id for user_id, in Vote.query.with_entities(Vote.user_id).filter_by(
+        poll_id=poll_id,
+        option_id=option_id
+    )}
+
+class ReactionReconciler:
+    """
+    Brings stored reaction votes back in line with the reactions on Discord
+    
+    Reactions added or removed while the bot was offline never reach the
+    reaction handlers. A run walks the option reactions of every active
+    reaction poll, a few polls at a time, and diffs them against the stored
+    votes: reactors without a vote get one, votes without a reaction are
+    withdrawn. Changes go through the vote pipeline, so they are group
+    committed in order with live votes and follow the same tally and vote
+    state bookkeeping.
+    
+    Reactors are streamed page by page from reaction.users(); per option
+    only the set of stored voter IDs is held in memory. That set is read
+    before the reactors, so a vote cast live during the run is never
+    mistaken for a stale one. The other way round, a live reaction event
+    that reaches the pipeline after the run recorded its vote finds the
+    vote present and leaves it (see cast_vote) instead of toggling it off.
+    
+    Anonymous polls are skipped, because their reactions are removed as
+    soon as the vote is stored; so are button and select menu polls.
+    """
+    
+    def __init__(self, fetch_message, on_change, emojis, concurrency):
+        # Coroutine function taking (PollEntry) that fetches the poll's message with fresh reactions
+        self._fetch_message = fetch_message
+        # Called with (PollEntry) when a poll's votes changed
+        self._on_change = on_change
+        self._emojis = emojis
+        self._semaphore = None
+        self._concurrency = max(1, concurrency)
+        self._task = None
+        self.last_run = None
+    
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+    
+    def start(self, entries, reason):
+        """
+        Reconcile the given polls in a background task on the bot loop
+        
+        A run that is already going is left to finish instead.
+        
+        Returns:
+        - The running task
+        """
+        if not self.running:
+            self._task = asyncio.create_task(self.run(entries, reason))
+        return self._task
+    
+    async def run(self, entries, reason):
+        """Reconcile polls (PollEntry objects) and return the run's statistics"""
+        if self._semaphore is None:
+            # Created lazily so it belongs to the bot's running loop
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        
+        entries = [entry for entry in entries if entry.vote_mode == 'reactions' and not entry.is_anonymous]
+        stats = Counter()
+        started = time.perf_counter()
+        self.last_run = {'reason': reason, 'started_at': datetime.datetime.now().isoformat(), 'running': True}
+        logger.info(f"Reconciling reactions on {len(entries)} polls ({reason})")
+        
+        results = await asyncio.gather(*(self._reconcile_bounded(entry) for entry in entries))
+        for result in results:
+            stats.update(result)
+        
+        seconds = time.perf_counter() - started
+        metrics.incr('reconcile.runs')
+        metrics.incr('reconcile.votes_added', stats['added'])
+        metrics.incr('reconcile.votes_removed', stats['removed'])
+        metrics.observe('reconcile.seconds', seconds)
+        
+        # Replaced rather than updated, as the dashboard reads it from another thread
+        self.last_run = dict(
+            self.last_run, **{key: stats[key] for key in STATS},
+            polls=len(entries), seconds=round(seconds, 3), running=False
+        )
+        logger.info(
+            f"Reconciled {len(entries)} polls in {seconds:.1f}s: {stats['reactions']} reactions, "
+            f"{stats['added']} votes added, {stats['removed']} removed, {stats['conflicts']} conflicts"
+        )
+        return dict(self.last_run)
+    
+    async def _reconcile_bounded(self, entry):
+        async with self._semaphore:
+            try:
+                return await self.reconcile_poll(entry)
+            except discord.NotFound:
+                # Message deleted while the bot was away; nothing to reconcile
+                return Counter(skipped=1)
+            except Exception as e:
+                logger.error(f"Failed to reconcile poll {entry.id}: {str(e)}")
+                return Counter(failed=1)
+    
+    async def reconcile_poll(self, entry):
+        """
+        Reconcile one poll's stored votes with its message reactions
+        
+        Returns:
+        - Counter of reactions seen, votes added and removed, and conflicts
+        """
+        message = await self._fetch_message(entry)
+        reactions = {str(reaction.emoji): reaction for reaction in message.reactions}
+        guild_id = message.guild.id if message.guild else None
+        stats = Counter()
+        conflicts = []
+        
+        for emoji, option_id in zip(self._emojis, entry.option_ids):
+            stored = await run_db(_stored_voters, entry.id, option_id)
+            
+            reaction = reactions.get(emoji)
+            if reaction is not None:
+                chunk = []
+                async for user in reaction.users(limit=None):
+                    if user.id == message.author.id:
+                        continue  # The bot's own option reaction
+                    stats['reactions'] += 1
+                    if user.id in stored:
+                        stored.discard(user.id)
+                    else:
+                        chunk.append(user)
+                    if len(chunk) >= CHUNK_SIZE:
+                        conflicts += await self._add(entry, guild_id, option_id, chunk, stats)
+                        chunk = []
+                conflicts += await self._add(entry, guild_id, option_id, chunk, stats)
+            
+            # Whatever is left lost its reaction while the bot was away
+            await self._remove(entry, option_id, stored, stats)
+        
+        # A vote that moved between options is only free to be added once the old one is gone
+        for option_id, users in self._group(conflicts).items():
+            stats['conflicts'] += len(await self._add(entry, guild_id, option_id, users, stats))
+        
+        if stats['added'] or stats['removed']:
+            self._on_change(entry)
+            logger.info(f"Poll {entry.id}: added {stats['added']} and removed {stats['removed']} votes from reactions")
+        return stats
+    
+    def _group(self, conflicts):
+        grouped = {}
+        for option_id, user in conflicts:
+            grouped.setdefault(option_id, []).append(user)
+        return grouped
+    
+    async def _add(self, entry, guild_id, option_id, users, stats):
+        # Returns the (option ID, user) pairs the poll's limits didn't leave room for
+        outcomes = await asyncio.gather(*(
+            vote_pipeline.add(
+                entry, guild_id, [role.id for role in getattr(user, 'roles', [])],
+                user.id, user.display_name, option_id
+            )
+            for user in users
+        ), return_exceptions=True)
+        
+        conflicts = []
+        for user, outcome in zip(users, outcomes):
+            if isinstance(outcome, Exception):
+                stats['errors'] += 1
+            elif outcome == 'recorded':
+                stats['added'] += 1
+            elif outcome == 'limit_reached':
+                conflicts.append((option_id, user))
+        return conflicts
+    
+    async def _remove(self, entry, option_id, user_ids, stats):
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), CHUNK_SIZE):
+            removed = await asyncio.gather(*(
+                vote_pipeline.withdraw(entry.id, user_id, option_id)
+                for user_id in user_ids[start:start + CHUNK_SIZE]
+            ), return_exceptions=True)
+            stats['removed'] += sum(1 for result in removed if result is True)
+            stats['errors'] += sum(1 for result in removed if isinstance(result, Exception))
@@ -0,0 +1,95 @@
+import threading
+from collections import OrderedDict
+from models import Poll, PollOption, PollTally
+import metrics
+
+class ResultsSnapshots:
+    """
+    Cached JSON-ready results per poll, keyed by the poll's tally version
+    
+    Checking whether a snapshot is current costs one primary key lookup of
+    the poll's status and tally_version; the tallies are only read again
+    after a vote (or edit) bumps the version.
+    """
+    
+    MAX_POLLS = 1024  # Snapshots kept before the least recently used is dropped
+    BUILD_ATTEMPTS = 5  # Tally reads before settling for one a vote raced
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()  # poll_id -> snapshot dict
+    
+    def head(self, poll_id):
+        """
+        Get (status, tally_version) for a poll, or None if it doesn't exist
+        
+        Needs an app context.
+        """
+        row = Poll.query.with_entities(Poll.status, Poll.tally_version).filter_by(id=poll_id).first()
+        return (row.status, row.tally_version) if row else None
+    
+    @staticmethod
+    def etag(poll_id, status, version):
+        return f"{poll_id}-{version}-{status}"
+    
+    def get(self, poll_id, status, version):
+        """
+        Get the results snapshot for a poll at the given version
+        
+        Parameters:
+        - poll_id: ID of the poll
+        - status, version: Values returned by head()
+        
+        Returns:
+        - Dictionary with labels, weighted counts, total, status and tally
+          version; the version can be newer than asked for if votes came in
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(poll_id)
+            if snapshot and snapshot['tally_version'] == version and snapshot['status'] == status:
+                self._snapshots.move_to_end(poll_id)
+                metrics.incr('results.snapshot_hits')
+                return snapshot
+        
+        snapshot = self._build(poll_id, status, version)
+        metrics.incr('results.snapshot_builds')
+        with self._lock:
+            self._snapshots[poll_id] = snapshot
+            self._snapshots.move_to_end(poll_id)
+            while len(self._snapshots) > self.MAX_POLLS:
+                self._snapshots.popitem(last=False)
+        return snapshot
+    
+    def _build(self, poll_id, status, version):
+        options = PollOption.query.with_entities(PollOption.id, PollOption.label).filter_by(
+            poll_id=poll_id
+        ).order_by(PollOption.position).all()
+        
+        for _ in range(self.BUILD_ATTEMPTS):
+            weights = dict(
+                PollTally.query.with_entities(PollTally.option_id, PollTally.weight).filter_by(poll_id=poll_id)
+            )
+            # A vote committed while reading means the tallies may be ahead of the version
+            head = self.head(poll_id)
+            if head is None or head == (status, version):
+                break
+            status, version = head
+        
+        counts = [weights.get(option_id, 0) for option_id, _ in options]
+        
+        return {
+            'poll_id': poll_id,
+            'status': status,
+            'tally_version': version,
+            'options': [label for _, label in options],
+            'option_ids': [option_id for option_id, _ in options],
+            'counts': counts,
+            'total_votes': sum(counts)
+        }
+    
+    def forget(self, poll_id):
+        with self._lock:
+            self._snapshots.pop(poll_id, None)
+
+# Shared by the results endpoints
+results_snapshots = ResultsSnapshots()
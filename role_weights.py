@@ -0,0 +1,82 @@
+import threading
+from models import Role
+
+class RoleWeightCache:
+    """
+    Per-guild map of role ID -> vote weight
+    
+    Each guild's weights are loaded with a single query on first use, and a
+    member's vote weight is then resolved in memory from their role IDs.
+    Resolved weights are also memoized per distinct role set.
+    
+    The query runs outside the lock, so a load that raced an invalidate()
+    is returned to its caller but not cached.
+    """
+    
+    MAX_ROLE_SETS = 10000  # Memoized role sets kept per guild
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._weights = {}  # guild_id -> {role_id: vote_weight}
+        self._resolved = {}  # guild_id -> {frozenset(role_ids): weight}
+        self._generations = {}  # guild_id -> invalidation count, to drop loads that raced an invalidate()
+        self._epoch = 0  # Bumped when every guild is invalidated
+    
+    def _guild_weights(self, guild_id):
+        weights = self._weights.get(guild_id)
+        if weights is None:
+            with self._lock:
+                generation = (self._epoch, self._generations.get(guild_id, 0))
+            
+            # Needs an app context; only roles with a non-default weight matter
+            rows = Role.query.with_entities(Role.id, Role.vote_weight).filter(
+                Role.server_id == guild_id,
+                Role.vote_weight > 1
+            ).all()
+            weights = {role_id: weight for role_id, weight in rows}
+            with self._lock:
+                if (self._epoch, self._generations.get(guild_id, 0)) == generation:
+                    self._weights[guild_id] = weights
+                    self._resolved[guild_id] = {}
+        return weights
+    
+    def resolve(self, guild_id, role_ids):
+        """
+        Get the vote weight for a member
+        
+        Parameters:
+        - guild_id: Discord server ID
+        - role_ids: IDs of the roles the member holds
+        
+        Returns:
+        - The highest vote weight among the roles (at least 1)
+        """
+        weights = self._guild_weights(guild_id)
+        key = frozenset(role_ids)
+        
+        resolved = self._resolved.get(guild_id, {})
+        weight = resolved.get(key)
+        if weight is None:
+            weight = max([1] + [weights[role_id] for role_id in key if role_id in weights])
+            with self._lock:
+                # Not memoized if the guild was invalidated since its weights were read
+                if self._weights.get(guild_id) is weights:
+                    if len(resolved) >= self.MAX_ROLE_SETS:
+                        resolved.clear()
+                    resolved[key] = weight
+        return weight
+    
+    def invalidate(self, guild_id=None):
+        """Forget cached weights for one guild, or for all guilds"""
+        with self._lock:
+            if guild_id is None:
+                self._weights.clear()
+                self._resolved.clear()
+                self._epoch += 1
+            else:
+                self._weights.pop(guild_id, None)
+                self._resolved.pop(guild_id, None)
+                self._generations[guild_id] = self._generations.get(guild_id, 0) + 1
+
+# Shared cache used by the bot and invalidated by the dashboard
+role_weights = RoleWeightCache()
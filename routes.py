@@ -1,19 +1,32 @@
 import os
 import datetime
 import logging
-from flask import render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import render_template, request, redirect, url_for, flash, jsonify, send_file, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
 import json
 import io
+import csv
 
 from app import app, db
-from models import User, Server, Channel, Role, Poll, Vote, BotConfig
+from models import User, Server, Channel, Role, Poll, Vote, PollTally, BotConfig, activity_day, utc_now
 from auth import requires_admin
-from polls import create_poll, get_poll_results, generate_chart
-from bot import post_poll, close_poll, update_poll_embed, handle_poll_closing
+from polls import (
+    create_poll, get_poll_results, generate_chart, queue_live_event, queue_status_change,
+    adjust_activity, remove_poll_activity, list_polls, replace_options, SORT_COLUMNS,
+    VOTE_MODES, MAX_OPTIONS
+)
+from bot import post_poll, close_poll, update_poll_embed, handle_poll_closing, poll_scheduler, reconciler
 from scheduler import schedule_backup
-from charts import generate_results_chart
+import metrics
+from poll_index import poll_index
+from vote_state import vote_state
+from role_weights import role_weights
+from results_snapshot import results_snapshots
+from live_updates import live_updates, sse_stream, poll_topic, DASHBOARD
+from dashboard_stats import dashboard_stats, dashboard_counts
+import vote_export
+import backups
 
 logger = logging.getLogger(__name__)
 
@@ -118,54 +131,38 @@ def logout():
 @login_required
 def dashboard():
     with app.app_context():
-        # Get statistics for dashboard
-        total_polls = Poll.query.count()
-        active_polls = Poll.query.filter_by(status='active').count()
-        total_votes = Vote.query.count()
-        total_servers = Server.query.count()
+        # Counts and the daily activity rollup, shared with /api/dashboard/stats
+        days = request.args.get('days', app.config["DASHBOARD_ACTIVITY_DAYS"], type=int)
+        stats = dashboard_stats.get(days)
         
         # Get recent polls
         recent_polls = Poll.query.order_by(Poll.created_at.desc()).limit(5).all()
         
         # Get poll activity data for chart
-        polls_by_day = {}
-        votes_by_day = {}
-        
-        end_date = datetime.datetime.now()
-        start_date = end_date - datetime.timedelta(days=7)
-        
-        current_date = start_date
-        while current_date <= end_date:
-            date_str = current_date.strftime('%Y-%m-%d')
-            polls_by_day[date_str] = 0
-            votes_by_day[date_str] = 0
-            current_date += datetime.timedelta(days=1)
-        
-        # Count polls created per day
-        polls = Poll.query.filter(Poll.created_at >= start_date).all()
-        for poll in polls:
-            date_str = poll.created_at.strftime('%Y-%m-%d')
-            if date_str in polls_by_day:
-                polls_by_day[date_str] += 1
-        
-        # Count votes cast per day
-        votes = Vote.query.filter(Vote.voted_at >= start_date).all()
-        for vote in votes:
-            date_str = vote.voted_at.strftime('%Y-%m-%d')
-            if date_str in votes_by_day:
-                votes_by_day[date_str] += 1
+        polls_by_day = [(day, polls) for day, polls, _ in stats['activity']]
+        votes_by_day = [(day, votes) for day, _, votes in stats['activity']]
         
         return render_template(
             'dashboard.html',
-            total_polls=total_polls,
-            active_polls=active_polls,
-            total_votes=total_votes,
-            total_servers=total_servers,
+            total_polls=stats['total_polls'],
+            active_polls=stats['active_polls'],
+            total_votes=stats['total_votes'],
+            total_servers=stats['total_servers'],
             recent_polls=recent_polls,
-            polls_by_day=json.dumps(list(polls_by_day.items())),
-            votes_by_day=json.dumps(list(votes_by_day.items()))
+            activity_days=stats['days'],
+            polls_by_day=json.dumps(polls_by_day),
+            votes_by_day=json.dumps(votes_by_day)
         )
 
+@app.route('/api/dashboard/stats')
+@login_required
+def dashboard_stats_api():
+    # Cached dashboard counts plus polls/votes per day for ?days= (and ?server_id=)
+    with app.app_context():
+        days = request.args.get('days', app.config["DASHBOARD_ACTIVITY_DAYS"], type=int)
+        server_id = request.args.get('server_id', type=int)
+        return jsonify(dashboard_stats.get(days, server_id))
+
 @app.route('/create_poll', methods=['GET', 'POST'])
 @login_required
 def create_poll_route():
@@ -183,11 +180,15 @@ def create_poll_route():
             
             # Get options from form
             options = []
-            for i in range(1, 11):  # Max 10 options
+            for i in range(1, MAX_OPTIONS + 1):
                 option = request.form.get(f'option_{i}')
                 if option:
                     options.append(option)
             
+            vote_mode = request.form.get('vote_mode', 'reactions')
+            if vote_mode not in VOTE_MODES:
+                vote_mode = 'reactions'
+            
             # Use default server/channel if not specified
             if not server_id:
                 # Get the first available server with a default channel
@@ -206,6 +207,10 @@ def create_poll_route():
                 flash('Please fill in all required fields and provide at least one option. Make sure you have configured a default server and channel in Bot Config.', 'danger')
                 return redirect(url_for('create_poll_route'))
             
+            if len(options) > VOTE_MODES[vote_mode]:
+                flash(f'Polls voted on with {vote_mode} can have at most {VOTE_MODES[vote_mode]} options.', 'danger')
+                return redirect(url_for('create_poll_route'))
+            
             # Parse expiration time
             expiration_type = request.form.get('expiration_type')
             expires_at = None
@@ -303,7 +308,6 @@ def create_poll_route():
                     channel_id=int(channel_id),
                     question=question,
                     description=description,
-                    options=json.dumps(options),
                     expires_at=expires_at,
                     scheduled_for=scheduled_for,
                     is_anonymous=is_anonymous,
@@ -311,11 +315,17 @@ def create_poll_route():
                     max_votes=max_votes,
                     allow_vote_change=allow_vote_change,
                     show_live_results=show_live_results,
-                    status='active'
+                    vote_mode=vote_mode,
+                    status='draft',
+                    created_at=utc_now()
                 )
+                poll.set_options(options)
                 
                 db.session.add(poll)
+                adjust_activity(int(server_id), activity_day(poll.created_at), polls=1)
+                queue_live_event(DASHBOARD, 'stats', total_polls=1)
                 db.session.commit()
+                poll_scheduler.sync_poll(poll)
                 
             except Exception as e:
                 db.session.rollback()
@@ -323,13 +333,12 @@ def create_poll_route():
                 flash('Error creating poll. Please try again.', 'danger')
                 return redirect(url_for('create_poll_route'))
             
-            # If not scheduled, the poll will be posted by the bot's check_polls task
-            # No need to post immediately here as the task runs every minute
+            # The bot's poll scheduler posts the poll now, or when it is scheduled for
             
             flash('Poll created successfully!', 'success')
             return redirect(url_for('manage_polls'))
         
-        return render_template('create_poll.html', servers=servers)
+        return render_template('create_poll.html', servers=servers, vote_modes=VOTE_MODES)
 
 @app.route('/get_channels/<int:server_id>')
 @login_required
@@ -346,35 +355,27 @@ def manage_polls():
         sort_by = request.args.get('sort_by', 'created_at')
         order = request.args.get('order', 'desc')
         status_filter = request.args.get('status', 'all')
+        cursor = request.args.get('cursor')
         
-        query = Poll.query
-        
-        # Apply status filter
-        if status_filter != 'all':
-            query = query.filter_by(status=status_filter)
+        # Only whitelisted columns can be sorted on
+        if sort_by not in SORT_COLUMNS:
+            sort_by = 'created_at'
+        if order not in ('asc', 'desc'):
+            order = 'desc'
         
-        # Apply sorting
-        if order == 'asc':
-            query = query.order_by(getattr(Poll, sort_by).asc())
-        else:
-            query = query.order_by(getattr(Poll, sort_by).desc())
-        
-        polls = query.all()
-        
-        # Get server names for each poll
-        for poll in polls:
-            server = Server.query.get(poll.server_id)
-            poll.server_name = server.name if server else 'Unknown Server'
-            
-            channel = Channel.query.get(poll.channel_id)
-            poll.channel_name = channel.name if channel else 'Unknown Channel'
+        # One joined query for the page plus one grouped query for vote counts
+        polls, next_cursor = list_polls(
+            status_filter, sort_by, order, cursor, app.config["POLLS_PAGE_SIZE"]
+        )
         
         return render_template(
             'manage_polls.html',
             polls=polls,
             sort_by=sort_by,
             order=order,
-            status=status_filter
+            status=status_filter,
+            cursor=cursor,
+            next_cursor=next_cursor
         )
 
 @app.route('/poll/<int:poll_id>')
@@ -414,6 +415,64 @@ def view_poll(poll_id):
             chart_data=chart_data
         )
 
+@app.route('/poll/<int:poll_id>/data')
+@login_required
+def poll_data(poll_id):
+    # Live results for results.js; unchanged polls are answered with a 304
+    with app.app_context():
+        head = results_snapshots.head(poll_id)
+        if head is None:
+            return jsonify({'error': 'Poll not found'}), 404
+        
+        status, version = head
+        etag = results_snapshots.etag(poll_id, status, version)
+        if request.if_none_match.contains(etag):
+            metrics.incr('results.not_modified')
+            response = app.response_class(status=304)
+        else:
+            response = jsonify(results_snapshots.get(poll_id, status, version))
+        
+        # Make browsers revalidate on every poll instead of reusing a stale copy
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+
+def _event_stream(topic, snapshot, version_key):
+    # Subscribed before the snapshot is read, so no change is missed; changes
+    # queued meanwhile that the snapshot already includes are dropped by version
+    subscription = live_updates.subscribe(topic)
+    response = app.response_class(sse_stream(subscription, snapshot, version_key), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let proxies buffer events
+    return response
+
+@app.route('/poll/<int:poll_id>/stream')
+@login_required
+def poll_stream(poll_id):
+    # Live tally deltas for one poll, pushed as votes are committed
+    with app.app_context():
+        if results_snapshots.head(poll_id) is None:
+            return jsonify({'error': 'Poll not found'}), 404
+    
+    def snapshot():
+        with app.app_context():
+            head = results_snapshots.head(poll_id)
+            if head is None:
+                return {'type': 'status', 'status': 'deleted'}
+            return dict(results_snapshots.get(poll_id, *head), type='snapshot')
+    
+    return _event_stream(poll_topic(poll_id), snapshot, 'tally_version')
+
+@app.route('/api/dashboard/stream')
+@login_required
+def dashboard_stream():
+    # Dashboard stat deltas, pushed by poll and vote commits
+    def snapshot():
+        with app.app_context():
+            return dict(dashboard_counts(), type='snapshot')
+    
+    return _event_stream(DASHBOARD, snapshot, 'stats_version')
+
 @app.route('/poll/<int:poll_id>/close', methods=['POST'])
 @login_required
 def close_poll_route(poll_id):
@@ -425,8 +484,12 @@ def close_poll_route(poll_id):
             return redirect(url_for('manage_polls'))
         
         # Mark poll for closing - background task will handle Discord message updates
+        queue_status_change(poll.id, poll.status, 'closed')
         poll.status = 'closed'
         db.session.commit()
+        poll_index.remove(poll.id)
+        vote_state.evict(poll.id)
+        poll_scheduler.cancel(poll.id)
         
         # Import and use the async function properly
         from bot import bot
@@ -457,12 +520,22 @@ def delete_poll(poll_id):
     with app.app_context():
         poll = Poll.query.get_or_404(poll_id)
         
-        # Delete votes first (foreign key constraint)
-        Vote.query.filter_by(poll_id=poll.id).delete()
+        remove_poll_activity(poll)
         
-        # Delete poll
+        # Delete votes and tallies first (foreign key constraint)
+        deleted_votes = Vote.query.filter_by(poll_id=poll.id).delete()
+        PollTally.query.filter_by(poll_id=poll.id).delete()
+        
+        queue_status_change(poll.id, poll.status, 'deleted')
+        queue_live_event(DASHBOARD, 'stats', total_polls=-1, total_votes=-deleted_votes)
+        
+        # Delete poll (its options go with it)
         db.session.delete(poll)
         db.session.commit()
+        poll_index.remove(poll_id)
+        vote_state.evict(poll_id)
+        poll_scheduler.cancel(poll_id)
+        results_snapshots.forget(poll_id)
         
         flash('Poll deleted successfully!', 'success')
         return redirect(url_for('manage_polls'))
@@ -480,7 +553,7 @@ def edit_poll(poll_id):
             
             # Update options
             options = []
-            for i in range(1, 11):  # Support up to 10 options
+            for i in range(1, MAX_OPTIONS + 1):
                 option = request.form.get(f'option_{i}')
                 if option and option.strip():
                     options.append(option.strip())
@@ -489,7 +562,16 @@ def edit_poll(poll_id):
                 flash('Poll must have at least 2 options!', 'danger')
                 return redirect(url_for('edit_poll', poll_id=poll_id))
             
-            poll.set_options(options)
+            vote_mode = request.form.get('vote_mode', poll.vote_mode)
+            if vote_mode not in VOTE_MODES:
+                vote_mode = poll.vote_mode
+            if len(options) > VOTE_MODES[vote_mode]:
+                flash(f'Polls voted on with {vote_mode} can have at most {VOTE_MODES[vote_mode]} options.', 'danger')
+                return redirect(url_for('edit_poll', poll_id=poll_id))
+            poll.vote_mode = vote_mode
+            
+            replace_options(poll, options)
+            poll.tally_version += 1  # Labels changed, so cached results are stale
             
             # Update settings
             poll.is_anonymous = 'is_anonymous' in request.form
@@ -497,17 +579,21 @@ def edit_poll(poll_id):
             poll.show_live_results = 'show_live_results' in request.form
             
             # Mark poll for reposting (will update status immediately after posting)
+            queue_status_change(poll.id, poll.status, 'draft')
             poll.status = 'draft'
             poll.message_id = None  # Clear old message ID
             
             db.session.commit()
+            poll_index.remove(poll.id)
+            vote_state.evict(poll.id)
+            poll_scheduler.sync_poll(poll)
             
             flash('Poll updated successfully! It will be posted to Discord shortly.', 'success')
             return redirect(url_for('manage_polls'))
         
         # GET request - show edit form
         servers = Server.query.all()
-        return render_template('edit_poll.html', poll=poll, servers=servers)
+        return render_template('edit_poll.html', poll=poll, servers=servers, vote_modes=VOTE_MODES)
 
 @app.route('/poll/<int:poll_id>/resend', methods=['GET', 'POST'])
 @login_required
@@ -523,11 +609,15 @@ def resend_poll_route(poll_id):
                 poll.channel_id = int(new_channel_id)
             
             # Mark poll to be resent by setting it as draft - the background task will handle posting
+            queue_status_change(poll.id, poll.status, 'draft')
             poll.status = 'draft'
             poll.message_id = None  # Clear old message ID so it gets a new one
             db.session.commit()
+            poll_index.remove(poll.id)
+            vote_state.evict(poll.id)
+            poll_scheduler.sync_poll(poll)
             
-            flash('Poll marked for resending! It will be posted to Discord within a minute.', 'success')
+            flash('Poll marked for resending! It will be posted to Discord shortly.', 'success')
             return redirect(url_for('manage_polls'))
         
         # GET request - show resend form
@@ -576,6 +666,7 @@ def update_role_weights():
                     role.vote_weight = weight
         
         db.session.commit()
+        role_weights.invalidate(int(server_id))
         flash('Role weights updated successfully!', 'success')
         return redirect(url_for('manage_roles', server_id=server_id))
 
@@ -722,6 +813,36 @@ def restart_bot():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/metrics')
+@login_required
+def metrics_snapshot():
+    # Bot and dashboard performance counters (e.g. coalesced embed edits)
+    return jsonify(metrics.snapshot())
+
+@app.route('/polls/reconcile', methods=['POST'])
+@login_required
+def reconcile_votes():
+    # Rebuild stored votes from the reactions on Discord, for one poll or all active ones
+    from bot import bot
+    
+    poll_id = request.form.get('poll_id', type=int)
+    entries = [entry for entry in poll_index.entries() if poll_id is None or entry.id == poll_id]
+    
+    if not bot.is_ready():
+        flash('The bot is not running.', 'danger')
+    elif reconciler.running:
+        flash('Votes are already being reconciled.', 'info')
+    else:
+        bot.loop.call_soon_threadsafe(reconciler.start, entries, 'dashboard')
+        flash(f'Reconciling votes on {len(entries)} active polls.', 'success')
+    return redirect(request.referrer or url_for('manage_polls'))
+
+@app.route('/api/reconcile')
+@login_required
+def reconcile_status():
+    # Statistics of the latest reconciliation run
+    return jsonify(reconciler.last_run or {})
+
 @app.route('/settings', methods=['GET', 'POST'])
 @login_required
 def settings():
@@ -755,24 +876,16 @@ def settings():
 @login_required
 @requires_admin
 def backup_database():
-    # Create database backup
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    backup_filename = f"regulo_pollbot_backup_{timestamp}.db"
-    
-    # Path to current database
-    db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
+    # Stream an online snapshot of the database straight through the compressor
+    if not backups.supported():
+        # Checked up front, as an error once streaming has started can't change the status
+        return jsonify({'error': 'Online backups are only supported for SQLite databases'}), 400
     
-    # Create a copy of the database
-    import shutil
-    backup_path = os.path.join(os.getcwd(), backup_filename)
-    shutil.copy2(db_path, backup_path)
-    
-    # Send the file to the user
-    return send_file(
-        backup_path,
-        as_attachment=True,
-        download_name=backup_filename,
-        mimetype='application/octet-stream'
+    method = backups.compression_method()
+    return app.response_class(
+        stream_with_context(backups.stream_backup(method)),
+        mimetype='application/octet-stream',
+        headers={'Content-Disposition': f'attachment; filename={backups.backup_filename(method)}'}
     )
 
 @app.route('/export/poll/<int:poll_id>/csv')
@@ -786,39 +899,84 @@ def export_poll_csv(poll_id):
         results = poll.get_results()
         
         csv_data = io.StringIO()
-        csv_data.write("Option,Votes,Percentage\n")
+        writer = csv.writer(csv_data)
+        writer.writerow(['Option', 'Votes', 'Percentage'])
         
         total_votes = sum(results.values())
         for option in options:
             votes = results.get(option, 0)
             percentage = (votes / total_votes * 100) if total_votes > 0 else 0
-            csv_data.write(f'"{option}",{votes},{percentage:.1f}%\n')
+            writer.writerow([option, votes, f'{percentage:.1f}%'])
         
         # Create response
-        csv_data.seek(0)
-        return send_file(
-            io.BytesIO(csv_data.getvalue().encode()),
-            as_attachment=True,
-            download_name=f"poll_{poll_id}_results.csv",
-            mimetype='text/csv'
+        return app.response_class(
+            csv_data.getvalue(),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename=poll_{poll_id}_results.csv'}
         )
 
+def _vote_export_response(export_format, filename, **filters):
+    # Stream raw votes straight from the database cursor through the encoder
+    encoder, mimetype, extension = vote_export.FORMATS[export_format]
+    rows = vote_export.vote_rows(**filters)
+    return app.response_class(
+        stream_with_context(encoder(rows)),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={filename}.{extension}'}
+    )
+
+def _export_format():
+    export_format = request.args.get('format', 'csv')
+    return export_format if export_format in vote_export.FORMATS else None
+
+@app.route('/export/poll/<int:poll_id>/votes')
+@login_required
+def export_poll_votes(poll_id):
+    # Raw votes of one poll as ?format=csv, ndjson or columnar
+    export_format = _export_format()
+    if not export_format:
+        return jsonify({'error': 'Unknown export format'}), 400
+    
+    Poll.query.get_or_404(poll_id)
+    return _vote_export_response(export_format, f"poll_{poll_id}_votes", poll_id=poll_id)
+
+@app.route('/export/votes')
+@login_required
+def export_votes():
+    # Raw votes across polls, optionally limited by ?server_id= and a ?start=/?end= date range
+    export_format = _export_format()
+    if not export_format:
+        return jsonify({'error': 'Unknown export format'}), 400
+    
+    try:
+        start = request.args.get('start')
+        start = datetime.datetime.strptime(start, '%Y-%m-%d') if start else None
+        end = request.args.get('end')
+        # The end date is inclusive
+        end = datetime.datetime.strptime(end, '%Y-%m-%d') + datetime.timedelta(days=1) if end else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    
+    return _vote_export_response(
+        export_format,
+        "votes",
+        server_id=request.args.get('server_id', type=int),
+        start=start,
+        end=end
+    )
+
 @app.route('/export/poll/<int:poll_id>/chart')
 @login_required
 def export_poll_chart(poll_id):
     with app.app_context():
-        poll = Poll.query.get_or_404(poll_id)
-        
-        # Generate chart image
-        options = poll.get_options()
-        results = poll.get_results()
+        Poll.query.get_or_404(poll_id)
         
-        # Convert results to lists for plotting
-        labels = options
-        values = [results.get(option, 0) for option in options]
+        chart_type = request.args.get('type', 'bar')
+        if chart_type not in ('bar', 'pie'):
+            chart_type = 'bar'
         
-        # Generate chart image
-        chart_img = generate_results_chart(poll.question, labels, values)
+        # Rendered in the chart worker processes and cached until results change
+        chart_img = generate_chart(poll_id, chart_type)
         
         # Return the image
         return send_file(
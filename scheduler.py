@@ -1,10 +1,11 @@
 import os
 import datetime
-import shutil
 import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from app import app, db
 from models import BotConfig, Poll
+from backups import create_backup, supported as backups_supported
+from db_routing import checkpoint
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -26,6 +27,10 @@ def schedule_backup():
             if job.id == 'database_backup':
                 scheduler.remove_job('database_backup')
         
+        if not backups_supported():
+            logger.info("Scheduled backups are off: they are only supported for SQLite databases")
+            return
+        
         # Schedule new backup job based on frequency
         if config.backup_frequency == 'daily':
             scheduler.add_job(
@@ -60,19 +65,9 @@ def perform_backup():
     """
     with app.app_context():
         try:
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f"regulo_pollbot_backup_{timestamp}.db"
-            
-            # Path to current database
-            db_path = app.config['SQLALCHEMY_DATABASE_URI'].replace('sqlite:///', '')
-            
-            # Create backup directory if it doesn't exist
+            # Online, compressed copy of the live database; old backups are pruned
             backup_dir = os.path.join(os.getcwd(), 'backups')
-            os.makedirs(backup_dir, exist_ok=True)
-            
-            # Create a copy of the database
-            backup_path = os.path.join(backup_dir, backup_filename)
-            shutil.copy2(db_path, backup_path)
+            backup_path = create_backup(backup_dir, app.config["BACKUP_KEEP"])
             
             # Update last backup timestamp
             config = BotConfig.query.first()
@@ -80,19 +75,45 @@ def perform_backup():
                 config.last_backup = datetime.datetime.now()
                 db.session.commit()
             
-            logger.info(f"Database backup created: {backup_filename}")
-            
-            # Keep only the last 5 backups
-            backup_files = sorted([
-                os.path.join(backup_dir, f) for f in os.listdir(backup_dir)
-                if f.startswith('regulo_pollbot_backup_') and f.endswith('.db')
-            ])
-            
-            while len(backup_files) > 5:
-                os.remove(backup_files.pop(0))
+            logger.info(f"Database backup created: {os.path.basename(backup_path)}")
                 
         except Exception as e:
             logger.error(f"Failed to create database backup: {str(e)}")
 
+def schedule_checkpoint():
+    """
+    Schedule periodic WAL checkpoints if SQLITE_CHECKPOINT_MINUTES is set
+    
+    SQLite checkpoints on its own once the WAL grows past 1000 pages; a
+    scheduled TRUNCATE checkpoint also shrinks the WAL file back down.
+    """
+    minutes = app.config["SQLITE_CHECKPOINT_MINUTES"]
+    if minutes <= 0 or not app.config["SQLITE_WAL"]:
+        return
+    
+    scheduler.add_job(
+        func=perform_checkpoint,
+        trigger='interval',
+        minutes=minutes,
+        id='wal_checkpoint',
+        replace_existing=True
+    )
+
+def perform_checkpoint():
+    """
+    Checkpoint the SQLite WAL into the main database file
+    """
+    with app.app_context():
+        try:
+            if db.engine.dialect.name != 'sqlite':
+                return
+            
+            busy, log_pages, checkpointed = checkpoint(db.engine)
+            logger.info(f"WAL checkpoint: {checkpointed}/{log_pages} pages{' (busy)' if busy else ''}")
+        except Exception as e:
+            logger.error(f"Failed to checkpoint database: {str(e)}")
+
+schedule_checkpoint()
+
 # Start scheduler
 scheduler.start()
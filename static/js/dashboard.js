@@ -20,6 +20,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Check for notifications (polls ending soon, etc.)
     checkNotifications();
     
+    // Push updates for the stats cards
+    setupRealtimeUpdates();
+    
     /**
      * Sets up the activity chart on the dashboard
      */
@@ -81,16 +84,52 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
-    // Set up real-time updates for active polls if WebSockets were implemented
-    // This would be a placeholder for future real-time updates
+    /**
+     * Keeps the stats cards live with pushed updates from the server
+     * The stream sends a snapshot first, then deltas as polls and votes change
+     */
     function setupRealtimeUpdates() {
-        // Example WebSocket connection for real-time updates
-        // const socket = new WebSocket('ws://' + window.location.host + '/ws');
-        // socket.onmessage = function(event) {
-        //     const data = JSON.parse(event.data);
-        //     if (data.type === 'poll_update') {
-        //         updatePollData(data);
-        //     }
-        // };
+        if (!window.EventSource) {
+            // Fall back to refreshing the cached stats every minute
+            updateStats();
+            return;
+        }
+        
+        const statIds = {
+            total_polls: 'total-polls',
+            active_polls: 'active-polls',
+            total_votes: 'total-votes',
+            total_servers: 'total-servers'
+        };
+        const stats = {};
+        
+        function render() {
+            Object.keys(statIds).forEach(key => {
+                const element = document.getElementById(statIds[key]);
+                if (element && stats[key] !== undefined) {
+                    element.textContent = stats[key];
+                }
+            });
+        }
+        
+        const source = new EventSource('/api/dashboard/stream');
+        
+        source.addEventListener('snapshot', event => {
+            Object.assign(stats, JSON.parse(event.data));
+            render();
+        });
+        
+        source.addEventListener('stats', event => {
+            const delta = JSON.parse(event.data);
+            Object.keys(statIds).forEach(key => {
+                if (delta[key] !== undefined && stats[key] !== undefined) {
+                    stats[key] += delta[key];
+                }
+            });
+            render();
+        });
+        
+        // Close the stream when leaving the page
+        window.addEventListener('beforeunload', () => source.close());
     }
 });
@@ -81,6 +81,12 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Only set up live updates for active polls
         if (pollStatusBadge && pollStatusBadge.textContent.trim() === 'Active') {
+            // Prefer pushed updates, and fall back to polling without EventSource
+            if (window.EventSource) {
+                streamUpdates(pollId);
+                return;
+            }
+            
             // Poll for updates every 10 seconds
             const updateInterval = setInterval(() => {
                 fetch(`/poll/${pollId}/data`)
@@ -118,22 +124,67 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
+    /**
+     * Streams tally deltas for the poll from the server
+     * A full snapshot arrives first (and again if this page falls behind)
+     */
+    function streamUpdates(pollId) {
+        let state = null;
+        const source = new EventSource(`/poll/${pollId}/stream`);
+        
+        function render() {
+            updateChartData(state);
+            updateResultsSummary(state);
+        }
+        
+        source.addEventListener('snapshot', event => {
+            state = JSON.parse(event.data);
+            render();
+        });
+        
+        source.addEventListener('tally', event => {
+            if (!state) return;
+            
+            const delta = JSON.parse(event.data);
+            // Deltas are keyed by option ID
+            Object.keys(delta.weights || {}).forEach(optionId => {
+                const index = state.option_ids.indexOf(Number(optionId));
+                if (index !== -1) {
+                    state.counts[index] += delta.weights[optionId];
+                    state.total_votes += delta.weights[optionId];
+                }
+            });
+            render();
+        });
+        
+        source.addEventListener('status', event => {
+            const data = JSON.parse(event.data);
+            if (data.status !== 'active') {
+                // Poll closed (or was reset), so show the final page
+                source.close();
+                window.location.reload();
+            }
+        });
+        
+        // Close the stream when leaving the page
+        window.addEventListener('beforeunload', () => source.close());
+    }
+    
     /**
      * Updates chart data with new results
      */
     function updateChartData(data) {
-        // This would update the charts with new data from an API call
-        // For example:
+        // Counts are listed in the same order as the poll options
         const barChart = Chart.getChart('barChart');
         const pieChart = Chart.getChart('pieChart');
         
-        if (barChart && data.results) {
-            barChart.data.datasets[0].data = Object.values(data.results);
+        if (barChart && data.counts) {
+            barChart.data.datasets[0].data = data.counts;
             barChart.update();
         }
         
-        if (pieChart && data.results) {
-            pieChart.data.datasets[0].data = Object.values(data.results);
+        if (pieChart && data.counts) {
+            pieChart.data.datasets[0].data = data.counts;
             pieChart.update();
         }
     }
@@ -149,12 +200,12 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         
         // Update progress bars and percentages
-        if (data.results && data.options) {
+        if (data.counts && data.options) {
             const listItems = document.querySelectorAll('.list-group-item');
             
             data.options.forEach((option, index) => {
                 if (index < listItems.length) {
-                    const votes = data.results[option] || 0;
+                    const votes = data.counts[index] || 0;
                     const percentage = data.total_votes > 0 ? (votes / data.total_votes * 100) : 0;
                     
                     // Update vote count badge
@@ -178,15 +229,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
             });
         }
-        
-        // If votes table exists and it's not an anonymous poll, update that too
-        if (!data.is_anonymous && data.votes) {
-            const votesTable = document.querySelector('table tbody');
-            if (votesTable) {
-                // This would be more complex, requiring rebuilding the table
-                // For simplicity, we would just refresh the page if votes change significantly
-            }
-        }
+
     }
     
     /**
@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app picks its database up at import time
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'tests.db')}")
+
+from app import app, db
+import models
+
+@pytest.fixture
+def database():
+    """Empty tables with one server and channel, inside an app context"""
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add(models.Server(id=1, name='Server'))
+        db.session.add(models.Channel(id=2, server_id=1, name='polls', type='text'))
+        db.session.commit()
+        yield db
+        db.session.remove()
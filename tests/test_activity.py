@@ -0,0 +1,50 @@
+import time
+import pytest
+from models import Poll, Vote, PollTally, DailyActivity
+from polls import create_poll, record_vote, remove_vote, remove_poll_activity, rebuild_activity
+from dashboard_stats import activity
+
+@pytest.fixture(params=['Etc/GMT+12', 'Etc/GMT-14'])
+def local_timezone(request, monkeypatch):
+    # Far enough from UTC that at any time of day one of them is on another date
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+def rollup():
+    return sorted(
+        (row.day, row.server_id, row.polls_created, row.votes_cast)
+        for row in DailyActivity.query
+    )
+
+def test_rollup_matches_rebuild(database, local_timezone):
+    poll = create_poll(1, 2, 'Question', ['Yes', 'No'])
+    for user_id in (10, 11):
+        record_vote(Vote(poll_id=poll.id, user_id=user_id, username='member', option_id=poll.get_option_ids()[0]))
+    database.session.commit()
+    
+    kept = rollup()
+    assert activity(1)[-1][1:] == (1, 2)
+    
+    rebuild_activity()
+    assert rollup() == kept
+
+def test_deleting_leaves_no_ghost_rows(database, local_timezone):
+    poll = create_poll(1, 2, 'Question', ['Yes', 'No'])
+    option_id = poll.get_option_ids()[0]
+    for user_id in (10, 11):
+        record_vote(Vote(poll_id=poll.id, user_id=user_id, username='member', option_id=option_id))
+    database.session.commit()
+    
+    remove_vote(Vote.query.filter_by(poll_id=poll.id, user_id=10).one())
+    database.session.commit()
+    
+    remove_poll_activity(poll)
+    Vote.query.filter_by(poll_id=poll.id).delete()
+    PollTally.query.filter_by(poll_id=poll.id).delete()
+    database.session.delete(poll)
+    database.session.commit()
+    
+    assert all(polls == 0 and votes == 0 for _, _, polls, votes in rollup())
@@ -0,0 +1,33 @@
+import gzip
+import pytest
+from app import app
+from models import User
+import backups
+import routes
+
+@pytest.fixture
+def admin_client(database):
+    user = User(username='admin', email='admin@example.com', password_hash='-', is_admin=True)
+    database.session.add(user)
+    database.session.commit()
+    
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+    return client
+
+@pytest.mark.skipif(
+    not app.config["SQLALCHEMY_DATABASE_URI"].startswith('sqlite'),
+    reason="Online backups are only supported for SQLite"
+)
+def test_backup_streams_a_snapshot(admin_client, monkeypatch):
+    monkeypatch.setitem(app.config, 'BACKUP_COMPRESSION', 'gzip')
+    response = admin_client.post('/backup')
+    assert response.status_code == 200
+    assert gzip.decompress(response.data).startswith(b'SQLite format 3')
+
+def test_backup_refused_before_streaming_when_unsupported(admin_client, monkeypatch):
+    monkeypatch.setattr(backups, 'supported', lambda: False)
+    response = admin_client.post('/backup')
+    assert response.status_code == 400
+    assert 'SQLite' in response.get_json()['error']
@@ -0,0 +1,51 @@
+import os
+import sys
+import subprocess
+import textwrap
+import pytest
+from db_routing import sqlite_engine_config, READONLY
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def config(wal=True, read_pool_size=4):
+    return {"SQLITE_WAL": wal, "SQLITE_READ_POOL_SIZE": read_pool_size}
+
+def test_single_writer_only_with_read_pool():
+    engine_options, binds = sqlite_engine_config('sqlite:///polls.db', config())
+    assert engine_options['pool_size'] == 1 and engine_options['max_overflow'] == 0
+    assert READONLY in binds
+
+@pytest.mark.parametrize('settings', [config(wal=False), config(read_pool_size=0)])
+def test_regular_writer_pool_without_read_pool(settings):
+    engine_options, binds = sqlite_engine_config('sqlite:///polls.db', settings)
+    assert 'pool_size' not in engine_options and 'max_overflow' not in engine_options
+    assert binds == {}
+
+# Routes open nested app contexts, which need a second connection from the writer pool
+PAGES = textwrap.dedent("""
+    from app import app, db
+    from models import User
+    import routes
+    with app.app_context():
+        db.create_all()
+        user = User(username='admin', email='admin@example.com', password_hash='-', is_admin=True)
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+    client = app.test_client()
+    # Logged in, so the outer app context loads the user before the route's own context
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    for path in ('/dashboard', '/manage_polls'):
+        assert client.get(path).status_code == 200, path
+""")
+
+@pytest.mark.parametrize('env', [{'SQLITE_WAL': '0'}, {'SQLITE_READ_POOL_SIZE': '0'}])
+def test_pages_load_without_read_pool(tmp_path, env):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'polls.db'}", **env)
+    # A fresh interpreter, as the engine options are fixed when app is imported
+    result = subprocess.run(
+        [sys.executable, '-c', PAGES], cwd=ROOT, env=env,
+        capture_output=True, text=True, timeout=180
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
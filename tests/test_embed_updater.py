@@ -0,0 +1,21 @@
+import asyncio
+from embed_updater import EmbedUpdater
+
+def test_failed_refresh_does_not_stop_the_flush():
+    refreshed = []
+    
+    async def refresh(poll_id):
+        if poll_id == 1:
+            raise RuntimeError('database is locked')
+        refreshed.append(poll_id)
+    
+    updater = EmbedUpdater(refresh)
+    for poll_id in (1, 2, 2):
+        updater.mark_dirty(poll_id)
+    asyncio.run(updater.flush())
+    assert refreshed == [2]
+    
+    # The next flush still runs
+    updater.mark_dirty(3)
+    asyncio.run(updater.flush())
+    assert refreshed == [2, 3]
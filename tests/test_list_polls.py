@@ -0,0 +1,43 @@
+import datetime
+import pytest
+from polls import create_poll, list_polls
+
+def walk(sort_by, order, limit=3):
+    # Follow next cursors to the end; fails instead of looping forever
+    ids, cursor = [], None
+    for _ in range(20):
+        polls, cursor = list_polls('all', sort_by, order, cursor, limit)
+        ids += [poll.id for poll in polls]
+        if cursor is None:
+            return ids
+    pytest.fail(f"Pagination by {sort_by} {order} did not end")
+
+@pytest.fixture
+def polls(database):
+    # Created within the same second, so created_at ties throughout
+    created = []
+    start = datetime.datetime(2026, 1, 1, 12, 0, 0, 250000)
+    for number in range(7):
+        created.append(create_poll(
+            1, 2, f'Question {number}', ['Yes', 'No'],
+            scheduled_for=start + datetime.timedelta(minutes=number % 3) if number % 2 else None
+        ))
+    database.session.commit()
+    return created
+
+@pytest.mark.parametrize('order', ['desc', 'asc'])
+def test_created_at_pages_cover_every_poll_once(polls, order):
+    ids = [poll.id for poll in polls]
+    expected = sorted(ids, reverse=order == 'desc')
+    assert walk('created_at', order) == expected
+
+@pytest.mark.parametrize('order', ['desc', 'asc'])
+def test_nullable_sort_pages_cover_every_poll_once(polls, order):
+    ids = walk('scheduled_for', order)
+    assert sorted(ids) == sorted(poll.id for poll in polls)
+    
+    # Scheduled polls first, in order, then the rest
+    scheduled = {poll.id: poll.scheduled_for for poll in polls if poll.scheduled_for}
+    values = [(scheduled[poll_id], poll_id) for poll_id in ids[:len(scheduled)]]
+    assert values == sorted(values, reverse=order == 'desc')
+    assert set(ids[len(scheduled):]) == {poll.id for poll in polls if not poll.scheduled_for}
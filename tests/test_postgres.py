@@ -0,0 +1,102 @@
+"""
+Model and migration checks against a real PostgreSQL server
+
+Skipped unless DATABASE_URL points at PostgreSQL, as in the CI workflow's
+postgres service container.
+"""
+import json
+import pytest
+from sqlalchemy import create_engine, inspect, select, func, text
+from app import app, db
+import models
+import migrate_db
+import update_schema
+
+pytestmark = pytest.mark.skipif(
+    not app.config["SQLALCHEMY_DATABASE_URI"].startswith('postgresql'),
+    reason="DATABASE_URL is not a PostgreSQL database"
+)
+
+def test_discord_id_keys_have_no_sequence(database):
+    with db.engine.connect() as connection:
+        for table in ('server', 'channel', 'role'):
+            assert connection.execute(text(f"SELECT pg_get_serial_sequence('{table}', 'id')")).scalar() is None
+        assert connection.execute(text("SELECT pg_get_serial_sequence('poll', 'id')")).scalar() is not None
+
+def test_migrate_from_sqlite(tmp_path):
+    source = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    db.metadata.create_all(source)
+    with source.begin() as connection:
+        connection.execute(models.Server.__table__.insert(), [{'id': 900000000000000001, 'name': 'Server'}])
+        connection.execute(models.Channel.__table__.insert(), [
+            {'id': 900000000000000002, 'server_id': 900000000000000001, 'name': 'polls', 'type': 'text'}
+        ])
+        connection.execute(models.Poll.__table__.insert(), [
+            {'id': poll_id, 'server_id': 900000000000000001, 'channel_id': 900000000000000002,
+             'question': f'Question {poll_id}', 'status': 'closed'}
+            for poll_id in (3, 8)
+        ])
+        connection.execute(models.PollOption.__table__.insert(), [
+            {'id': 11, 'poll_id': 8, 'position': 0, 'label': 'Yes'}
+        ])
+        connection.execute(models.Vote.__table__.insert(), [
+            {'id': 21, 'poll_id': 8, 'user_id': 900000000000000003, 'option_id': 11, 'weight': 1},
+            # Left behind by a deleted poll; SQLite never enforced the key
+            {'id': 22, 'poll_id': 99, 'user_id': 900000000000000003, 'option_id': 11, 'weight': 1},
+        ])
+    source.dispose()
+    
+    with app.app_context():
+        db.drop_all()
+        results = migrate_db.migrate(str(source.url), app.config["SQLALCHEMY_DATABASE_URI"])
+        assert results['poll'] == (2, 0)
+        assert results['vote'] == (1, 1)
+        
+        # Sequences continue after the copied IDs
+        poll = models.Poll(server_id=900000000000000001, channel_id=900000000000000002, question='New', status='draft')
+        db.session.add(poll)
+        db.session.commit()
+        assert poll.id == 9
+        db.session.remove()
+
+def _foreign_key_name(table, column):
+    for foreign_key in inspect(db.engine).get_foreign_keys(table):
+        if foreign_key['constrained_columns'] == [column]:
+            return foreign_key['name']
+
+def test_update_schema_moves_poll_options(database):
+    # Put vote and poll back in their shape from before poll_option existed
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql(f"ALTER TABLE vote DROP CONSTRAINT {_foreign_key_name('vote', 'option_id')}")
+        connection.exec_driver_sql("ALTER TABLE vote ALTER COLUMN option_id DROP NOT NULL")
+        connection.exec_driver_sql("ALTER TABLE vote ADD COLUMN option VARCHAR(1000)")
+        connection.exec_driver_sql("ALTER TABLE poll ADD COLUMN options TEXT")
+        connection.execute(models.Poll.__table__.insert(), [
+            {'id': 1, 'server_id': 1, 'channel_id': 2, 'question': 'Question', 'status': 'closed'}
+        ])
+        connection.execute(
+            text("UPDATE poll SET options = :options WHERE id = 1"),
+            {'options': json.dumps(['Yes', 'No'])}
+        )
+        connection.execute(text(
+            "INSERT INTO vote (poll_id, user_id, option, weight) VALUES "
+            "(1, 10, 'No', 1), (1, 11, 'No', 2), (1, 12, 'Maybe', 1)"
+        ))
+    
+    update_schema.update_database_schema()
+    
+    inspector = inspect(db.engine)
+    assert 'option' not in {column['name'] for column in inspector.get_columns('vote')}
+    assert 'options' not in {column['name'] for column in inspector.get_columns('poll')}
+    assert _foreign_key_name('vote', 'option_id') is not None
+    
+    with db.engine.connect() as connection:
+        options = dict(connection.execute(select(models.PollOption.label, models.PollOption.id)).all())
+        assert set(options) == {'Yes', 'No'}
+        # The vote for an option that no longer exists is dropped
+        votes = connection.execute(select(models.Vote.option_id, func.count()).group_by(models.Vote.option_id)).all()
+        assert votes == [(options['No'], 2)]
+        tally = connection.execute(
+            select(models.PollTally.weight).where(models.PollTally.option_id == options['No'])
+        ).scalar()
+        assert tally == 3
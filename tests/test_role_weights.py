@@ -0,0 +1,29 @@
+import pytest
+from models import Role
+from role_weights import RoleWeightCache
+
+def set_weight(db, weight):
+    db.session.merge(Role(id=5, server_id=1, name='Member', position=1, vote_weight=weight))
+    db.session.commit()
+
+@pytest.mark.parametrize('invalidated', [1, None])
+def test_invalidate_during_load_is_not_lost(database, monkeypatch, invalidated):
+    set_weight(database, 3)
+    cache = RoleWeightCache()
+    
+    query = type(Role.query)
+    original = query.all
+    
+    def racing_all(self):
+        # The weight changes and the guild is invalidated after the query, before the store
+        rows = original(self)
+        monkeypatch.setattr(query, 'all', original)
+        set_weight(database, 5)
+        cache.invalidate(invalidated)
+        return rows
+    
+    monkeypatch.setattr(query, 'all', racing_all)
+    
+    # The racing load still answers with what it read, but isn't kept
+    assert cache.resolve(1, [5]) == 3
+    assert cache.resolve(1, [5]) == 5
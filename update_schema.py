@@ -1,20 +1,192 @@
 import os
+import json
 import logging
+from sqlalchemy import inspect, select
+from sqlalchemy.schema import CreateTable
 from app import app, db
 import models
+from polls import rebuild_tallies, rebuild_activity
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+def create_missing_indexes():
+    """Create any model index that doesn't exist in the database yet"""
+    inspector = inspect(db.engine)
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                logger.info(f"Created index {index.name} on {table.name}")
+
+def add_missing_columns():
+    """Add model columns that don't exist in the database yet"""
+    inspector = inspect(db.engine)
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT '{column.server_default.arg}'"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+            
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(ddl)
+            logger.info(f"Added column {column.name} to {table.name}")
+
+def _quote(name):
+    return db.engine.dialect.identifier_preparer.quote(name)
+
+def rebuild_table(table):
+    """
+    Recreate a table in the shape of its model, keeping its rows
+    
+    Used on SQLite to drop columns, which older SQLite versions can't do in
+    place. Follows SQLite's table rebuild procedure: create the new table,
+    copy the rows, drop the old table and rename the new one.
+    
+    Parameters:
+    - table: Model table to rebuild
+    """
+    new_name = f"{table.name}_new"
+    new_table = table.to_metadata(db.metadata, name=new_name)
+    columns = ', '.join(_quote(column.name) for column in table.columns)
+    
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(CreateTable(new_table))
+            connection.exec_driver_sql(
+                f"INSERT INTO {_quote(new_name)} ({columns}) SELECT {columns} FROM {_quote(table.name)}"
+            )
+            connection.exec_driver_sql(f"DROP TABLE {_quote(table.name)}")
+            connection.exec_driver_sql(f"ALTER TABLE {_quote(new_name)} RENAME TO {_quote(table.name)}")
+    finally:
+        db.metadata.remove(new_table)
+    
+    # Dropping the old table dropped its indexes too
+    for index in table.indexes:
+        index.create(bind=db.engine)
+    logger.info(f"Rebuilt table {table.name}")
+
+def drop_columns(table, names):
+    """Drop columns that are no longer part of a model"""
+    if db.engine.dialect.name == 'sqlite':
+        rebuild_table(table)
+        return
+    
+    with db.engine.begin() as connection:
+        for name in names:
+            connection.exec_driver_sql(f"ALTER TABLE {_quote(table.name)} DROP COLUMN {_quote(name)}")
+    logger.info(f"Dropped {', '.join(names)} from {table.name}")
+
+def migrate_poll_options():
+    """
+    Move poll options out of the poll.options JSON column into poll_option rows
+    
+    Votes switch from the option text to the option ID. Votes whose text
+    matches none of the poll's current options (left behind by earlier
+    option renames) are dropped, as the results never counted them.
+    Tallies are rebuilt by the caller.
+    
+    The raw SQL has been run on SQLite databases; on PostgreSQL it is only
+    covered by tests/test_postgres.py, which CI runs against a fresh server.
+    
+    Returns:
+    - True if the database was migrated
+    """
+    inspector = inspect(db.engine)
+    if 'options' not in {column['name'] for column in inspector.get_columns('poll')}:
+        return False
+    
+    logger.info("Moving poll options into the poll_option table...")
+    with db.engine.begin() as connection:
+        migrated = {
+            poll_id for poll_id, in connection.execute(select(models.PollOption.poll_id).distinct())
+        }
+        rows = []
+        for poll_id, options in connection.exec_driver_sql("SELECT id, options FROM poll"):
+            if poll_id in migrated:
+                continue
+            if isinstance(options, str):
+                options = json.loads(options)
+            rows += [
+                {'poll_id': poll_id, 'position': position, 'label': label}
+                for position, label in enumerate(options or [])
+            ]
+        if rows:
+            connection.execute(models.PollOption.__table__.insert(), rows)
+        logger.info(f"Created {len(rows)} poll options")
+        
+        connection.exec_driver_sql(
+            "UPDATE vote SET option_id = ("
+            "SELECT poll_option.id FROM poll_option "
+            "WHERE poll_option.poll_id = vote.poll_id AND poll_option.label = vote.option "
+            "ORDER BY poll_option.position LIMIT 1"
+            ") WHERE option_id IS NULL"
+        )
+        orphaned = connection.exec_driver_sql("DELETE FROM vote WHERE option_id IS NULL").rowcount
+        if orphaned:
+            logger.warning(f"Dropped {orphaned} votes for options that no longer exist")
+    
+    # Tallies were keyed by option text; the caller rebuilds them
+    models.PollTally.__table__.drop(db.engine)
+    models.PollTally.__table__.create(db.engine)
+    
+    drop_columns(models.Vote.__table__, ['option'])
+    drop_columns(models.Poll.__table__, ['options'])
+    
+    if db.engine.dialect.name != 'sqlite':
+        # add_missing_columns added option_id without its constraints
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("ALTER TABLE vote ALTER COLUMN option_id SET NOT NULL")
+            connection.exec_driver_sql(
+                "ALTER TABLE vote ADD FOREIGN KEY (option_id) REFERENCES poll_option (id)"
+            )
+    return True
+
 def update_database_schema():
     """Update the database schema with the new columns"""
     logger.info("Updating database schema...")
     
     with app.app_context():
+        inspector = inspect(db.engine)
+        had_tallies = inspector.has_table(models.PollTally.__tablename__)
+        had_activity = inspector.has_table(models.DailyActivity.__tablename__)
+        
         # Create all tables including the new columns
         db.create_all()
+        
+        # create_all() skips tables that already exist, so add missing columns and indexes
+        add_missing_columns()
+        options_migrated = migrate_poll_options()
+        create_missing_indexes()
+        
+        # Existing votes need their tallies built once when the table is new
+        if not had_tallies or options_migrated:
+            rows = rebuild_tallies()
+            logger.info(f"Built {rows} poll tally rows from existing votes.")
+        
+        # Likewise the daily activity rollup for existing polls and votes
+        if not had_activity:
+            rows = rebuild_activity()
+            logger.info(f"Built {rows} daily activity rows from existing polls and votes.")
+        
         logger.info("Database schema updated!")
 
 if __name__ == "__main__":
-    update_database_schema()
\ No newline at end of file
+    update_database_schema()
@@ -0,0 +1,234 @@
+import io
+import csv
+import sys
+import json
+import struct
+import datetime
+from array import array
+from app import db
+from models import Poll, PollOption, Vote
+
+# Rows fetched from the database at a time while streaming
+FETCH_SIZE = 1000
+
+# Rows per block in the columnar format
+BLOCK_ROWS = 10000
+
+COLUMNS = ['poll_id', 'user_id', 'username', 'option', 'weight', 'voted_at']
+
+def vote_rows(poll_id=None, server_id=None, start=None, end=None):
+    """
+    Stream raw votes as tuples in COLUMNS order
+    
+    Rows are fetched FETCH_SIZE at a time (a server-side cursor on databases
+    that support one), so memory use does not grow with the number of votes.
+    User IDs and names are left out for anonymous polls.
+    
+    Parameters:
+    - poll_id: Only export votes of this poll
+    - server_id: Only export votes of polls in this server
+    - start, end: Only export votes cast in [start, end)
+    """
+    query = db.session.query(
+        Vote.poll_id, Vote.user_id, Vote.username, PollOption.label, Vote.weight, Vote.voted_at,
+        Poll.is_anonymous
+    ).join(Poll, Poll.id == Vote.poll_id).join(PollOption, PollOption.id == Vote.option_id)
+    
+    if poll_id is not None:
+        query = query.filter(Vote.poll_id == poll_id)
+    if server_id is not None:
+        query = query.filter(Poll.server_id == server_id)
+    if start is not None:
+        query = query.filter(Vote.voted_at >= start)
+    if end is not None:
+        query = query.filter(Vote.voted_at < end)
+    
+    query = query.order_by(Vote.id).execution_options(yield_per=FETCH_SIZE)
+    
+    for vote_poll_id, user_id, username, option, weight, voted_at, is_anonymous in query:
+        if is_anonymous:
+            user_id, username = None, None
+        yield vote_poll_id, user_id, username, option, weight, voted_at
+
+def export_csv(rows):
+    """Encode vote rows as CSV, yielding one chunk per FETCH_SIZE rows"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUMNS)
+    
+    for count, row in enumerate(rows, 1):
+        writer.writerow(['' if value is None else value for value in row[:5]] + [
+            row[5].isoformat() if row[5] else ''
+        ])
+        if count % FETCH_SIZE == 0:
+            yield buf.getvalue().encode()
+            buf.seek(0)
+            buf.truncate()
+    
+    yield buf.getvalue().encode()
+
+def export_ndjson(rows):
+    """Encode vote rows as newline-delimited JSON objects"""
+    chunk = []
+    for row in rows:
+        record = dict(zip(COLUMNS, row))
+        record['voted_at'] = row[5].isoformat() if row[5] else None
+        chunk.append(json.dumps(record))
+        if len(chunk) == FETCH_SIZE:
+            yield ('\n'.join(chunk) + '\n').encode()
+            chunk = []
+    
+    if chunk:
+        yield ('\n'.join(chunk) + '\n').encode()
+
+# Columnar binary format
+#
+#   magic  b'PBCOL1\n'
+#   header uint32 length + JSON {"columns": [{"name", "type"}]}
+#   blocks uint32 row count (0 ends the stream), then per column:
+#          row count null flags (1 byte each), then the values:
+#          int64     - row count little-endian int64s (0 for nulls)
+#          timestamp - int64 microseconds since 1970-01-01 (naive, as stored)
+#          str       - row count uint32 byte lengths, then the UTF-8 data
+#          dict      - uint32 entries + entries as a str column without
+#                      null flags, then row count uint32 codes
+#
+# Blocks are written as they fill, so the writer never holds more than
+# BLOCK_ROWS rows, and a reader can process a block at a time.
+
+MAGIC = b'PBCOL1\n'
+
+COLUMN_TYPES = {
+    'poll_id': 'int64',
+    'user_id': 'int64',
+    'username': 'str',
+    'option': 'dict',  # Few distinct values per poll
+    'weight': 'int64',
+    'voted_at': 'timestamp'
+}
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+def _pack_array(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+def _unpack_array(typecode, data):
+    unpacked = array(typecode)
+    unpacked.frombytes(data)
+    if sys.byteorder != 'little':
+        unpacked.byteswap()
+    return unpacked
+
+def _encode_strings(values):
+    encoded = [value.encode() for value in values]
+    return _pack_array('I', [len(value) for value in encoded]) + b''.join(encoded)
+
+def _encode_column(kind, values):
+    nulls = bytes(value is None for value in values)
+    
+    if kind == 'int64':
+        data = _pack_array('q', [value or 0 for value in values])
+    elif kind == 'timestamp':
+        data = _pack_array('q', [
+            (value - EPOCH) // datetime.timedelta(microseconds=1) if value else 0 for value in values
+        ])
+    elif kind == 'str':
+        data = _encode_strings([value or '' for value in values])
+    else:
+        entries = {}
+        codes = [entries.setdefault(value or '', len(entries)) for value in values]
+        data = struct.pack('<I', len(entries)) + _encode_strings(list(entries)) + _pack_array('I', codes)
+    
+    return nulls + data
+
+def _encode_block(block):
+    parts = [struct.pack('<I', len(block))]
+    for index, name in enumerate(COLUMNS):
+        parts.append(_encode_column(COLUMN_TYPES[name], [row[index] for row in block]))
+    return b''.join(parts)
+
+def export_columnar(rows):
+    """Encode vote rows in the columnar binary format, one block at a time"""
+    header = json.dumps({
+        'columns': [{'name': name, 'type': COLUMN_TYPES[name]} for name in COLUMNS]
+    }).encode()
+    yield MAGIC + struct.pack('<I', len(header)) + header
+    
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) == BLOCK_ROWS:
+            yield _encode_block(block)
+            block = []
+    
+    if block:
+        yield _encode_block(block)
+    yield struct.pack('<I', 0)
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError("Truncated columnar export")
+    return data
+
+def _read_strings(stream, count):
+    lengths = _unpack_array('I', _read_exact(stream, 4 * count))
+    data = _read_exact(stream, sum(lengths))
+    values, offset = [], 0
+    for length in lengths:
+        values.append(data[offset:offset + length].decode())
+        offset += length
+    return values
+
+def read_columnar(stream):
+    """
+    Read a columnar export back, one block at a time
+    
+    Parameters:
+    - stream: Binary file object positioned at the start of the export
+    
+    Returns:
+    - Generator of blocks, each a dictionary of column name -> list of values
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a columnar vote export")
+    
+    header_size, = struct.unpack('<I', _read_exact(stream, 4))
+    columns = json.loads(_read_exact(stream, header_size))['columns']
+    
+    while True:
+        count, = struct.unpack('<I', _read_exact(stream, 4))
+        if count == 0:
+            return
+        
+        block = {}
+        for column in columns:
+            nulls = _read_exact(stream, count)
+            kind = column['type']
+            
+            if kind == 'int64':
+                values = list(_unpack_array('q', _read_exact(stream, 8 * count)))
+            elif kind == 'timestamp':
+                values = [
+                    EPOCH + datetime.timedelta(microseconds=value)
+                    for value in _unpack_array('q', _read_exact(stream, 8 * count))
+                ]
+            elif kind == 'str':
+                values = _read_strings(stream, count)
+            else:
+                entries, = struct.unpack('<I', _read_exact(stream, 4))
+                dictionary = _read_strings(stream, entries)
+                values = [dictionary[code] for code in _unpack_array('I', _read_exact(stream, 4 * count))]
+            
+            block[column['name']] = [None if null else value for null, value in zip(nulls, values)]
+        yield block
+
+# Format name -> (encoder, mimetype, file extension)
+FORMATS = {
+    'csv': (export_csv, 'text/csv', 'csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson', 'ndjson'),
+    'columnar': (export_columnar, 'application/octet-stream', 'pbcol')
+}
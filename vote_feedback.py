@@ -0,0 +1,186 @@
+import time
+import asyncio
+import logging
+import discord
+from app import app
+import metrics
+
+logger = logging.getLogger(__name__)
+
+NONE = 'none'
+DM_DIGEST = 'dm_digest'
+CHANNEL_BATCH = 'channel_batch'
+EPHEMERAL = 'ephemeral'
+STRATEGIES = (NONE, DM_DIGEST, CHANNEL_BATCH, EPHEMERAL)
+
+# Discord's message length limit
+MESSAGE_LIMIT = 2000
+
+def _retry_after(error):
+    if isinstance(error, discord.RateLimited):
+        return error.retry_after
+    retry_after = error.response.headers.get('Retry-After') if error.response is not None else None
+    return float(retry_after) if retry_after else 5.0
+
+class VoteFeedback:
+    """
+    Tells voters what happened to their vote without a message per vote
+    
+    Reaction votes have no reply channel of their own, so their feedback is
+    queued and a periodic flush on the bot loop sends it according to the
+    strategy:
+    - none: reaction feedback is dropped
+    - dm_digest: one DM per voter per flush listing everything since the last one
+    - channel_batch: one summary message per channel per flush
+    - ephemeral: only votes cast through buttons or select menus get feedback
+    
+    Votes in anonymous polls are never summarized in the channel; with
+    channel_batch their feedback is dropped (feedback.suppressed.anonymous).
+    
+    Button and select menu votes must be answered anyway, so they always get
+    an ephemeral reply (a silent acknowledgement with 'none'). Targets that
+    hit a rate limit keep their feedback until the limit resets; feedback
+    that can't be delivered is counted under feedback.suppressed.
+    """
+    
+    def __init__(self, strategy, max_lines=20, delete_after=15):
+        if strategy not in STRATEGIES:
+            logger.warning(f"Unknown vote feedback strategy {strategy!r}, using {CHANNEL_BATCH!r}")
+            strategy = CHANNEL_BATCH
+        self.strategy = strategy
+        self.max_lines = max(1, max_lines)
+        self.delete_after = delete_after or None
+        self._channels = {}  # channel_id -> (channel, [lines])
+        self._users = {}  # user_id -> (user, [lines])
+        self._blocked_until = {}  # ('channel' or 'dm', id) -> monotonic time the rate limit resets
+        self._undeliverable = set()  # Users who don't accept DMs from the bot
+    
+    def _suppress(self, reason, count=1):
+        metrics.incr('feedback.suppressed', count)
+        metrics.incr(f'feedback.suppressed.{reason}', count)
+    
+    def _queue(self, pending, key, target, line):
+        entry = pending.get(key)
+        if entry is not None and len(entry[1]) >= self.max_lines:
+            self._suppress('overflow')
+            return
+        pending.setdefault(key, (target, []))[1].append(line)
+        metrics.incr('feedback.queued')
+    
+    def notify(self, channel, user, text, anonymous=False):
+        """
+        Queue feedback for a reaction vote
+        
+        Parameters:
+        - channel: Channel of the poll message
+        - user: Member who reacted
+        - text: What happened, e.g. "✅ Your vote for **Pizza** has been recorded!"
+        - anonymous: The vote is in an anonymous poll, so it must not be posted to the channel
+        """
+        if self.strategy == CHANNEL_BATCH and anonymous:
+            # A channel summary would show everyone how the member voted
+            self._suppress('anonymous')
+        elif self.strategy == CHANNEL_BATCH:
+            self._queue(self._channels, channel.id, channel, f"{user.mention} {text}")
+        elif self.strategy == DM_DIGEST:
+            if user.id in self._undeliverable:
+                self._suppress('undeliverable')
+            else:
+                self._queue(self._users, user.id, user, f"{text} ({channel.mention})")
+        else:
+            # Off, or ephemeral, which a reaction can't be answered with
+            self._suppress('disabled')
+    
+    async def reply(self, interaction, text):
+        """Answer a button or select menu vote, with a followup if it was deferred"""
+        deferred = interaction.response.is_done()
+        if self.strategy == NONE:
+            self._suppress('disabled')
+            if not deferred:
+                await interaction.response.defer()
+        elif deferred:
+            await interaction.followup.send(text, ephemeral=True)
+            metrics.incr('feedback.ephemeral')
+        else:
+            await interaction.response.send_message(text, ephemeral=True)
+            metrics.incr('feedback.ephemeral')
+    
+    def _render(self, lines):
+        # As many lines as fit in one message, plus a note for the rest; returns (text, lines shown)
+        for count in range(len(lines), 0, -1):
+            text = "\n".join(lines[:count])
+            if count < len(lines):
+                text += f"\n… and {len(lines) - count} more"
+            if len(text) <= MESSAGE_LIMIT:
+                break
+        
+        if count < len(lines):
+            self._suppress('overflow', len(lines) - count)
+        return text[:MESSAGE_LIMIT], count
+    
+    async def _deliver(self, kind, key, target, lines):
+        # Returns the lines to keep for the next flush
+        if self._blocked_until.get((kind, key), 0) > time.monotonic():
+            return lines
+        
+        text, shown = self._render(lines)
+        try:
+            if kind == 'channel':
+                # Mentions show who each line is for without pinging everyone in the batch
+                await target.send(text, delete_after=self.delete_after, allowed_mentions=discord.AllowedMentions.none())
+            else:
+                await target.send(text)
+        except (discord.RateLimited, discord.HTTPException) as e:
+            if isinstance(e, discord.RateLimited) or e.status == 429:
+                # Hold the feedback until the limit resets instead of retrying right away
+                self._blocked_until[(kind, key)] = time.monotonic() + _retry_after(e)
+                metrics.incr('feedback.rate_limited')
+                return lines
+            
+            if kind == 'dm' and e.status == 403:
+                self._undeliverable.add(key)  # DMs closed; don't try again
+                self._suppress('undeliverable', len(lines))
+            else:
+                logger.warning(f"Failed to send vote feedback to {kind} {key}: {str(e)}")
+                self._suppress('failed', len(lines))
+            return []
+        
+        self._blocked_until.pop((kind, key), None)
+        metrics.incr('feedback.messages')
+        metrics.incr('feedback.delivered', shown)
+        return []
+    
+    async def flush(self):
+        """Send the queued feedback, one message per channel or voter"""
+        if not self._channels and not self._users:
+            return
+        
+        pending = [('channel', key, target, lines) for key, (target, lines) in self._channels.items()]
+        pending += [('dm', key, target, lines) for key, (target, lines) in self._users.items()]
+        self._channels, self._users = {}, {}
+        
+        # Channels and DMs have separate rate limit buckets, so send to them together
+        kept = await asyncio.gather(*(self._deliver(*item) for item in pending), return_exceptions=True)
+        
+        # Feedback held back by a rate limit goes ahead of anything queued meanwhile
+        for (kind, key, target, sent), lines in zip(pending, kept):
+            if isinstance(lines, Exception):
+                # One broken target mustn't stop the flush task for everyone
+                logger.error(f"Failed to send vote feedback to {kind} {key}: {str(lines)}")
+                self._suppress('failed', len(sent))
+                continue
+            if not lines:
+                continue
+            queue = self._channels if kind == 'channel' else self._users
+            newer = queue.pop(key, (target, []))[1]
+            combined = lines + newer
+            if len(combined) > self.max_lines:
+                self._suppress('overflow', len(combined) - self.max_lines)
+            queue[key] = (target, combined[:self.max_lines])
+
+# Shared by the vote handlers
+vote_feedback = VoteFeedback(
+    app.config["VOTE_FEEDBACK"],
+    app.config["VOTE_FEEDBACK_MAX_LINES"],
+    app.config["VOTE_FEEDBACK_DELETE_AFTER"]
+)
@@ -0,0 +1,291 @@
+import time
+import asyncio
+import logging
+from app import app, db
+from models import Vote
+from polls import record_vote, delete_vote, defer_counters, write_counters
+from vote_state import vote_state
+from role_weights import role_weights
+from db_executor import run_db
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CAST = 'cast'
+WITHDRAW = 'withdraw'
+CHOOSE = 'choose'
+ADD = 'add'
+
+# Vote operations below run on the DB executor and leave committing to apply_batch
+
+def cast_vote(poll, guild_id, role_ids, user_id, username, option_id):
+    """
+    Apply a reaction or button vote to the session
+    
+    Returns:
+    - Outcome: 'present', 'removed', 'change_blocked', 'limit_reached', 'changed' or 'recorded'
+    - The option ID of the replaced vote when the outcome is 'changed'
+    """
+    # Get user's highest role weight from the cached guild role weights
+    highest_weight = role_weights.resolve(guild_id, role_ids)
+    
+    # Get all user's votes for this poll from the vote state cache
+    user_votes = vote_state.user_votes(poll.id, user_id)
+    
+    # Check if user already voted for this specific option
+    if option_id in user_votes:
+        if poll.vote_mode == 'reactions' and not poll.is_anonymous:
+            # The reaction stays on the message, so it already stands for this
+            # vote (e.g. the reconciler recorded it first); toggling would drop it
+            return 'present', None
+        
+        # User already voted for this option, remove the vote (toggle functionality)
+        delete_vote(poll.id, user_id, option_id, *user_votes[option_id])
+        return 'removed', None
+    
+    old_option = None
+    
+    # Handle vote limits and changes
+    if not poll.allow_multiple:
+        # Single vote mode: replace existing vote if allowed
+        if user_votes:
+            if not poll.allow_vote_change:
+                return 'change_blocked', None
+            
+            # Delete old vote and create new one in the same transaction
+            old_option = next(iter(user_votes))
+            for old_option_id, (weight, day) in user_votes.items():
+                delete_vote(poll.id, user_id, old_option_id, weight, day)
+    elif poll.max_votes > 0 and len(user_votes) >= poll.max_votes:
+        # Multiple votes mode with the max votes limit reached
+        return 'limit_reached', None
+    
+    record_vote(Vote(
+        poll_id=poll.id,
+        user_id=user_id,
+        username=username,
+        option_id=option_id,
+        weight=highest_weight
+    ))
+    
+    return ('changed', old_option) if old_option else ('recorded', None)
+
+def withdraw_vote(poll_id, user_id, option_id):
+    """
+    Remove a user's vote for an option from the session
+    
+    Returns:
+    - True if there was a vote to remove
+    """
+    user_votes = vote_state.user_votes(poll_id, user_id)
+    if option_id not in user_votes:
+        return False
+    
+    delete_vote(poll_id, user_id, option_id, *user_votes[option_id])
+    return True
+
+def choose_votes(poll, guild_id, role_ids, user_id, username, option_ids):
+    """
+    Make a user's votes in a poll exactly the chosen options (select menu voting)
+    
+    Returns:
+    - Outcome: 'unchanged', 'change_blocked', 'limit_reached' or 'recorded'
+    """
+    chosen = list(dict.fromkeys(option_ids))
+    user_votes = vote_state.user_votes(poll.id, user_id)
+    current = set(user_votes)
+    
+    if set(chosen) == current:
+        return 'unchanged'
+    
+    if not poll.allow_multiple:
+        if len(chosen) > 1:
+            return 'limit_reached'
+        # Clearing the menu withdraws the vote, like removing a reaction
+        if current and chosen and not poll.allow_vote_change:
+            return 'change_blocked'
+    elif poll.max_votes > 0 and len(chosen) > poll.max_votes:
+        return 'limit_reached'
+    
+    for option_id, (weight, day) in user_votes.items():
+        if option_id not in chosen:
+            delete_vote(poll.id, user_id, option_id, weight, day)
+    
+    highest_weight = role_weights.resolve(guild_id, role_ids)
+    for option_id in chosen:
+        if option_id not in current:
+            record_vote(Vote(
+                poll_id=poll.id,
+                user_id=user_id,
+                username=username,
+                option_id=option_id,
+                weight=highest_weight
+            ))
+    
+    return 'recorded'
+
+def add_vote(poll, guild_id, role_ids, user_id, username, option_id):
+    """
+    Record a vote found on Discord after the fact (see reconciler)
+    
+    Unlike cast_vote this never toggles or replaces a vote: a reaction the
+    poll's limits don't leave room for is left out.
+    
+    Returns:
+    - Outcome: 'present', 'limit_reached' or 'recorded'
+    """
+    user_votes = vote_state.user_votes(poll.id, user_id)
+    if option_id in user_votes:
+        return 'present'
+    
+    if not poll.allow_multiple and user_votes:
+        return 'limit_reached'
+    if poll.allow_multiple and poll.max_votes > 0 and len(user_votes) >= poll.max_votes:
+        return 'limit_reached'
+    
+    record_vote(Vote(
+        poll_id=poll.id,
+        user_id=user_id,
+        username=username,
+        option_id=option_id,
+        weight=role_weights.resolve(guild_id, role_ids)
+    ))
+    return 'recorded'
+
+_OPERATIONS = {CAST: cast_vote, WITHDRAW: withdraw_vote, CHOOSE: choose_votes, ADD: add_vote}
+
+def apply_batch(operations):
+    """
+    Apply queued vote operations in order and commit them together
+    
+    Tally and activity changes are summed over the batch and written once
+    per poll option and server day. If the group commit fails, the
+    operations are retried one transaction each, so a single bad event
+    only fails itself.
+    
+    Parameters:
+    - operations: List of (CAST, WITHDRAW, CHOOSE or ADD, arguments)
+    
+    Returns:
+    - List with the result (or the exception) of each operation
+    """
+    try:
+        defer_counters()
+        results = [_OPERATIONS[kind](*args) for kind, args in operations]
+        write_counters()
+        db.session.commit()
+        return results
+    except Exception as e:
+        db.session.rollback()
+        if len(operations) == 1:
+            return [e]
+        logger.warning(f"Group commit of {len(operations)} votes failed, retrying one by one: {str(e)}")
+        metrics.incr('votes.batch_retries')
+    
+    results = []
+    for kind, args in operations:
+        try:
+            defer_counters()
+            result = _OPERATIONS[kind](*args)
+            write_counters()
+            db.session.commit()
+            results.append(result)
+        except Exception as e:
+            db.session.rollback()
+            results.append(e)
+    return results
+
+class VotePipeline:
+    """
+    Queue of votes written to the database in group commits
+    
+    Reaction and interaction handlers submit votes and await the outcome. A single writer
+    task takes everything queued (up to batch_size), waiting max_delay
+    seconds for more when the queue is short, and applies it in one
+    transaction on the DB executor. Votes queued while a batch is being
+    written go into the next one, so the busier the bot, the larger the
+    batches. One writer also keeps each user's votes in arrival order.
+    """
+    
+    def __init__(self, batch_size, max_delay):
+        self.batch_size = max(1, batch_size)
+        self.max_delay = max_delay
+        self._queue = None
+        self._writer = None
+    
+    def _ensure_writer(self):
+        # Created lazily so they belong to the bot's running loop
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self._run())
+    
+    async def submit(self, kind, *args):
+        """
+        Queue a vote operation and wait until it is committed
+        
+        Returns:
+        - The result of the vote operation
+        """
+        self._ensure_writer()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((kind, args, future, time.perf_counter()))
+        return await future
+    
+    async def cast(self, poll, guild_id, role_ids, user_id, username, option_id):
+        """Queue a reaction or button vote (see cast_vote)"""
+        return await self.submit(CAST, poll, guild_id, role_ids, user_id, username, option_id)
+    
+    async def withdraw(self, poll_id, user_id, option_id):
+        """Queue the removal of a reaction vote (see withdraw_vote)"""
+        return await self.submit(WITHDRAW, poll_id, user_id, option_id)
+    
+    async def choose(self, poll, guild_id, role_ids, user_id, username, option_ids):
+        """Queue a select menu vote (see choose_votes)"""
+        return await self.submit(CHOOSE, poll, guild_id, role_ids, user_id, username, option_ids)
+    
+    async def add(self, poll, guild_id, role_ids, user_id, username, option_id):
+        """Queue a vote found by reconciliation (see add_vote)"""
+        return await self.submit(ADD, poll, guild_id, role_ids, user_id, username, option_id)
+    
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+    
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        
+        # Give a short burst the chance to land in the same commit
+        if self.max_delay > 0 and self._queue.qsize() < self.batch_size - 1:
+            await asyncio.sleep(self.max_delay)
+        
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+    
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            
+            started = time.perf_counter()
+            try:
+                results = await run_db(apply_batch, [(kind, args) for kind, args, _, _ in batch])
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} votes: {str(e)}")
+                results = [e] * len(batch)
+            
+            finished = time.perf_counter()
+            metrics.observe('votes.batch_size', len(batch))
+            metrics.observe('votes.flush_seconds', finished - started)
+            
+            for (_, _, future, queued), result in zip(batch, results):
+                metrics.observe('votes.ack_latency', finished - queued)
+                if future.done():
+                    continue  # The handler went away
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+# Shared by the reaction and interaction handlers
+vote_pipeline = VotePipeline(app.config["VOTE_BATCH_SIZE"], app.config["VOTE_BATCH_MS"] / 1000)
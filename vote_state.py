@@ -0,0 +1,116 @@
+import threading
+from sqlalchemy import event
+from app import db
+from models import Vote, activity_day
+
+class VoteStateCache:
+    """
+    In-memory record of what each member has voted for in active polls
+    
+    Lets the vote operations decide toggles, vote changes and vote limits
+    without reading the member's Vote rows; the database stays the durable
+    log. A poll's state is loaded with one query the first time one of its
+    votes is handled, and dropped again when it stops being active.
+    
+    Changes made in a transaction live in the session until it commits, so
+    a rolled back vote batch never reaches the shared state.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._polls = {}  # poll_id -> {user_id: {option_id: (weight, day)}}
+        self._generations = {}  # poll_id -> eviction count, to drop loads that raced an eviction
+    
+    def _session_state(self):
+        # Per transaction: (loaded polls, changed users)
+        info = db.session.info
+        if 'vote_state' not in info:
+            info['vote_state'] = ({}, {})
+        return info['vote_state']
+    
+    def _load(self, poll_id):
+        rows = db.session.query(
+            Vote.user_id, Vote.option_id, Vote.weight, Vote.voted_at
+        ).filter(Vote.poll_id == poll_id).order_by(Vote.id)
+        
+        state = {}
+        for user_id, option_id, weight, voted_at in rows:
+            state.setdefault(user_id, {})[option_id] = (weight or 1, activity_day(voted_at))
+        return state
+    
+    def user_votes(self, poll_id, user_id):
+        """
+        Get a member's votes in a poll as seen by the current transaction
+        
+        Returns:
+        - Dictionary of option ID -> (weight, day voted), in voting order
+        """
+        loaded, changed = self._session_state()
+        if (poll_id, user_id) in changed:
+            return dict(changed[(poll_id, user_id)])
+        
+        with self._lock:
+            state = self._polls.get(poll_id)
+        if state is None:
+            if poll_id not in loaded:
+                # Published when the transaction commits, as it may include its own writes
+                with self._lock:
+                    generation = self._generations.get(poll_id, 0)
+                loaded[poll_id] = (generation, self._load(poll_id))
+            state = loaded[poll_id][1]
+        return dict(state.get(user_id, {}))
+    
+    def _change(self, poll_id, user_id, change):
+        loaded, changed = self._session_state()
+        key = (poll_id, user_id)
+        if key not in changed:
+            with self._lock:
+                known = poll_id in self._polls
+            if not known and poll_id not in loaded:
+                return  # Not cached; whoever loads it next reads the change from the database
+            changed[key] = self.user_votes(poll_id, user_id)
+        change(changed[key])
+    
+    def record(self, poll_id, user_id, option_id, weight, day):
+        """Note a vote added in the current transaction"""
+        self._change(poll_id, user_id, lambda votes: votes.__setitem__(option_id, (weight, day)))
+    
+    def discard(self, poll_id, user_id, option_id):
+        """Note a vote deleted in the current transaction"""
+        self._change(poll_id, user_id, lambda votes: votes.pop(option_id, None))
+    
+    def evict(self, poll_id):
+        """Forget a poll that is no longer active (or whose votes changed behind the cache)"""
+        with self._lock:
+            self._polls.pop(poll_id, None)
+            self._generations[poll_id] = self._generations.get(poll_id, 0) + 1
+    
+    def _publish(self, loaded, changed):
+        with self._lock:
+            for poll_id, (generation, state) in loaded.items():
+                if poll_id not in self._polls and self._generations.get(poll_id, 0) == generation:
+                    self._polls[poll_id] = state
+            
+            for (poll_id, user_id), votes in changed.items():
+                state = self._polls.get(poll_id)
+                if state is None:
+                    continue
+                if votes:
+                    state[user_id] = votes
+                else:
+                    state.pop(user_id, None)
+    
+    def __len__(self):
+        return len(self._polls)
+
+# Shared by the vote operations on the DB executor and the dashboard routes
+vote_state = VoteStateCache()
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_vote_state(session):
+    loaded, changed = session.info.pop('vote_state', ({}, {}))
+    vote_state._publish(loaded, changed)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_vote_state(session):
+    session.info.pop('vote_state', None)